@@ -0,0 +1,36 @@
+"""Compare deux fichiers de resultats JSON (meme benchmark) : p50 / p95 / p99 / debit.
+
+Usage, depuis backend/ :  python -m benchmarks.compare avant.json apres.json
+"""
+
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s')
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('before')
+  parser.add_argument('after')
+  args = parser.parse_args()
+
+  with open(args.before) as f:
+    before = json.load(f)
+  with open(args.after) as f:
+    after = json.load(f)
+  print(f'{before["git_commit"]} -> {after["git_commit"]}')
+  print(f'{"":<28}' + ''.join(f'{metric:>20}' for metric in METRICS))
+  for name, row in after['results'].items():
+    old = before['results'].get(name)
+    if not old or not old.get('count') or not row.get('count'):
+      continue
+    # ratio apres / avant : < 1 pour une latence, > 1 pour un debit = mieux
+    cells = ''.join(
+      f'{row[metric]:>12.2f} x{row[metric] / old[metric]:<6.2f}' for metric in METRICS
+    )
+    print(f'{name:<28}{cells}')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,268 @@
+"""Generateur reproductible (graine fixe) de donnees User / Book / Game realistes.
+
+Usage, depuis backend/ :  python -m benchmarks.data --rows 100000 --output bench.db
+"""
+
+import argparse
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from uuid import UUID
+
+os.environ.setdefault('database_url', ':memory:')
+os.environ.setdefault('api_key', 'benchmark')
+
+from passlib.context import CryptContext  # noqa: E402
+from peewee import SqliteDatabase  # noqa: E402
+
+from src.migrations import migrate  # noqa: E402
+from src.models import (  # noqa: E402
+  Book,
+  Game,
+  Job,
+  MediaChange,
+  MediaSearch,
+  MetadataCache,
+  ProgressEvent,
+  SyncSequence,
+  Tombstone,
+  User,
+  UserStats,
+  Work,
+)
+
+MODELS = [
+  User,
+  Work,
+  Book,
+  Game,
+  UserStats,
+  ProgressEvent,
+  MetadataCache,
+  MediaSearch,
+  SyncSequence,
+  MediaChange,
+  Tombstone,
+  Job,
+]
+# mot de passe commun a tous les utilisateurs generes
+PASSWORD = 'benchmark'
+CHUNK = 1000
+NOW = datetime(2025, 1, 1)
+
+ADJECTIVES = (
+  'Silent Hidden Broken Golden Last Lost Dark Bright Forgotten Endless Crimson Quiet'
+  ' Wild Burning Frozen Secret Little Great Strange Distant Hollow Iron Glass Ancient'
+).split()
+NOUNS = (
+  'Garden River Empire Shadow Kingdom Night Ocean Mountain Letter Road City Storm'
+  ' Island Forest Machine Song Tower Winter Mirror Station Harbor Desert Crown Star'
+).split()
+FIRST_NAMES = (
+  'Anna Louis Chloe Hugo Emma Jules Lea Adam Manon Paul Sarah Victor Ines Noah Clara'
+  ' Tom Alice Leo Jade Arthur Eva Nathan Rose Gabriel Lina Sacha Mia Oscar Zoe Remi'
+).split()
+LAST_NAMES = (
+  'Martin Bernard Dubois Thomas Robert Richard Petit Durand Leroy Moreau Simon Laurent'
+  ' Lefebvre Michel Garcia David Bertrand Roux Vincent Fournier Morel Girard Andre'
+).split()
+# (plateforme, poids)
+PLATFORMS = (('PC', 40), ('PS5', 20), ('Switch', 20), ('Xbox', 10), (None, 10))
+
+
+@dataclass
+class Dataset:
+  users: list[str]
+  books: int
+  games: int
+  # proprietaire -> quelques ids de ses medias, pour cibler les lectures
+  book_ids: dict[str, list[int]] = field(default_factory=dict)
+  game_ids: dict[str, list[int]] = field(default_factory=dict)
+
+
+def open_database(path: str = ':memory:') -> SqliteDatabase:
+  database = SqliteDatabase(
+    path,
+    pragmas={'journal_mode': 'wal', 'synchronous': 0, 'foreign_keys': 1},
+  )
+  database.bind(MODELS, bind_refs=False, bind_backrefs=False)
+  database.connect(reuse_if_open=True)
+  database.create_tables(MODELS)
+  return database
+
+
+def _title(rng: random.Random, i: int) -> str:
+  title = f'The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}'
+  # une part de suites et de tomes : titres proches, utiles pour la recherche
+  if rng.random() < 0.3:
+    title += f' {rng.randint(2, 9)}'
+  return f'{title} #{i}' if rng.random() < 0.5 else title
+
+
+def _dates(rng: random.Random):
+  created = NOW - timedelta(days=rng.uniform(0, 3 * 365))
+  updated = created + timedelta(days=rng.uniform(0, (NOW - created).days + 1))
+  return created, updated
+
+
+def _owners(rng: random.Random, users: list[str], count: int):
+  # repartition a queue lourde (Pareto) : peu de gros lecteurs, beaucoup de petits
+  weights = [rng.paretovariate(1.2) for _ in users]
+  cumulative, total = [], 0.0
+  for weight in weights:
+    total += weight
+    cumulative.append(total)
+  remaining = count
+  while remaining:
+    size = min(CHUNK, remaining)
+    yield from rng.choices(users, cum_weights=cumulative, k=size)
+    remaining -= size
+
+
+def _books(rng: random.Random, users: list[str], count: int):
+  for i, owner in enumerate(_owners(rng, users, count)):
+    pages = min(1500, max(40, int(rng.lognormvariate(5.7, 0.4))))
+    created, updated = _dates(rng)
+    state = rng.random()
+    # 35 % termines, 25 % en cours, le reste pas commence
+    if state < 0.35:
+      current_page, ended_at = pages, updated
+    elif state < 0.6:
+      current_page, ended_at = rng.randint(1, pages - 1), None
+    else:
+      current_page, ended_at, updated = 0, None, None
+    yield {
+      'user': owner,
+      'title': _title(rng, i),
+      'author': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+      'pages': pages,
+      'current_page': current_page,
+      'isbn': f'978{i:010d}' if rng.random() < 0.7 else None,
+      'google_books_id': f'gb{i:010d}' if rng.random() < 0.5 else None,
+      'created_at': created,
+      'updated_at': updated,
+      'ended_at': ended_at,
+    }
+
+
+def _games(rng: random.Random, users: list[str], count: int):
+  platforms = [p for p, _ in PLATFORMS]
+  weights = [w for _, w in PLATFORMS]
+  for i, owner in enumerate(_owners(rng, users, count)):
+    completion_time = round(rng.lognormvariate(3.0, 0.8), 1)
+    created, updated = _dates(rng)
+    state = rng.random()
+    if state < 0.3:
+      time_played, ended_at = completion_time * rng.uniform(1, 1.5), updated
+    elif state < 0.6:
+      time_played, ended_at = completion_time * rng.random(), None
+    else:
+      time_played, ended_at, updated = 0, None, None
+    yield {
+      'user': owner,
+      'title': _title(rng, i),
+      'platform': rng.choices(platforms, weights)[0],
+      # duree inconnue de HowLongToBeat pour une partie des jeux
+      'completion_time': completion_time if rng.random() < 0.8 else None,
+      'time_played': round(time_played, 1),
+      'created_at': created,
+      'updated_at': updated,
+      'ended_at': ended_at,
+    }
+
+
+def _insert(model, rows) -> int:
+  database = model._meta.database
+  inserted = 0
+  while chunk := list(islice(rows, CHUNK)):
+    with database.atomic():
+      model.insert_many(chunk).execute()
+    inserted += len(chunk)
+  return inserted
+
+
+def _sample_ids(model, per_user: int) -> dict[str, list[int]]:
+  ids: dict[str, list[int]] = {}
+  for user, media_id in model.select(model.user, model.id).order_by(model.id).tuples():
+    owned = ids.setdefault(str(user), [])
+    if len(owned) < per_user:
+      owned.append(media_id)
+  return ids
+
+
+def generate(
+  rows: int, users: int | None = None, seed: int = 42, sample: int = 20
+) -> Dataset:
+  """Remplit la base liee aux modeles : `rows` medias (60 % livres, 40 % jeux)."""
+  rng = random.Random(seed)
+  users = users or max(1, rows // 250)
+  # un seul hash, peu couteux : le mot de passe est connu des benchmarks
+  password = CryptContext(schemes=['bcrypt'], bcrypt__rounds=4).hash(PASSWORD)
+  user_ids = [str(UUID(int=rng.getrandbits(128), version=4)) for _ in range(users)]
+  _insert(
+    User,
+    (
+      {
+        'id': user_id,
+        'username': f'user{i:06d}',
+        'email': f'user{i:06d}@bench.test',
+        'password': password,
+        'role': 'admin' if i == 0 else 'user',
+      }
+      for i, user_id in enumerate(user_ids)
+    ),
+  )
+  games = rows * 2 // 5
+  books = _insert(Book, _books(rng, user_ids, rows - games))
+  games = _insert(Game, _games(rng, user_ids, games))
+  # tables creees sans triggers pour l'insertion en masse : les migrations posent
+  # les triggers, recalculent compteurs, index plein texte et journal de
+  # synchronisation, et datent le schema
+  migrate(Book._meta.database)
+  return Dataset(
+    users=user_ids,
+    books=books,
+    games=games,
+    book_ids=_sample_ids(Book, sample),
+    game_ids=_sample_ids(Game, sample),
+  )
+
+
+def load_dataset(sample: int = 20) -> Dataset:
+  """Decrit une base deja generee, liee aux modeles par open_database."""
+  return Dataset(
+    users=[str(user_id) for (user_id,) in User.select(User.id).tuples()],
+    books=Book.select().count(),
+    games=Game.select().count(),
+    book_ids=_sample_ids(Book, sample),
+    game_ids=_sample_ids(Game, sample),
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--rows', type=int, default=10_000)
+  parser.add_argument('--users', type=int, default=None)
+  parser.add_argument('--seed', type=int, default=42)
+  parser.add_argument('--output', default='bench.db')
+  args = parser.parse_args()
+  if not 1 <= args.rows <= 1_000_000:
+    parser.error('--rows must be between 1 and 1000000')
+  if Path(args.output).exists():
+    parser.error(f'{args.output} already exists')
+
+  start = time.perf_counter()
+  open_database(args.output)
+  dataset = generate(args.rows, args.users, args.seed)
+  print(
+    f'{len(dataset.users)} users, {dataset.books} books, {dataset.games} games'
+    f' -> {args.output} ({time.perf_counter() - start:.1f} s)'
+  )
+
+
+if __name__ == '__main__':
+  main()
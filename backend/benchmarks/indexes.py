@@ -0,0 +1,113 @@
+"""Listes par utilisateur avec et sans les index composites (user, title, id) et
+(user, updated_at), sur un utilisateur possedant --per-user livres.
+
+Le meme jeu de donnees est mesure deux fois : avec les index du schema, puis avec
+le seul index sur la cle etrangere d'avant la migration 6 (tri temporaire).
+
+Usage, depuis backend/ :  python -m benchmarks.indexes [--per-user 100000]
+"""
+
+import argparse
+
+from benchmarks.data import generate, open_database
+from benchmarks.results import print_table, write_results
+from benchmarks.services import measure
+from src.models import Book, Game, User
+from src.services.books_service import books_service
+from src.services.games_service import games_service
+from src.services.pagination import DEFAULT_LIMIT, encode_cursor
+
+COMPOSITE = (
+  'book_user_id_title_id',
+  'book_user_id_updated_at',
+  'game_user_id_title_id',
+  'game_user_id_updated_at',
+)
+
+
+def scenarios(user: User) -> dict:
+  user_id = str(user.id)
+  middle = (
+    Book.select(Book.title, Book.id)
+    .where(Book.user == user.id)
+    .order_by(Book.title, Book.id)
+    .offset(Book.select().count() // 2)
+    .first()
+  )
+  cursor = encode_cursor(middle.title, middle.id)
+  book_id = Book.select(Book.id).where(Book.user == user.id).scalar()
+  return {
+    'books first page': lambda: list(
+      books_service.list_rows(user_id, DEFAULT_LIMIT + 1)
+    ),
+    'books deep page': lambda: list(
+      books_service.list_rows(user_id, DEFAULT_LIMIT + 1, cursor)
+    ),
+    'books recent': lambda: list(
+      Book.select()
+      .where(Book.user == user.id)
+      .order_by(Book.updated_at.desc())
+      .limit(DEFAULT_LIMIT)
+    ),
+    'books get': lambda: books_service.get(book_id, user),
+    'games first page': lambda: list(
+      games_service.list_rows(user_id, DEFAULT_LIMIT + 1)
+    ),
+  }
+
+
+def plans(database, queries: dict) -> dict:
+  return {
+    name: [row[-1] for row in database.execute_sql(f'EXPLAIN QUERY PLAN {sql}', params)]
+    for name, (sql, params) in queries.items()
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--per-user', type=int, default=100_000, help='livres')
+  parser.add_argument('--seed', type=int, default=42)
+  parser.add_argument('--iterations', type=int, default=50)
+  parser.add_argument('--output', default=None)
+  args = parser.parse_args()
+
+  database = open_database()
+  # un seul utilisateur : 60 % de livres, 40 % de jeux
+  generate(args.per_user * 5 // 3, users=1, seed=args.seed)
+  user = User.select().first()
+  queries = {
+    'books first page': books_service.list_rows(str(user.id), DEFAULT_LIMIT).sql(),
+    'books recent': Book.select()
+    .where(Book.user == user.id)
+    .order_by(Book.updated_at.desc())
+    .limit(DEFAULT_LIMIT)
+    .sql(),
+  }
+
+  results, explained = {}, {}
+  for variant in ('indexed', 'baseline'):
+    if variant == 'baseline':
+      for name in COMPOSITE:
+        database.execute_sql(f'DROP INDEX "{name}"')
+      database.execute_sql('CREATE INDEX "book_user_id" ON "book" ("user_id")')
+      database.execute_sql('CREATE INDEX "game_user_id" ON "game" ("user_id")')
+    explained[variant] = plans(database, queries)
+    for name, fn in scenarios(user).items():
+      results[f'{variant} {name}'] = measure(fn, args.iterations)
+
+  print(f'books: {Book.select().count()}, games: {Game.select().count()}, users: 1')
+  for variant, variant_plans in explained.items():
+    for name, plan in variant_plans.items():
+      print(f'{variant} {name}: {" / ".join(plan)}')
+  print_table(results)
+  params = {
+    'per_user': args.per_user,
+    'seed': args.seed,
+    'iterations': args.iterations,
+    'plans': explained,
+  }
+  print(f'-> {write_results("indexes", params, results, args.output)}')
+
+
+if __name__ == '__main__':
+  main()
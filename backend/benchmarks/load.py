@@ -0,0 +1,190 @@
+"""Tir de charge HTTP contre une instance uvicorn locale, endpoint par endpoint.
+
+Genere une base (ou reutilise --database), lance uvicorn dessus, puis envoie des
+requetes authentifiees depuis --concurrency clients pendant --duration secondes.
+
+Usage, depuis backend/ :  python -m benchmarks.load [--rows 100000] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.data import generate, load_dataset, open_database
+from benchmarks.results import print_table, summarize, write_results
+from src.auth.security import create_access_token
+
+
+def free_port() -> int:
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+
+def start_server(database: str, port: int, workers: int) -> subprocess.Popen:
+  env = {**os.environ, 'database_url': database}
+  return subprocess.Popen(
+    [
+      sys.executable,
+      '-m',
+      'uvicorn',
+      'src.main:app',
+      '--port',
+      str(port),
+      '--workers',
+      str(workers),
+      '--log-level',
+      'warning',
+      '--no-access-log',
+    ],
+    cwd=Path(__file__).parent.parent,
+    env=env,
+  )
+
+
+def wait_ready(server: subprocess.Popen, base_url: str, timeout: float = 30):
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    if server.poll() is not None:
+      raise RuntimeError(f'server exited with code {server.returncode}')
+    try:
+      if httpx.get(f'{base_url}/health').status_code == 200:
+        return
+    except httpx.TransportError:
+      pass
+    time.sleep(0.2)
+  raise RuntimeError(f'server not ready after {timeout} s')
+
+
+def endpoints(rng: random.Random, targets: list[tuple[dict, list[int], list[int]]]):
+  # chaque endpoint tire au hasard un utilisateur et un de ses medias
+  def pick():
+    return rng.choice(targets)
+
+  def book(headers, books, games):
+    return 'GET', f'/api/books/{rng.choice(books)}', headers, None
+
+  def game(headers, books, games):
+    return 'GET', f'/api/games/{rng.choice(games)}', headers, None
+
+  def update(headers, books, games):
+    body = {'current_page': rng.randint(0, 40)}
+    return 'PATCH', f'/api/books/{rng.choice(books)}', headers, body
+
+  return {
+    'GET /health': lambda: ('GET', '/health', {}, None),
+    'GET /dashboard': lambda: ('GET', '/dashboard', pick()[0], None),
+    'GET /api/books/': lambda: ('GET', '/api/books/?limit=50', pick()[0], None),
+    'GET /api/games/': lambda: ('GET', '/api/games/?limit=50', pick()[0], None),
+    'GET /api/media/': lambda: ('GET', '/api/media/?limit=50', pick()[0], None),
+    'GET /api/books/{id}': lambda: book(*pick()),
+    'GET /api/games/{id}': lambda: game(*pick()),
+    'GET /api/search/': lambda: ('GET', '/api/search/?q=silent', pick()[0], None),
+    'PATCH /api/books/{id}': lambda: update(*pick()),
+  }
+
+
+async def hammer(client: httpx.AsyncClient, request, duration: float, concurrency: int):
+  latencies: list[float] = []
+  errors = 0
+  deadline = time.perf_counter() + duration
+
+  async def worker():
+    nonlocal errors
+    while time.perf_counter() < deadline:
+      method, path, headers, body = request()
+      start = time.perf_counter()
+      response = await client.request(method, path, headers=headers, json=body)
+      latencies.append(time.perf_counter() - start)
+      if response.status_code >= 400:
+        errors += 1
+
+  start = time.perf_counter()
+  await asyncio.gather(*(worker() for _ in range(concurrency)))
+  summary = summarize(latencies, time.perf_counter() - start)
+  summary['errors'] = errors
+  return summary
+
+
+async def run(base_url: str, scenarios: dict, duration: float, concurrency: int):
+  limits = httpx.Limits(max_connections=concurrency)
+  async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+    results = {}
+    for name, request in scenarios.items():
+      results[name] = await hammer(client, request, duration, concurrency)
+      print(f'{name}: {results[name]["count"]} requests')
+    return results
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--rows', type=int, default=100_000)
+  parser.add_argument('--seed', type=int, default=42)
+  parser.add_argument('--database', default=None, help='base deja generee')
+  parser.add_argument('--duration', type=float, default=10)
+  parser.add_argument('--concurrency', type=int, default=16)
+  parser.add_argument('--workers', type=int, default=1)
+  parser.add_argument('--users', type=int, default=50, help='utilisateurs sollicites')
+  parser.add_argument('--output', default=None)
+  args = parser.parse_args()
+
+  if args.database:
+    database = args.database
+    open_database(database)
+    dataset = load_dataset()
+  else:
+    database = str(Path(tempfile.mkdtemp()) / 'load.db')
+    open_database(database)
+    dataset = generate(args.rows, seed=args.seed)
+
+  rng = random.Random(args.seed)
+  # utilisateurs ayant au moins un livre et un jeu a cibler
+  owners = [
+    user
+    for user in dataset.users
+    if user in dataset.book_ids and user in dataset.game_ids
+  ]
+  targets = [
+    (
+      {'Authorization': f'Bearer {create_access_token({"sub": user})}'},
+      dataset.book_ids[user],
+      dataset.game_ids[user],
+    )
+    for user in rng.sample(owners, min(args.users, len(owners)))
+  ]
+
+  port = free_port()
+  base_url = f'http://127.0.0.1:{port}'
+  server = start_server(database, port, args.workers)
+  try:
+    wait_ready(server, base_url)
+    results = asyncio.run(
+      run(base_url, endpoints(rng, targets), args.duration, args.concurrency)
+    )
+  finally:
+    server.terminate()
+    server.wait()
+
+  print_table(results)
+  params = {
+    'rows': dataset.books + dataset.games,
+    'seed': args.seed,
+    'duration': args.duration,
+    'concurrency': args.concurrency,
+    'workers': args.workers,
+    'users': len(targets),
+  }
+  print(f'-> {write_results("load", params, results, args.output)}')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,82 @@
+"""Statistiques de latence et ecriture des resultats en JSON, pour comparer les runs."""
+
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+def summarize(latencies: list[float], elapsed: float | None = None) -> dict:
+  # latences en secondes -> millisecondes ; debit sur la duree totale si fournie
+  if not latencies:
+    return {'count': 0}
+  ordered = sorted(latencies)
+  # inclusive : percentiles interpoles entre min et max, sans extrapolation
+  cuts = (
+    statistics.quantiles(ordered, n=100, method='inclusive')
+    if len(ordered) > 1
+    else ordered * 99
+  )
+  summary = {
+    'count': len(ordered),
+    'mean_ms': statistics.fmean(ordered) * 1000,
+    'min_ms': ordered[0] * 1000,
+    'p50_ms': cuts[49] * 1000,
+    'p95_ms': cuts[94] * 1000,
+    'p99_ms': cuts[98] * 1000,
+    'max_ms': ordered[-1] * 1000,
+  }
+  summary['throughput_per_s'] = len(ordered) / (elapsed or sum(ordered))
+  return summary
+
+
+def _git_commit() -> str | None:
+  try:
+    return subprocess.run(
+      ['git', 'rev-parse', '--short', 'HEAD'],
+      capture_output=True,
+      text=True,
+      check=True,
+      cwd=Path(__file__).parent,
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def write_results(
+  benchmark: str, params: dict, results: dict, output: str | None = None
+) -> Path:
+  path = (
+    Path(output)
+    if output
+    else RESULTS_DIR / (f'{benchmark}-{datetime.now():%Y%m%d-%H%M%S}.json')
+  )
+  path.parent.mkdir(parents=True, exist_ok=True)
+  payload = {
+    'benchmark': benchmark,
+    'created_at': datetime.now().isoformat(timespec='seconds'),
+    'git_commit': _git_commit(),
+    'python': platform.python_version(),
+    'sqlite': sqlite3.sqlite_version,
+    'params': params,
+    'results': results,
+  }
+  path.write_text(json.dumps(payload, indent=2) + '\n')
+  return path
+
+
+def print_table(results: dict):
+  print(f'{"":<28} {"count":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"/s":>10}')
+  for name, row in results.items():
+    if not row.get('count'):
+      print(f'{name:<28} {0:>8}')
+      continue
+    print(
+      f'{name:<28} {row["count"]:>8} {row["p50_ms"]:>9.2f} {row["p95_ms"]:>9.2f}'
+      f' {row["p99_ms"]:>9.2f} {row["throughput_per_s"]:>10.1f}'
+    )
@@ -0,0 +1,81 @@
+"""Compare le chemin pydantic (from_attributes) et le chemin dicts + orjson.
+
+Usage, depuis backend/ :  python -m benchmarks.serialization [--rows 10000]
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault('database_url', ':memory:')
+os.environ.setdefault('api_key', 'benchmark')
+
+from peewee import SqliteDatabase  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from src.models import Book, User  # noqa: E402
+from src.schemas import BookResponse  # noqa: E402
+from src.services.books_service import books_service  # noqa: E402
+from src.services.serialization import FastJSONResponse  # noqa: E402
+
+
+def seed(rows: int) -> str:
+  database = SqliteDatabase(':memory:')
+  database.bind([User, Book], bind_refs=False, bind_backrefs=False)
+  database.create_tables([User, Book])
+  user = User.create(username='bench', email='bench@bench.com', password='x')
+  with database.atomic():
+    Book.insert_many(
+      [
+        {
+          'user': user.id,
+          'title': f'Book {i:06d}',
+          'author': f'Author {i % 500}',
+          'pages': 100 + i % 400,
+          'current_page': i % 100,
+        }
+        for i in range(rows)
+      ]
+    ).execute()
+  return str(user.id)
+
+
+def schema_path(user: str) -> bytes:
+  # equivalent de response_model=list[BookResponse] dans FastAPI
+  adapter = TypeAdapter(list[BookResponse])
+  books = adapter.validate_python(list(books_service.list(user)), from_attributes=True)
+  return json.dumps(adapter.dump_python(books, mode='json')).encode()
+
+
+def fast_path(user: str) -> bytes:
+  return FastJSONResponse(list(books_service.list_rows(user))).body
+
+
+def timeit(fn, user: str, repeat: int) -> float:
+  best = float('inf')
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn(user)
+    best = min(best, time.perf_counter() - start)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--rows', type=int, default=10_000)
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+
+  user = seed(args.rows)
+  assert json.loads(schema_path(user)) == json.loads(fast_path(user))
+  schema = timeit(schema_path, user, args.repeat)
+  fast = timeit(fast_path, user, args.repeat)
+  print(f'rows: {args.rows}')
+  print(f'pydantic from_attributes: {schema * 1000:.1f} ms')
+  print(f'dicts + orjson:           {fast * 1000:.1f} ms')
+  print(f'speedup:                  x{schema / fast:.1f}')
+
+
+if __name__ == '__main__':
+  main()
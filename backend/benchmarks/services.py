@@ -0,0 +1,128 @@
+"""Microbenchmarks des services et de la serialisation sur des donnees generees.
+
+Usage, depuis backend/ :  python -m benchmarks.services [--rows 100000] [--output x.json]
+"""
+
+import argparse
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from benchmarks.data import generate, open_database
+from benchmarks.results import print_table, summarize, write_results
+from src.models import Book, User, UserStats
+from src.schemas import BookResponse, BookUpdate
+from src.services.books_service import books_service
+from src.services.export_service import export_service
+from src.services.games_service import games_service
+from src.services.media_service import media_service
+from src.services.pagination import DEFAULT_LIMIT, MAX_LIMIT, encode_cursor
+from src.services.search_service import search_service
+from src.services.serialization import FastJSONResponse
+from src.services.stats_service import stats_service
+
+
+def measure(fn, iterations: int, warmup: int = 3) -> dict:
+  for _ in range(warmup):
+    fn()
+  latencies = []
+  for _ in range(iterations):
+    start = time.perf_counter()
+    fn()
+    latencies.append(time.perf_counter() - start)
+  return summarize(latencies)
+
+
+def page_schema(rows: list) -> bytes:
+  # equivalent de response_model=Page[BookResponse] sur des objets peewee
+  adapter = TypeAdapter(list[BookResponse])
+  items = adapter.validate_python(rows, from_attributes=True)
+  return json.dumps({'items': adapter.dump_python(items, mode='json')}).encode()
+
+
+def page_fast(rows: list) -> bytes:
+  return FastJSONResponse({'items': rows}).body
+
+
+def scenarios(user: User, typical: User, book_id: int) -> dict:
+  heavy = str(user.id)
+  middle = (
+    Book.select(Book.title, Book.id)
+    .where(Book.user == user.id)
+    .order_by(Book.title, Book.id)
+    .offset(max(0, UserStats.get_by_id(user.id).books_total // 2))
+    .first()
+  )
+  cursor = encode_cursor(middle.title, middle.id) if middle else None
+  page = list(books_service.list(heavy, MAX_LIMIT))
+  page_rows = list(books_service.list_rows(heavy, MAX_LIMIT))
+  progress = iter(range(1_000_000_000))
+  return {
+    'books.list_rows first page': lambda: list(
+      books_service.list_rows(heavy, DEFAULT_LIMIT + 1)
+    ),
+    'books.list_rows deep page': lambda: list(
+      books_service.list_rows(heavy, DEFAULT_LIMIT + 1, cursor)
+    ),
+    'books.list_rows typical user': lambda: list(
+      books_service.list_rows(str(typical.id), DEFAULT_LIMIT + 1)
+    ),
+    'books.list models': lambda: list(books_service.list(heavy, DEFAULT_LIMIT + 1)),
+    'books.list_all_rows': lambda: list(books_service.list_all_rows(DEFAULT_LIMIT + 1)),
+    'books.get': lambda: books_service.get(book_id, user),
+    'books.etag': lambda: books_service.etag(heavy, 'list', DEFAULT_LIMIT, None),
+    'books.update': lambda: books_service.update(
+      book_id, user, BookUpdate(current_page=next(progress) % 100)
+    ),
+    'games.list_rows first page': lambda: list(
+      games_service.list_rows(heavy, DEFAULT_LIMIT + 1)
+    ),
+    'media.list_rows first page': lambda: list(
+      media_service.list_rows(heavy, DEFAULT_LIMIT + 1)
+    ),
+    # premier morceau : temps avant le premier octet, independant de la taille
+    'books.export first chunk': lambda: next(
+      export_service.stream(Book, BookResponse, 'ndjson', user=user.id)
+    ),
+    'books.export ndjson': lambda: sum(
+      map(len, export_service.stream(Book, BookResponse, 'ndjson', user=user.id))
+    ),
+    'books.export csv gzip': lambda: sum(
+      map(len, export_service.stream(Book, BookResponse, 'csv', True, user=user.id))
+    ),
+    'stats.get': lambda: stats_service.get(heavy),
+    'search.search': lambda: search_service.search(user.id.hex, 'silent gar', 20),
+    f'serialize {MAX_LIMIT} pydantic': lambda: page_schema(page),
+    f'serialize {MAX_LIMIT} orjson': lambda: page_fast(page_rows),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--rows', type=int, default=100_000)
+  parser.add_argument('--seed', type=int, default=42)
+  parser.add_argument('--iterations', type=int, default=200)
+  parser.add_argument('--output', default=None)
+  args = parser.parse_args()
+
+  open_database()
+  dataset = generate(args.rows, seed=args.seed)
+  # utilisateur le plus charge (pire cas) et utilisateur median
+  by_size = UserStats.select().order_by(UserStats.books_total.desc())
+  heavy = User.get_by_id(by_size.first().user_id)
+  typical = User.get_by_id(by_size.offset(len(dataset.users) // 2).first().user_id)
+  book_id = dataset.book_ids[str(heavy.id)][0]
+
+  results = {
+    name: measure(fn, args.iterations)
+    for name, fn in scenarios(heavy, typical, book_id).items()
+  }
+  print(f'rows: {args.rows}, users: {len(dataset.users)}')
+  print_table(results)
+  params = {'rows': args.rows, 'seed': args.seed, 'iterations': args.iterations}
+  print(f'-> {write_results("services", params, results, args.output)}')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from src.config import settings
+
+
+class UserCache:
+  """Cache LRU borne, avec TTL, des tokens deja verifies et de leur utilisateur."""
+
+  def __init__(self, max_size: int, ttl: float):
+    self.max_size = max_size
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, token: str):
+    with self._lock:
+      entry = self._entries.get(token)
+      if entry is not None and entry[0] > time.monotonic():
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[1]
+      if entry is not None:
+        del self._entries[token]
+      self.misses += 1
+      return None
+
+  def set(self, token: str, user, expires_at: float | None = None):
+    ttl = self.ttl
+    if expires_at is not None:
+      # ne jamais garder un token au dela de son exp
+      ttl = min(ttl, expires_at - time.time())
+    if ttl <= 0 or self.max_size <= 0:
+      return
+    with self._lock:
+      self._entries.pop(token, None)
+      self._entries[token] = (time.monotonic() + ttl, user)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+
+  def invalidate_all(self):
+    # ecriture sans utilisateur connu (User.update/delete en requete) : tout relire
+    with self._lock:
+      self._entries.clear()
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+user_cache = UserCache(
+  max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
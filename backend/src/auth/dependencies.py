@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from src.auth.cache import user_cache
 from src.auth.security import decode_access_token
 from src.models import User
 
@@ -9,6 +10,10 @@ security = HTTPBearer()
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
   token = credentials.credentials
+  user = user_cache.get(token)
+  if user is not None:
+    return user
+
   payload = decode_access_token(token)
 
   if not payload:
@@ -23,6 +28,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
   except User.DoesNotExist:
     raise HTTPException(status_code=401, detail='User not found') from None
 
+  user_cache.set(token, user, payload.get('exp'))
   return user
 
 
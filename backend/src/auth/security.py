@@ -1,21 +1,85 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import UTC, datetime, timedelta
 
+from fastapi import HTTPException
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from src.config import settings
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+pwd_context = CryptContext(
+  schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt tourne dans un pool de processus dedie pour ne pas occuper le
+# threadpool d'anyio ; le semaphore borne les taches en cours + en attente
+_password_pool: ProcessPoolExecutor | None = None
+_password_pool_lock = threading.Lock()
+_password_slots = threading.BoundedSemaphore(
+  settings.PASSWORD_POOL_SIZE + settings.PASSWORD_POOL_QUEUE_DEPTH
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
   return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+  plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+  valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+  return valid, new_hash
+
+
 def get_password_hash(password: str) -> str:
   return pwd_context.hash(password)
 
 
+def _get_password_pool() -> ProcessPoolExecutor:
+  global _password_pool
+  with _password_pool_lock:
+    if _password_pool is None:
+      _password_pool = ProcessPoolExecutor(
+        max_workers=settings.PASSWORD_POOL_SIZE,
+        mp_context=multiprocessing.get_context('spawn'),
+      )
+    return _password_pool
+
+
+def shutdown_password_pool():
+  global _password_pool
+  with _password_pool_lock:
+    if _password_pool is not None:
+      _password_pool.shutdown(cancel_futures=True)
+      _password_pool = None
+
+
+async def _run_in_password_pool(fn, *args):
+  if not _password_slots.acquire(blocking=False):
+    raise HTTPException(
+      status_code=503,
+      detail='Too many concurrent logins, retry later',
+      headers={'Retry-After': '1'},
+    )
+  try:
+    future = _get_password_pool().submit(fn, *args)
+    return await asyncio.wrap_future(future)
+  finally:
+    _password_slots.release()
+
+
+async def verify_and_update_password_async(
+  plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+  valid, new_hash = await _run_in_password_pool(
+    verify_and_update_password, plain_password, hashed_password
+  )
+  return valid, new_hash
+
+
 def create_access_token(data: dict):
   to_encode = data.copy()
   expire = datetime.now(UTC) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
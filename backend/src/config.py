@@ -9,6 +9,38 @@ class Settings(BaseSettings):
   SECRET_KEY: str = 'dev-secret-key-change-in-production'
   ALGORITHM: str = 'HS256'
   ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+  AUTH_CACHE_MAX_SIZE: int = 1024
+  AUTH_CACHE_TTL_SECONDS: float = 60
+  BCRYPT_ROUNDS: int = 12
+  PASSWORD_POOL_SIZE: int = 2
+  PASSWORD_POOL_QUEUE_DEPTH: int = 16
+  HTTP_TIMEOUT_SECONDS: float = 10
+  METADATA_CACHE_TTL_SECONDS: float = 60 * 60 * 24 * 7
+  GOOGLE_BOOKS_URL: str = 'https://www.googleapis.com/books/v1'
+  GOOGLE_BOOKS_MAX_CONCURRENCY: int = 4
+  HLTB_MAX_CONCURRENCY: int = 2
+  HLTB_MIN_INTERVAL_SECONDS: float = 1
+  HLTB_NEGATIVE_CACHE_TTL_SECONDS: float = 60 * 60 * 24
+  HLTB_REFRESH_INTERVAL_SECONDS: float = 60 * 60
+  WRITE_BATCH_MAX_SIZE: int = 64
+  WRITE_BATCH_MAX_LATENCY_MS: float = 2
+  JOB_WORKERS: int = 2
+  JOB_POLL_INTERVAL_SECONDS: float = 1
+  JOB_MAX_ATTEMPTS: int = 5
+  JOB_RETRY_BASE_SECONDS: float = 2
+  JOB_RETRY_MAX_SECONDS: float = 60 * 60
+  # bail renouvele pendant l'execution : sans nouvelle depuis plus longtemps,
+  # le worker est mort et le job repris (l'essai compte)
+  JOB_LEASE_SECONDS: float = 2 * 60
+  # fichiers importes, gardes jusqu'a la fin du job d'import
+  IMPORT_DIR: str = 'data/imports'
+  IMPORT_CHUNK_SIZE: int = 500
+  # migrations lancees a part (python -m src.migrations upgrade) ; true en dev
+  AUTO_MIGRATE: bool = False
+  # lecteurs des requetes ; ecriture, workers et taches de fond ont leur connexion
+  DB_READ_POOL_SIZE: int = 8
+  DB_POOL_TIMEOUT_SECONDS: float = 5
+  DB_POOL_STALE_SECONDS: float = 60 * 5
 
 
 settings = Settings()  # type: ignore[call-arg]
@@ -1,10 +1,152 @@
-from peewee import Model
-from playhouse.sqlite_ext import SqliteExtDatabase
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from peewee import Model, _ConnectionLocal, _ConnectionState
+from playhouse.pool import (
+  MaxConnectionsExceeded,
+  PooledDatabase,
+  PooledSqliteExtDatabase,
+)
+from starlette.concurrency import run_in_threadpool
 
 from src.config import settings
+from src.metrics import metrics
+
+
+class _ScopeState(_ConnectionState):
+  def __init__(self, dedicated: bool):
+    self.dedicated = dedicated
+    super().__init__()
+
+
+class _ScopedConnectionState:
+  """Etat de connexion peewee : partage par tous les threads d'un meme scope,
+  thread-local en dehors (demarrage, scripts)."""
+
+  def __init__(self):
+    object.__setattr__(self, '_local', _ConnectionLocal())
+    object.__setattr__(self, '_scoped', ContextVar('db_state', default=None))
+
+  def _current(self):
+    state = self._scoped.get()
+    return self._local if state is None else state
+
+  def __getattr__(self, name):
+    return getattr(self._current(), name)
+
+  def __setattr__(self, name, value):
+    setattr(self._current(), name, value)
+
+
+class MeteredPooledDatabase(PooledSqliteExtDatabase):
+  """Pool de connexions SQLite avec mesure des checkouts, du temps d'attente et
+  du temps passe dans chaque requete SQL.
+
+  Le pool est reserve aux lecteurs ; thread d'ecriture, workers et taches de fond
+  ouvrent un scope dedie, avec sa propre connexion hors du pool."""
+
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self._state = _ScopedConnectionState()
+    self._metrics_lock = threading.Lock()
+    self._dedicated: set[int] = set()
+    self.checkouts = 0
+    self.timeouts = 0
+    self.wait_seconds_total = 0.0
+    self.wait_seconds_max = 0.0
+
+  def _connect(self):
+    if not getattr(self._state, 'dedicated', False):
+      return super()._connect()
+    # ni compte dans max_connections ni rendu au pool
+    conn = super(PooledDatabase, self)._connect()
+    with self._metrics_lock:
+      self._dedicated.add(self.conn_key(conn))
+    return conn
+
+  def _close(self, conn, close_conn=False):
+    key = self.conn_key(conn)
+    if key not in self._dedicated:
+      return super()._close(conn, close_conn)
+    with self._metrics_lock:
+      self._dedicated.discard(key)
+    return super(PooledDatabase, self)._close(conn)
+
+  def connect(self, reuse_if_open=False):
+    if getattr(self._state, 'dedicated', False):
+      return super().connect(reuse_if_open)
+    start = time.perf_counter()
+    try:
+      opened = super().connect(reuse_if_open)
+    except MaxConnectionsExceeded:
+      with self._metrics_lock:
+        self.timeouts += 1
+      raise
+    if opened:
+      waited = time.perf_counter() - start
+      with self._metrics_lock:
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+    return opened
 
-db = SqliteExtDatabase(
+  def execute_sql(self, sql, params=None, commit=None):
+    start = time.perf_counter()
+    try:
+      return super().execute_sql(sql, params)
+    finally:
+      metrics.observe_query(time.perf_counter() - start)
+
+  @contextmanager
+  def connection_scope(self, dedicated: bool = False):
+    # une connexion pour tout le scope, ouverte a la premiere requete, rendue au
+    # pool a la sortie ; dediee : hors du pool, fermee a la sortie
+    token = self._state._scoped.set(_ScopeState(dedicated))
+    try:
+      yield
+    finally:
+      try:
+        self.release()
+      finally:
+        self._state._scoped.reset(token)
+
+  def release(self):
+    # connexion du scope courant rendue tout de suite, rouverte si une requete suit
+    if not self.is_closed():
+      self.close()
+
+  async def run_in_scope(self, fn, *args, **kwargs):
+    """run_in_threadpool avec une connexion a soi, rendue au retour : rien n'est
+    tenu pendant les await de l'appelant, ni partage avec ses autres appels."""
+    return await run_in_threadpool(self._call_in_scope, fn, *args, **kwargs)
+
+  def _call_in_scope(self, fn, *args, **kwargs):
+    with self.connection_scope():
+      return fn(*args, **kwargs)
+
+  def pool_stats(self) -> dict:
+    return {
+      'max_connections': self._max_connections,
+      'in_use': len(self._in_use),
+      'idle': len(self._connections),
+      'dedicated': len(self._dedicated),
+      'checkouts': self.checkouts,
+      'timeouts': self.timeouts,
+      'wait_seconds_total': self.wait_seconds_total,
+      'wait_seconds_max': self.wait_seconds_max,
+    }
+
+
+db = MeteredPooledDatabase(
   settings.database_url,
+  # lecteurs seulement : thread d'ecriture et workers ont leur connexion dediee
+  max_connections=settings.DB_READ_POOL_SIZE,
+  stale_timeout=settings.DB_POOL_STALE_SECONDS,
+  timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+  # une connexion de scope passe d'un thread du threadpool a l'autre
+  check_same_thread=False,
   pragmas={
     'journal_mode': 'wal',
     'cache_size': -1024 * 64,
@@ -15,6 +157,46 @@ db = SqliteExtDatabase(
 )
 
 
+def dedicated_connection(database):
+  """Scope dedie pour un thread au long cours (ecriture, workers) ; une autre base
+  (tests) garde la connexion du thread, fermee seulement si ouverte ici."""
+  if isinstance(database, MeteredPooledDatabase):
+    return database.connection_scope(dedicated=True)
+  return _thread_connection(database)
+
+
+@contextmanager
+def _thread_connection(database):
+  opened = database.connect(reuse_if_open=True)
+  try:
+    yield
+  finally:
+    if opened:
+      database.close()
+
+
+class ConnectionScopeMiddleware:
+  """Middleware ASGI : une connexion lecteur par requete, rendue au pool des que
+  la reponse commence ; un envoi lent ou en flux ne tient aucune connexion."""
+
+  def __init__(self, app, database: MeteredPooledDatabase = db):
+    self.app = app
+    self.database = database
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] != 'http':
+      await self.app(scope, receive, send)
+      return
+
+    async def send_released(message):
+      if message['type'] == 'http.response.start':
+        self.database.release()
+      await send(message)
+
+    with self.database.connection_scope():
+      await self.app(scope, receive, send_released)
+
+
 class BaseModel(Model):
   class Meta:
     database = db
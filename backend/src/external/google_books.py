@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+from fastapi import HTTPException
+
+from src.config import settings
+from src.database import db
+from src.models.works import normalize_isbn
+from src.schemas.books import BookBase
+from src.services.metadata_cache import MISSING, get_cached, set_cached
+
+SOURCE = 'google_books'
+
+
+def volume_to_book(volume: dict) -> BookBase:
+  info = volume.get('volumeInfo', {})
+  identifiers = {
+    i.get('type'): i.get('identifier') for i in info.get('industryIdentifiers', [])
+  }
+  return BookBase(
+    title=info.get('title', ''),
+    author=', '.join(info.get('authors', [])) or None,
+    pages=info.get('pageCount'),
+    isbn=identifiers.get('ISBN_13') or identifiers.get('ISBN_10'),
+    google_books_id=volume.get('id'),
+    cover_url=info.get('imageLinks', {}).get('thumbnail'),
+  )
+
+
+class GoogleBooksClient:
+  def __init__(
+    self,
+    base_url: str,
+    api_key: str | None,
+    max_concurrency: int,
+    cache_ttl: float,
+    transport: httpx.AsyncBaseTransport | None = None,
+  ):
+    self.base_url = base_url
+    self.api_key = api_key
+    self.max_concurrency = max_concurrency
+    self.cache_ttl = cache_ttl
+    self.transport = transport
+    self.upstream_calls = 0
+    self._loop: asyncio.AbstractEventLoop | None = None
+    self._client: httpx.AsyncClient | None = None
+    self._semaphore: asyncio.Semaphore
+    self._inflight: dict[str, asyncio.Future] = {}
+
+  def _bind_loop(self):
+    # client, semaphore et futures sont lies a la boucle qui les a crees
+    loop = asyncio.get_running_loop()
+    if self._loop is not loop:
+      self._loop = loop
+      self._client = httpx.AsyncClient(
+        base_url=self.base_url,
+        timeout=settings.HTTP_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+          max_connections=self.max_concurrency,
+          max_keepalive_connections=self.max_concurrency,
+        ),
+        transport=self.transport,
+      )
+      self._semaphore = asyncio.Semaphore(self.max_concurrency)
+      self._inflight = {}
+
+  async def aclose(self):
+    if self._client is not None:
+      await self._client.aclose()
+    self._client = None
+    self._loop = None
+
+  async def lookup(
+    self, isbn: str | None = None, google_books_id: str | None = None
+  ) -> BookBase | None:
+    # meme forme que le catalogue : 978-0-... et 9780... partagent cache et appel
+    isbn = normalize_isbn(isbn)
+    if google_books_id:
+      key, path, params = f'id:{google_books_id}', f'/volumes/{google_books_id}', {}
+    elif isbn:
+      key, path, params = f'isbn:{isbn}', '/volumes', {'q': f'isbn:{isbn}'}
+    else:
+      raise ValueError('isbn or google_books_id is required')
+
+    self._bind_loop()
+    cached = await db.run_in_scope(get_cached, SOURCE, key)
+    if cached is not MISSING:
+      return None if cached is None else BookBase(**cached)
+
+    # requetes identiques simultanees : un seul appel a Google Books
+    future = self._inflight.get(key)
+    if future is None:
+      future = asyncio.ensure_future(self._fetch(key, path, params))
+      self._inflight[key] = future
+      future.add_done_callback(lambda done: self._forget(key, done))
+    return await asyncio.shield(future)
+
+  def _forget(self, key: str, future: asyncio.Future):
+    if self._inflight.get(key) is future:
+      del self._inflight[key]
+
+  async def _fetch(self, key: str, path: str, params: dict) -> BookBase | None:
+    assert self._client is not None
+    if self.api_key:
+      params = {**params, 'key': self.api_key}
+    async with self._semaphore:
+      self.upstream_calls += 1
+      try:
+        response = await self._client.get(path, params=params)
+      except httpx.HTTPError:
+        raise HTTPException(
+          status_code=502, detail='Google Books unavailable'
+        ) from None
+    if response.status_code == 404:
+      volume = None
+    elif response.is_success:
+      data = response.json()
+      volume = data if 'volumeInfo' in data else next(iter(data.get('items', [])), None)
+    else:
+      raise HTTPException(status_code=502, detail='Google Books unavailable')
+
+    book = None if volume is None else volume_to_book(volume)
+    payload = None if book is None else book.model_dump()
+    await db.run_in_scope(set_cached, SOURCE, key, payload, self.cache_ttl)
+    return book
+
+
+google_books = GoogleBooksClient(
+  base_url=settings.GOOGLE_BOOKS_URL,
+  api_key=settings.api_key,
+  max_concurrency=settings.GOOGLE_BOOKS_MAX_CONCURRENCY,
+  cache_ttl=settings.METADATA_CACHE_TTL_SECONDS,
+)
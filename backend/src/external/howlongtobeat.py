@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.config import settings
+from src.database import db
+from src.jobs import job_queue
+from src.models import Game, MetadataCache, Work
+from src.models.works import game_key
+from src.services.metadata_cache import MISSING, get_cached, set_cached
+from src.write_queue import write_queue
+
+SOURCE = 'howlongtobeat'
+ENRICH_JOB = 'hltb.enrich'
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(title: str, platform: str | None) -> str:
+  # cle du cache et de la fiche Work du jeu
+  return game_key(title, platform)
+
+
+class HowLongToBeatScraper:
+  """Client par defaut, base sur howlongtobeatpy (scraping du site)."""
+
+  async def search(self, title: str, platform: str | None) -> float | None:
+    from howlongtobeatpy import HowLongToBeat
+
+    entries = await HowLongToBeat().async_search(title) or []
+    if platform:
+      on_platform = [
+        e
+        for e in entries
+        if platform.lower() in (p.lower() for p in e.profile_platforms or [])
+      ]
+      entries = on_platform or entries
+    best = max(entries, key=lambda e: e.similarity, default=None)
+    if best is None or not best.main_story:
+      return None
+    return float(best.main_story)
+
+
+class HowLongToBeatService:
+  def __init__(
+    self,
+    scraper: HowLongToBeatScraper,
+    max_concurrency: int,
+    min_interval: float,
+    cache_ttl: float,
+    negative_cache_ttl: float,
+  ):
+    self.scraper = scraper
+    self.max_concurrency = max_concurrency
+    self.min_interval = min_interval
+    self.cache_ttl = cache_ttl
+    self.negative_cache_ttl = negative_cache_ttl
+    self.upstream_calls = 0
+    # une boucle par worker de la file de jobs, plus celle de l'API
+    self._semaphores: weakref.WeakKeyDictionary[
+      asyncio.AbstractEventLoop, asyncio.Semaphore
+    ] = weakref.WeakKeyDictionary()
+    self._throttle = threading.Lock()
+    self._last_call = 0.0
+
+  def _semaphore(self) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in self._semaphores:
+      self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+    return self._semaphores[loop]
+
+  def _reserve_slot(self) -> float:
+    # au plus un appel toutes les min_interval secondes vers le site, tous threads
+    # confondus : chaque appelant reserve son creneau et attend son tour
+    with self._throttle:
+      now = time.monotonic()
+      slot = max(now, self._last_call + self.min_interval)
+      self._last_call = slot
+    return slot - now
+
+  async def _scrape(self, title: str, platform: str | None) -> float | None:
+    async with self._semaphore():
+      wait = self._reserve_slot()
+      if wait > 0:
+        await asyncio.sleep(wait)
+      self.upstream_calls += 1
+      return await self.scraper.search(title, platform)
+
+  async def resolve(self, title: str, platform: str | None, refresh: bool = False):
+    key = cache_key(title, platform)
+    if not refresh:
+      cached = await run_in_threadpool(get_cached, SOURCE, key)
+      if cached is not MISSING:
+        return None if cached is None else cached['completion_time']
+
+    completion_time = await self._scrape(title, platform)
+    if completion_time is None:
+      await run_in_threadpool(set_cached, SOURCE, key, None, self.negative_cache_ttl)
+    else:
+      payload = {'completion_time': completion_time}
+      await run_in_threadpool(set_cached, SOURCE, key, payload, self.cache_ttl)
+    return completion_time
+
+  async def enrich_game(self, game_id: int):
+    # job ENRICH_JOB, lance apres la creation : une erreur est retentee par la file
+    game = await run_in_threadpool(Game.get_or_none, Game.id == game_id)
+    if game is None or game.completion_time is not None:
+      return
+    completion_time = await self.resolve(game.title, game.platform)
+    if completion_time is not None:
+      key = cache_key(game.title, game.platform)
+      await run_in_threadpool(
+        write_queue.run, self._fill_games, key, completion_time, game_id
+      )
+
+  async def refresh_stale(self, limit: int = 50) -> int:
+    # titre et plateforme saisis, lus sur la fiche Work : la cle est normalisee
+    stale = await run_in_threadpool(
+      lambda: list(
+        MetadataCache.select(MetadataCache.key, Work.title, Work.platform)
+        .join(Work, on=(Work.hltb_key == MetadataCache.key))
+        .where(
+          MetadataCache.source == SOURCE, MetadataCache.expires_at <= datetime.now()
+        )
+        .order_by(MetadataCache.expires_at)
+        .limit(limit)
+        .tuples()
+      )
+    )
+    for key, title, platform in stale:
+      try:
+        completion_time = await self.resolve(title, platform, refresh=True)
+      except Exception:
+        logger.exception('HowLongToBeat refresh failed for %s', key)
+        continue
+      if completion_time is not None:
+        await run_in_threadpool(write_queue.run, self._fill_games, key, completion_time)
+    return len(stale)
+
+  def _fill_games(self, key: str, completion_time: float, game_id: int | None = None):
+    # thread d'ecriture ; une duree par oeuvre, recopiee dans les jeux de tous les
+    # utilisateurs
+    work = Work.select(Work.id).where(Work.hltb_key == key)
+    with db.atomic():
+      Work.update(completion_time=completion_time, updated_at=datetime.now()).where(
+        Work.hltb_key == key
+      ).execute()
+      linked = Game.work.in_(work)
+      if game_id is not None:
+        # jeu pas encore rattache au catalogue
+        linked |= Game.id == game_id
+      Game.update(completion_time=completion_time).where(
+        linked, Game.completion_time.is_null()
+      ).execute()
+
+  async def refresh_loop(self, interval: float):
+    while True:
+      await asyncio.sleep(interval)
+      try:
+        # connexion dediee : les scrapings espaces ne tiennent pas un lecteur du pool
+        with db.connection_scope(dedicated=True):
+          await self.refresh_stale()
+      except Exception:
+        logger.exception('HowLongToBeat refresh loop failed')
+
+
+howlongtobeat = HowLongToBeatService(
+  scraper=HowLongToBeatScraper(),
+  max_concurrency=settings.HLTB_MAX_CONCURRENCY,
+  min_interval=settings.HLTB_MIN_INTERVAL_SECONDS,
+  cache_ttl=settings.METADATA_CACHE_TTL_SECONDS,
+  negative_cache_ttl=settings.HLTB_NEGATIVE_CACHE_TTL_SECONDS,
+)
+job_queue.register(ENRICH_JOB, howlongtobeat.enrich_game)
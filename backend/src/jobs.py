@@ -0,0 +1,318 @@
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from contextlib import nullcontext
+from contextvars import copy_context
+from datetime import datetime, timedelta
+
+from src.config import settings
+from src.database import dedicated_connection
+from src.models.jobs import Job
+from src.write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+  """File de travaux persistee dans la table jobs : des threads workers executent
+  les handlers enregistres, avec priorite, nouvel essai differe et cle d'idempotence.
+
+  Les ecritures sur la table passent par le thread d'ecriture ; les handlers
+  tournent hors de toute transaction et peuvent etre synchrones ou async. Un job
+  en cours renouvelle son bail : seul un worker mort le laisse expirer."""
+
+  def __init__(
+    self,
+    workers: int,
+    poll_interval: float,
+    max_attempts: int,
+    retry_base: float,
+    retry_max: float,
+    lease: float,
+  ):
+    self.workers = workers
+    self.poll_interval = poll_interval
+    self.max_attempts = max_attempts
+    self.retry_base = retry_base
+    self.retry_max = retry_max
+    self.lease = lease
+    self.completed = 0
+    self.failed = 0
+    self.retried = 0
+    self._handlers: dict[str, Callable] = {}
+    self._fatal: dict[str, tuple[type[Exception], ...]] = {}
+    self._on_failed: dict[str, Callable] = {}
+    self._threads: list[threading.Thread] = []
+    self._heartbeat_thread: threading.Thread | None = None
+    self._running: set[int] = set()
+    self._running_lock = threading.Lock()
+    self._wake = threading.Event()
+    self._stopping = threading.Event()
+    self._current = threading.local()
+    self._database = None
+    self._requeue_at = 0.0
+
+  def register(
+    self,
+    kind: str,
+    handler: Callable,
+    *,
+    fatal: tuple[type[Exception], ...] = (),
+    on_failed: Callable | None = None,
+  ):
+    # fatal : erreurs qu'un nouvel essai ne corrigera pas, echec immediat ;
+    # on_failed(**payload) : nettoyage apres l'echec definitif
+    self._handlers[kind] = handler
+    self._fatal[kind] = fatal
+    if on_failed is not None:
+      self._on_failed[kind] = on_failed
+
+  def start(self, database):
+    if self._threads:
+      return
+    self._database = database
+    self._stopping.clear()
+    # jobs interrompus par un arret brutal : a reprendre
+    self._requeue_if_due()
+    for i in range(self.workers):
+      thread = threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True)
+      thread.start()
+      self._threads.append(thread)
+    self._heartbeat_thread = threading.Thread(
+      target=self._heartbeat, name='job-heartbeat', daemon=True
+    )
+    self._heartbeat_thread.start()
+
+  def stop(self):
+    # le job en cours se termine, les suivants attendent le prochain demarrage
+    self._stopping.set()
+    self._wake.set()
+    for thread in self._threads:
+      thread.join()
+    self._threads = []
+    if self._heartbeat_thread is not None:
+      self._heartbeat_thread.join()
+      self._heartbeat_thread = None
+
+  def enqueue(
+    self,
+    kind: str,
+    payload: dict | None = None,
+    *,
+    user=None,
+    priority: int = 0,
+    delay: float = 0,
+    key: str | None = None,
+    max_attempts: int | None = None,
+  ) -> Job:
+    if kind not in self._handlers:
+      raise LookupError(f'No handler registered for job {kind!r}')
+    row = {
+      'kind': kind,
+      'payload': json.dumps(payload or {}),
+      'user': user,
+      'priority': priority,
+      'run_at': datetime.now() + timedelta(seconds=delay),
+      'idempotency_key': key,
+      'max_attempts': max_attempts or self.max_attempts,
+    }
+    job: Job = write_queue.run(self._insert, row)
+    self._wake.set()
+    return job
+
+  def current_job(self) -> Job | None:
+    # job en cours dans ce thread : un handler y retrouve son id et son result
+    return getattr(self._current, 'job', None)
+
+  def run_pending(self, limit: int | None = None) -> int:
+    # sans workers (tests, scripts) : execute les jobs echus dans le thread appelant
+    done = 0
+    with asyncio.Runner() as runner:
+      while limit is None or done < limit:
+        job = write_queue.run(self._claim)
+        if job is None:
+          break
+        self._execute(job, runner)
+        done += 1
+    return done
+
+  def _loop(self):
+    # une boucle d'evenements par worker pour les handlers async
+    with asyncio.Runner() as runner:
+      while not self._stopping.is_set():
+        try:
+          self._requeue_if_due()
+          job = write_queue.run(self._claim)
+          if job is not None:
+            self._execute(job, runner)
+            continue
+        except Exception:
+          # base verrouillee, disque plein... : le worker survit, un job laisse
+          # running est repris a l'expiration de son bail
+          logger.exception('Job worker iteration failed')
+        self._wake.wait(self.poll_interval)
+        self._wake.clear()
+
+  def _heartbeat(self):
+    # un seul renouvellement groupe pour tous les jobs en cours, trois fois par bail
+    while not self._stopping.wait(self.lease / 3):
+      with self._running_lock:
+        running = list(self._running)
+      if not running:
+        continue
+      try:
+        write_queue.run(self._extend_leases, running)
+      except Exception:
+        logger.exception('Job lease renewal failed')
+
+  def _connection(self):
+    # connexion dediee, hors du pool des lecteurs, le temps d'un job seulement
+    if self._database is None:
+      return nullcontext()
+    return dedicated_connection(self._database)
+
+  def _execute(self, job: Job, runner: asyncio.Runner):
+    self._current.job = job
+    with self._running_lock:
+      self._running.add(job.id)
+    try:
+      with self._connection():
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+          raise LookupError(f'No handler registered for job {job.kind!r}')
+        result = handler(**json.loads(job.payload))
+        if inspect.iscoroutine(result):
+          # contexte copie ici : le scope suit le handler jusqu'a ses threads
+          result = runner.run(result, context=copy_context())
+    except Exception as e:
+      logger.exception('Job %s (%s) failed, attempt %s', job.id, job.kind, job.attempts)
+      fatal = isinstance(e, self._fatal.get(job.kind, ()))
+      if write_queue.run(self._fail, job, f'{type(e).__name__}: {e}', fatal):
+        self._failed(job)
+      return
+    finally:
+      self._current.job = None
+      with self._running_lock:
+        self._running.discard(job.id)
+    write_queue.run(self._finish, job, result)
+
+  def _insert(self, row: dict) -> Job:
+    # meme cle : le job deja connu est rendu, quel que soit son statut
+    if row['idempotency_key'] is not None:
+      existing: Job | None = Job.get_or_none(
+        Job.idempotency_key == row['idempotency_key']
+      )
+      if existing is not None:
+        return existing
+    job: Job = Job.create(**row)
+    return job
+
+  def _claim(self) -> Job | None:
+    now = datetime.now()
+    job: Job | None = (
+      Job.select()
+      .where(Job.status == 'queued', Job.run_at <= now)
+      .order_by(Job.priority.desc(), Job.run_at, Job.id)
+      .first()
+    )
+    if job is None:
+      return None
+    # un autre worker ou processus a pu le prendre entre-temps
+    claimed = (
+      Job.update(
+        status='running', attempts=Job.attempts + 1, started_at=now, heartbeat_at=now
+      )
+      .where(Job.id == job.id, Job.status == 'queued')
+      .execute()
+    )
+    if not claimed:
+      return None
+    job.status, job.attempts = 'running', job.attempts + 1
+    job.started_at = job.heartbeat_at = now
+    return job
+
+  def _extend_leases(self, job_ids: list[int]):
+    Job.update(heartbeat_at=datetime.now()).where(
+      Job.id.in_(job_ids), Job.status == 'running'
+    ).execute()
+
+  def _finish(self, job: Job, result):
+    Job.update(
+      status='done',
+      result=None if result is None else json.dumps(result),
+      finished_at=datetime.now(),
+    ).where(Job.id == job.id).execute()
+    self.completed += 1
+
+  def _failed(self, job: Job):
+    on_failed = self._on_failed.get(job.kind)
+    if on_failed is None:
+      return
+    try:
+      on_failed(**json.loads(job.payload))
+    except Exception:
+      logger.exception('Cleanup of failed job %s (%s) failed', job.id, job.kind)
+
+  def _fail(self, job: Job, error: str, fatal: bool = False) -> bool:
+    # True si le job est en echec definitif
+    now = datetime.now()
+    if not fatal and job.attempts < job.max_attempts:
+      # backoff exponentiel : base, 2 x base, 4 x base... plafonne
+      delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+      changes = {'status': 'queued', 'run_at': now + timedelta(seconds=delay)}
+      self.retried += 1
+    else:
+      changes = {'status': 'failed', 'finished_at': now}
+      self.failed += 1
+    Job.update(last_error=error, **changes).where(Job.id == job.id).execute()
+    return changes['status'] == 'failed'
+
+  def _requeue_if_due(self):
+    # au demarrage puis au plus une fois par bail, quel que soit le worker
+    now = time.monotonic()
+    if now < self._requeue_at:
+      return
+    self._requeue_at = now + self.lease
+    for job in write_queue.run(self._requeue_expired):
+      self._failed(job)
+
+  def _requeue_expired(self) -> list[Job]:
+    # bail non renouvele : worker mort (arret brutal, autre processus) ; un job
+    # encore en cours chez un worker vivant garde son bail. L'essai perdu compte :
+    # un job qui fait tomber son worker a chaque fois finit en echec
+    now = datetime.now()
+    expired = (Job.status == 'running') & (
+      Job.heartbeat_at < now - timedelta(seconds=self.lease)
+    )
+    failed = list(Job.select().where(expired, Job.attempts >= Job.max_attempts))
+    if failed:
+      Job.update(status='failed', finished_at=now, last_error='Lease expired').where(
+        Job.id.in_([job.id for job in failed])
+      ).execute()
+      self.failed += len(failed)
+    self.retried += (
+      Job.update(status='queued', last_error='Lease expired').where(expired).execute()
+    )
+    return failed
+
+  def stats(self) -> dict:
+    return {
+      'workers': len(self._threads),
+      'completed': self.completed,
+      'retried': self.retried,
+      'failed': self.failed,
+    }
+
+
+job_queue = JobQueue(
+  workers=settings.JOB_WORKERS,
+  poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+  max_attempts=settings.JOB_MAX_ATTEMPTS,
+  retry_base=settings.JOB_RETRY_BASE_SECONDS,
+  retry_max=settings.JOB_RETRY_MAX_SECONDS,
+  lease=settings.JOB_LEASE_SECONDS,
+)
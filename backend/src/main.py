@@ -1,21 +1,60 @@
-from contextlib import asynccontextmanager
-
-from fastapi import APIRouter, FastAPI, HTTPException, Request
-
-from src.auth.security import create_access_token, verify_password
-from src.database import db
-from src.models import Book, Game, User
-from src.routers import books, games, users
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from playhouse.pool import MaxConnectionsExceeded
+
+from src.auth.cache import user_cache
+from src.auth.dependencies import get_current_user
+from src.auth.security import (
+  create_access_token,
+  shutdown_password_pool,
+  verify_and_update_password_async,
+)
+from src.config import settings
+from src.database import ConnectionScopeMiddleware, db
+from src.external.google_books import google_books
+from src.external.howlongtobeat import howlongtobeat
+from src.jobs import job_queue
+from src.metrics import MetricsMiddleware, metrics
+from src.migrations import check_schema_version, migrate
+from src.models import User
+from src.routers import books, games, jobs, media, progress, search, sync, users
 from src.schemas.auth import LoginRequest, TokenResponse
+from src.schemas.stats import UserStatsResponse
+from src.services.stats_service import stats_service
+from src.write_queue import write_queue
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-  # Startup: create tables
-  db.create_tables([User, Book, Game])
-  yield
-  # Shutdown: close database
+  # Startup: verification de la version du schema, migree a part par defaut
+  if settings.AUTO_MIGRATE:
+    migrate(db)
+  check_schema_version(db)
+  # la connexion de demarrage retourne au pool
   db.close()
+  # Startup: single writer thread, group-committing service writes
+  write_queue.start(db)
+  # Startup: job workers, reprise des jobs en attente ou interrompus
+  job_queue.start(db)
+  # Startup: refresh stale HowLongToBeat entries in the background
+  hltb_refresh = asyncio.create_task(
+    howlongtobeat.refresh_loop(settings.HLTB_REFRESH_INTERVAL_SECONDS)
+  )
+  yield
+  # Shutdown: stop background tasks, password workers, http clients and close database
+  hltb_refresh.cancel()
+  with suppress(asyncio.CancelledError):
+    await hltb_refresh
+  shutdown_password_pool()
+  await google_books.aclose()
+  # les workers ecrivent via le thread d'ecriture : arretes avant lui
+  await run_in_threadpool(job_queue.stop)
+  await run_in_threadpool(write_queue.stop)
+  db.close_all()
 
 
 app = FastAPI(
@@ -25,6 +64,17 @@ app = FastAPI(
   debug=True,
   lifespan=lifespan,
 )
+app.add_middleware(ConnectionScopeMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(MaxConnectionsExceeded)
+def database_pool_exhausted(request: Request, exc: MaxConnectionsExceeded):
+  return JSONResponse(
+    status_code=503,
+    content={'detail': 'Database busy, retry later'},
+    headers={'Retry-After': '1'},
+  )
 
 
 # Route
@@ -33,32 +83,69 @@ def health():
   return {'status': 'OK'}
 
 
+# Metrics (format texte Prometheus)
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+  gauges = [
+    *(
+      (f'mediapace_db_pool_{name}', f'Database pool {name}.', value)
+      for name, value in db.pool_stats().items()
+    ),
+    *(
+      (f'mediapace_auth_cache_{name}', f'Auth cache {name}.', value)
+      for name, value in user_cache.stats().items()
+    ),
+    *(
+      (f'mediapace_write_queue_{name}', f'Write queue {name}.', value)
+      for name, value in write_queue.stats().items()
+    ),
+    *(
+      (f'mediapace_jobs_{name}', f'Jobs {name}.', value)
+      for name, value in job_queue.stats().items()
+    ),
+  ]
+  return PlainTextResponse(
+    metrics.render(gauges), media_type='text/plain; version=0.0.4'
+  )
+
+
 # Login
 @app.post('/login', response_model=TokenResponse)
-def login(credentials: LoginRequest):
-  try:
-    user = User.get(User.email == credentials.email)
-  except User.DoesNotExist:
-    raise HTTPException(status_code=401, detail='Invalid credentials') from None
+async def login(credentials: LoginRequest):
+  user = await db.run_in_scope(User.get_or_none, User.email == credentials.email)
+  if user is None:
+    raise HTTPException(status_code=401, detail='Invalid credentials')
 
-  if not verify_password(credentials.password, user.password):
+  valid, new_hash = await verify_and_update_password_async(
+    credentials.password, user.password
+  )
+  if not valid:
     raise HTTPException(status_code=401, detail='Invalid credentials')
 
-  token = create_access_token({'sub': user.id})
+  if new_hash:
+    # parametres bcrypt modifies : on re-hash avec le mot de passe en clair
+    user.password = new_hash
+    await db.run_in_scope(write_queue.run, user.save)
+
+  token = create_access_token({'sub': str(user.id)})
   return {'access_token': token, 'token_type': 'bearer'}
 
 
 # Dashboard
-@app.get('/dashboard')
-def dashboard(request: Request):
-  # @todo: implement dashboard
-  return {'message': 'Welcome to the dashboard'}
+@app.get('/dashboard', response_model=UserStatsResponse)
+def dashboard(current_user: User = Depends(get_current_user)):
+  return stats_service.get(current_user.id)
 
 
 # Routers
 api_router = APIRouter(prefix='/api')
 api_router.include_router(books.router)
 api_router.include_router(games.router)
+api_router.include_router(jobs.router)
+api_router.include_router(media.router)
+api_router.include_router(progress.router)
+api_router.include_router(search.router)
+api_router.include_router(sync.router)
 api_router.include_router(users.router)
 
 app.include_router(api_router)
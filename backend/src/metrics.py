@@ -0,0 +1,209 @@
+import re
+import threading
+import time
+from collections.abc import Iterable
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# compteur SQL de la requete en cours, partage avec les threads du threadpool
+_request_sql: ContextVar[list | None] = ContextVar('request_sql', default=None)
+
+
+def _escape(value: str) -> str:
+  return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple[str, ...], values: tuple, **extra) -> str:
+  pairs = [*zip(names, values, strict=True), *extra.items()]
+  if not pairs:
+    return ''
+  return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + '}'
+
+
+def _number(value: float) -> str:
+  if value == float('inf'):
+    return '+Inf'
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def route_template(scope) -> str:
+  # gabarit de la route (/api/books/{book_id}) plutot que l'url : cardinalite bornee.
+  # Le chemin de la route peut etre relatif a son routeur inclus : on recupere le
+  # prefixe dans le chemin concret.
+  route = scope.get('route')
+  regex = getattr(route, 'path_regex', None)
+  if regex is None:
+    return '<unmatched>'
+  match = re.search(regex.pattern.lstrip('^'), scope['path'])
+  prefix = scope['path'][: match.start()] if match else ''
+  return f'{prefix}{route.path}'
+
+
+class Histogram:
+  def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple):
+    self.name = name
+    self.help = help
+    self.labels = labels
+    self.buckets = (*buckets, float('inf'))
+    self._series: dict[tuple, list] = {}
+
+  def observe(self, value: float, *labels):
+    # [compteurs par bucket..., somme, nombre]
+    series = self._series.get(labels)
+    if series is None:
+      series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+    for i, bound in enumerate(self.buckets):
+      if value <= bound:
+        series[i] += 1
+    series[-2] += value
+    series[-1] += 1
+
+  def render(self) -> Iterable[str]:
+    yield f'# HELP {self.name} {self.help}'
+    yield f'# TYPE {self.name} histogram'
+    for labels, series in sorted(self._series.items()):
+      for bound, count in zip(self.buckets, series, strict=False):
+        le = _labels(self.labels, labels, le=_number(bound))
+        yield f'{self.name}_bucket{le} {count}'
+      yield f'{self.name}_sum{_labels(self.labels, labels)} {_number(series[-2])}'
+      yield f'{self.name}_count{_labels(self.labels, labels)} {series[-1]}'
+
+
+class Counter:
+  def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+    self.name = name
+    self.help = help
+    self.labels = labels
+    self._series: dict[tuple, float] = {}
+
+  def inc(self, amount: float = 1, *labels):
+    self._series[labels] = self._series.get(labels, 0) + amount
+
+  def render(self) -> Iterable[str]:
+    yield f'# HELP {self.name} {self.help}'
+    yield f'# TYPE {self.name} counter'
+    for labels, value in sorted(self._series.items()):
+      yield f'{self.name}{_labels(self.labels, labels)} {_number(value)}'
+
+
+class Metrics:
+  """Registre de metriques en memoire, rendu au format texte Prometheus."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.in_flight = 0
+    route = ('method', 'route')
+    self.requests = Counter(
+      'mediapace_http_requests_total', 'HTTP requests.', (*route, 'status')
+    )
+    self.latency = Histogram(
+      'mediapace_http_request_duration_seconds',
+      'HTTP request latency.',
+      route,
+      LATENCY_BUCKETS,
+    )
+    self.response_size = Histogram(
+      'mediapace_http_response_size_bytes',
+      'HTTP response body size.',
+      route,
+      SIZE_BUCKETS,
+    )
+    self.request_queries = Histogram(
+      'mediapace_http_request_sql_queries',
+      'SQL queries issued per HTTP request.',
+      route,
+      QUERY_BUCKETS,
+    )
+    self.request_sql_time = Histogram(
+      'mediapace_http_request_sql_seconds',
+      'Time spent in SQL per HTTP request.',
+      route,
+      LATENCY_BUCKETS,
+    )
+    self.queries = Counter('mediapace_sql_queries_total', 'SQL queries executed.')
+    self.sql_time = Counter('mediapace_sql_seconds_total', 'Time spent in SQL.')
+
+  def observe_query(self, seconds: float):
+    with self._lock:
+      self.queries.inc(1)
+      self.sql_time.inc(seconds)
+    sql = _request_sql.get()
+    if sql is not None:
+      sql[0] += 1
+      sql[1] += seconds
+
+  def render(self, gauges: Iterable[tuple[str, str, float]] = ()) -> str:
+    # gauges : (nom, aide, valeur) fournis par les autres composants
+    with self._lock:
+      lines = [
+        '# HELP mediapace_http_requests_in_flight HTTP requests being served.',
+        '# TYPE mediapace_http_requests_in_flight gauge',
+        f'mediapace_http_requests_in_flight {self.in_flight}',
+      ]
+      for metric in (
+        self.requests,
+        self.latency,
+        self.response_size,
+        self.request_queries,
+        self.request_sql_time,
+        self.queries,
+        self.sql_time,
+      ):
+        lines.extend(metric.render())
+    for name, help, value in gauges:
+      lines += [
+        f'# HELP {name} {help}',
+        f'# TYPE {name} gauge',
+        f'{name} {_number(value)}',
+      ]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+  """Middleware ASGI : latence, taille de reponse, requetes en cours et SQL par
+  route."""
+
+  def __init__(self, app, registry: Metrics | None = None):
+    self.app = app
+    self.registry = registry or metrics
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] != 'http':
+      await self.app(scope, receive, send)
+      return
+    registry = self.registry
+    status = 500
+    size = 0
+
+    async def send_wrapper(message):
+      nonlocal status, size
+      if message['type'] == 'http.response.start':
+        status = message['status']
+      elif message['type'] == 'http.response.body':
+        size += len(message.get('body', b''))
+      await send(message)
+
+    sql = [0, 0.0]
+    token = _request_sql.set(sql)
+    with registry._lock:
+      registry.in_flight += 1
+    start = time.perf_counter()
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      elapsed = time.perf_counter() - start
+      _request_sql.reset(token)
+      labels = (scope['method'], route_template(scope))
+      with registry._lock:
+        registry.in_flight -= 1
+        registry.requests.inc(1, *labels, status)
+        registry.latency.observe(elapsed, *labels)
+        registry.response_size.observe(size, *labels)
+        registry.request_queries.observe(sql[0], *labels)
+        registry.request_sql_time.observe(sql[1], *labels)
+
+
+metrics = Metrics()
@@ -0,0 +1,20 @@
+from src.migrations.runner import (
+  SchemaVersionError,
+  check_schema_version,
+  current_version,
+  latest_version,
+  migrate,
+  pending_migrations,
+)
+from src.migrations.versions import MIGRATIONS, Migration
+
+__all__ = [
+  'MIGRATIONS',
+  'Migration',
+  'SchemaVersionError',
+  'check_schema_version',
+  'current_version',
+  'latest_version',
+  'migrate',
+  'pending_migrations',
+]
@@ -0,0 +1,37 @@
+"""Migrations du schema.
+
+Usage, depuis backend/ :
+  python -m src.migrations status
+  python -m src.migrations upgrade [--to VERSION]
+"""
+
+import argparse
+
+from src.database import db
+from src.migrations.runner import (
+  current_version,
+  latest_version,
+  migrate,
+  pending_migrations,
+)
+
+
+def main():
+  parser = argparse.ArgumentParser(prog='python -m src.migrations')
+  commands = parser.add_subparsers(dest='command', required=True)
+  commands.add_parser('status', help='version courante et migrations en attente')
+  upgrade = commands.add_parser('upgrade', help='applique les migrations en attente')
+  upgrade.add_argument('--to', type=int, default=None, help='version cible')
+  args = parser.parse_args()
+
+  with db.connection_context():
+    if args.command == 'upgrade':
+      for migration in migrate(db, target=args.to):
+        print(f'applied {migration.version:04d} {migration.name}')
+    print(f'schema version: {current_version(db)} (latest: {latest_version()})')
+    for migration in pending_migrations(db):
+      print(f'pending {migration.version:04d} {migration.name}')
+
+
+if __name__ == '__main__':
+  main()
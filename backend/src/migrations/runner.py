@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from src.database import db
+from src.migrations.versions import MIGRATIONS, Migration
+
+TABLE = 'schema_version'
+
+
+class SchemaVersionError(RuntimeError):
+  pass
+
+
+def latest_version() -> int:
+  return MIGRATIONS[-1].version
+
+
+def current_version(database=db) -> int:
+  # base vierge ou anterieure aux migrations : version 0
+  if not database.table_exists(TABLE):
+    return 0
+  cursor = database.execute_sql(f'SELECT MAX(version) FROM {TABLE}')
+  return cursor.fetchone()[0] or 0
+
+
+def pending_migrations(database=db) -> list[Migration]:
+  version = current_version(database)
+  return [m for m in MIGRATIONS if m.version > version]
+
+
+def migrate(database=db, target: int | None = None) -> list[Migration]:
+  """Applique les migrations en attente, chacune dans sa transaction."""
+  applied: list[Migration] = []
+  if not pending_migrations(database):
+    return applied
+  database.execute_sql(
+    f'CREATE TABLE IF NOT EXISTS {TABLE} (version INTEGER NOT NULL PRIMARY KEY, '
+    'name VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)'
+  )
+  for migration in MIGRATIONS:
+    if target is not None and migration.version > target:
+      break
+    # verrou d'ecriture pris avant de relire la version : plusieurs workers qui
+    # demarrent ensemble n'appliquent chaque migration qu'une fois
+    with database.atomic('IMMEDIATE'):
+      if migration.version <= current_version(database):
+        continue
+      migration.apply(database)
+      database.execute_sql(
+        f'INSERT INTO {TABLE} (version, name, applied_at) VALUES (?, ?, ?)',
+        (migration.version, migration.name, datetime.now()),
+      )
+    applied.append(migration)
+  return applied
+
+
+def check_schema_version(database=db):
+  # seul travail fait au demarrage : une lecture de schema_version
+  version, latest = current_version(database), latest_version()
+  if version < latest:
+    raise SchemaVersionError(
+      f'Database schema is at version {version}, expected {latest}: '
+      'run `python -m src.migrations upgrade`'
+    )
+  if version > latest:
+    raise SchemaVersionError(
+      f'Database schema is at version {version}, newer than this code ({latest})'
+    )
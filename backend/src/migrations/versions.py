@@ -0,0 +1,511 @@
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# SQL fige : une migration decrit le schema, les triggers et les reprises de donnees
+# au moment ou elle a ete ecrite, sans importer le code des modeles, qui evolue.
+# IF NOT EXISTS partout : une base creee avant les migrations (create_tables au
+# demarrage) passe par les memes etapes sans erreur.
+
+
+@dataclass(frozen=True)
+class Migration:
+  version: int
+  name: str
+  apply: Callable  # apply(database), executee dans la transaction de la migration
+
+
+def _execute(database, *statements: str):
+  for statement in statements:
+    database.execute_sql(statement)
+
+
+def core_tables(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "user" ("id" TEXT NOT NULL PRIMARY KEY, '
+    '"username" VARCHAR(255) NOT NULL, "email" VARCHAR(255) NOT NULL, '
+    '"role" VARCHAR(255) NOT NULL, "password" VARCHAR(255) NOT NULL, '
+    '"avatar_url" VARCHAR(255), "created_at" DATETIME NOT NULL, "updated_at" DATETIME)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "user_username" ON "user" ("username")',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "user_email" ON "user" ("email")',
+    'CREATE TABLE IF NOT EXISTS "book" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"user_id" TEXT NOT NULL, "isbn" VARCHAR(255), "google_books_id" VARCHAR(255), '
+    '"title" VARCHAR(255) NOT NULL, "author" VARCHAR(255), "pages" INTEGER, '
+    '"current_page" INTEGER NOT NULL, "cover_url" VARCHAR(255), '
+    '"created_at" DATETIME NOT NULL, "updated_at" DATETIME, "type" VARCHAR(255) NOT NULL, '
+    '"ended_at" DATETIME, FOREIGN KEY ("user_id") REFERENCES "user" ("id"))',
+    'CREATE INDEX IF NOT EXISTS "book_user_id" ON "book" ("user_id")',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "book_isbn" ON "book" ("isbn")',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "book_google_books_id" '
+    'ON "book" ("google_books_id")',
+    'CREATE TABLE IF NOT EXISTS "game" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"user_id" TEXT NOT NULL, "title" VARCHAR(255) NOT NULL, "platform" VARCHAR(255), '
+    '"completion_time" REAL, "time_played" REAL, "cover_url" VARCHAR(255), '
+    '"created_at" DATETIME NOT NULL, "updated_at" DATETIME, "type" VARCHAR(255) NOT NULL, '
+    '"ended_at" DATETIME, FOREIGN KEY ("user_id") REFERENCES "user" ("id"))',
+    'CREATE INDEX IF NOT EXISTS "game_user_id" ON "game" ("user_id")',
+  )
+
+
+# compteurs de user_stats a la migration 2, avec les versions d'ETag
+USER_STATS_COLUMNS = (
+  ('books_total', 'INTEGER'),
+  ('books_finished', 'INTEGER'),
+  ('books_in_progress', 'INTEGER'),
+  ('pages_read', 'INTEGER'),
+  ('games_total', 'INTEGER'),
+  ('games_finished', 'INTEGER'),
+  ('games_in_progress', 'INTEGER'),
+  ('hours_played', 'REAL'),
+  ('books_version', 'INTEGER'),
+  ('games_version', 'INTEGER'),
+)
+
+USER_STATS_TRIGGERS = (
+  'DROP TRIGGER IF EXISTS book_stats_insert',
+  'CREATE TRIGGER book_stats_insert AFTER INSERT ON book BEGIN '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id); '
+  'UPDATE user_stats SET books_total = books_total + 1, '
+  'books_finished = books_finished + (NEW.ended_at IS NOT NULL), '
+  'books_in_progress = books_in_progress + (NEW.ended_at IS NULL AND '
+  'COALESCE(NEW.current_page, 0) > 0), '
+  'pages_read = pages_read + COALESCE(NEW.current_page, 0), '
+  'books_version = books_version + 1 WHERE user_id = NEW.user_id; '
+  'END',
+  'DROP TRIGGER IF EXISTS book_stats_delete',
+  'CREATE TRIGGER book_stats_delete AFTER DELETE ON book BEGIN '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (OLD.user_id); '
+  'UPDATE user_stats SET books_total = books_total - 1, '
+  'books_finished = books_finished - (OLD.ended_at IS NOT NULL), '
+  'books_in_progress = books_in_progress - (OLD.ended_at IS NULL AND '
+  'COALESCE(OLD.current_page, 0) > 0), '
+  'pages_read = pages_read - COALESCE(OLD.current_page, 0), '
+  'books_version = books_version + 1 WHERE user_id = OLD.user_id; '
+  'END',
+  'DROP TRIGGER IF EXISTS book_stats_update',
+  'CREATE TRIGGER book_stats_update AFTER UPDATE ON book BEGIN '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (OLD.user_id); '
+  'UPDATE user_stats SET books_total = books_total - 1, '
+  'books_finished = books_finished - (OLD.ended_at IS NOT NULL), '
+  'books_in_progress = books_in_progress - (OLD.ended_at IS NULL AND '
+  'COALESCE(OLD.current_page, 0) > 0), '
+  'pages_read = pages_read - COALESCE(OLD.current_page, 0), '
+  'books_version = books_version + 1 WHERE user_id = OLD.user_id; '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id); '
+  'UPDATE user_stats SET books_total = books_total + 1, '
+  'books_finished = books_finished + (NEW.ended_at IS NOT NULL), '
+  'books_in_progress = books_in_progress + (NEW.ended_at IS NULL AND '
+  'COALESCE(NEW.current_page, 0) > 0), '
+  'pages_read = pages_read + COALESCE(NEW.current_page, 0), '
+  'books_version = books_version + 1 WHERE user_id = NEW.user_id; '
+  'END',
+  'DROP TRIGGER IF EXISTS game_stats_insert',
+  'CREATE TRIGGER game_stats_insert AFTER INSERT ON game BEGIN '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id); '
+  'UPDATE user_stats SET games_total = games_total + 1, '
+  'games_finished = games_finished + (NEW.ended_at IS NOT NULL), '
+  'games_in_progress = games_in_progress + (NEW.ended_at IS NULL AND '
+  'COALESCE(NEW.time_played, 0) > 0), '
+  'hours_played = hours_played + COALESCE(NEW.time_played, 0), '
+  'games_version = games_version + 1 WHERE user_id = NEW.user_id; '
+  'END',
+  'DROP TRIGGER IF EXISTS game_stats_delete',
+  'CREATE TRIGGER game_stats_delete AFTER DELETE ON game BEGIN '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (OLD.user_id); '
+  'UPDATE user_stats SET games_total = games_total - 1, '
+  'games_finished = games_finished - (OLD.ended_at IS NOT NULL), '
+  'games_in_progress = games_in_progress - (OLD.ended_at IS NULL AND '
+  'COALESCE(OLD.time_played, 0) > 0), '
+  'hours_played = hours_played - COALESCE(OLD.time_played, 0), '
+  'games_version = games_version + 1 WHERE user_id = OLD.user_id; '
+  'END',
+  'DROP TRIGGER IF EXISTS game_stats_update',
+  'CREATE TRIGGER game_stats_update AFTER UPDATE ON game BEGIN '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (OLD.user_id); '
+  'UPDATE user_stats SET games_total = games_total - 1, '
+  'games_finished = games_finished - (OLD.ended_at IS NOT NULL), '
+  'games_in_progress = games_in_progress - (OLD.ended_at IS NULL AND '
+  'COALESCE(OLD.time_played, 0) > 0), '
+  'hours_played = hours_played - COALESCE(OLD.time_played, 0), '
+  'games_version = games_version + 1 WHERE user_id = OLD.user_id; '
+  'INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id); '
+  'UPDATE user_stats SET games_total = games_total + 1, '
+  'games_finished = games_finished + (NEW.ended_at IS NOT NULL), '
+  'games_in_progress = games_in_progress + (NEW.ended_at IS NULL AND '
+  'COALESCE(NEW.time_played, 0) > 0), '
+  'hours_played = hours_played + COALESCE(NEW.time_played, 0), '
+  'games_version = games_version + 1 WHERE user_id = NEW.user_id; '
+  'END',
+)
+
+# recalcul complet ; les versions ne font qu'augmenter pour ne jamais reproduire un
+# ancien ETag
+USER_STATS_REBUILD = (
+  'INSERT OR IGNORE INTO user_stats (user_id) SELECT id FROM user',
+  'UPDATE user_stats SET (books_total, books_finished, books_in_progress, '
+  'pages_read) = (SELECT COALESCE(SUM(1), 0), '
+  'COALESCE(SUM((book.ended_at IS NOT NULL)), 0), '
+  'COALESCE(SUM((book.ended_at IS NULL AND '
+  'COALESCE(book.current_page, 0) > 0)), 0), '
+  'COALESCE(SUM(COALESCE(book.current_page, 0)), 0) '
+  'FROM book WHERE book.user_id = user_stats.user_id), '
+  'books_version = books_version + 1',
+  'UPDATE user_stats SET (games_total, games_finished, games_in_progress, '
+  'hours_played) = (SELECT COALESCE(SUM(1), 0), '
+  'COALESCE(SUM((game.ended_at IS NOT NULL)), 0), '
+  'COALESCE(SUM((game.ended_at IS NULL AND '
+  'COALESCE(game.time_played, 0) > 0)), 0), '
+  'COALESCE(SUM(COALESCE(game.time_played, 0)), 0) '
+  'FROM game WHERE game.user_id = user_stats.user_id), '
+  'games_version = games_version + 1',
+)
+
+
+def user_stats(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "user_stats" ("user_id" TEXT NOT NULL PRIMARY KEY, '
+    '"books_total" INTEGER NOT NULL DEFAULT 0, "books_finished" INTEGER NOT NULL DEFAULT 0, '
+    '"books_in_progress" INTEGER NOT NULL DEFAULT 0, "pages_read" INTEGER NOT NULL DEFAULT 0, '
+    '"games_total" INTEGER NOT NULL DEFAULT 0, "games_finished" INTEGER NOT NULL DEFAULT 0, '
+    '"games_in_progress" INTEGER NOT NULL DEFAULT 0, "hours_played" REAL NOT NULL DEFAULT 0, '
+    '"books_version" INTEGER NOT NULL DEFAULT 0, "games_version" INTEGER NOT NULL DEFAULT 0, '
+    'FOREIGN KEY ("user_id") REFERENCES "user" ("id") ON DELETE CASCADE)',
+  )
+  # table creee avant les versions d'ETag : colonnes manquantes
+  existing = {c[1] for c in database.execute_sql('PRAGMA table_info("user_stats")')}
+  for column, column_type in USER_STATS_COLUMNS:
+    if column not in existing:
+      database.execute_sql(
+        f'ALTER TABLE user_stats ADD COLUMN {column} {column_type} NOT NULL DEFAULT 0'
+      )
+  _execute(database, *USER_STATS_TRIGGERS, *USER_STATS_REBUILD)
+
+
+def progress_events(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "progress_events" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"user_id" TEXT NOT NULL, "media_type" VARCHAR(255) NOT NULL, '
+    '"media_id" INTEGER NOT NULL, "value" REAL NOT NULL, "recorded_at" DATETIME NOT NULL, '
+    '"created_at" DATETIME NOT NULL, FOREIGN KEY ("user_id") REFERENCES "user" ("id"))',
+    'CREATE INDEX IF NOT EXISTS "progressevent_user_id" ON "progress_events" ("user_id")',
+    'CREATE INDEX IF NOT EXISTS "progressevent_user_id_media_type_media_id_recorded_at" '
+    'ON "progress_events" ("user_id", "media_type", "media_id", "recorded_at")',
+  )
+
+
+def metadata_cache(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "metadata_cache" ("source" VARCHAR(255) NOT NULL, '
+    '"key" VARCHAR(255) NOT NULL, "payload" TEXT, "fetched_at" DATETIME NOT NULL, '
+    '"expires_at" DATETIME NOT NULL, PRIMARY KEY ("source", "key"))',
+  )
+
+
+# rowid de l'index : id * 2 pour un livre, id * 2 + 1 pour un jeu
+SEARCH_TRIGGERS = (
+  'CREATE TRIGGER IF NOT EXISTS book_search_insert AFTER INSERT ON book BEGIN '
+  'INSERT INTO media_search (rowid, title, subtitle, owner, '
+  'media_type) VALUES (NEW.id * 2 + 0, NEW.title, '
+  "NEW.author, 'u' || NEW.user_id, 'book'); "
+  'END',
+  'CREATE TRIGGER IF NOT EXISTS book_search_delete AFTER DELETE ON book BEGIN '
+  'DELETE FROM media_search WHERE rowid = OLD.id * 2 + 0; '
+  'END',
+  'CREATE TRIGGER IF NOT EXISTS book_search_update AFTER UPDATE OF title, '
+  'author, user_id ON book BEGIN '
+  'DELETE FROM media_search WHERE rowid = OLD.id * 2 + 0; '
+  'INSERT INTO media_search (rowid, title, subtitle, owner, '
+  'media_type) VALUES (NEW.id * 2 + 0, NEW.title, '
+  "NEW.author, 'u' || NEW.user_id, 'book'); "
+  'END',
+  'CREATE TRIGGER IF NOT EXISTS game_search_insert AFTER INSERT ON game BEGIN '
+  'INSERT INTO media_search (rowid, title, subtitle, owner, '
+  'media_type) VALUES (NEW.id * 2 + 1, NEW.title, '
+  "NEW.platform, 'u' || NEW.user_id, 'game'); "
+  'END',
+  'CREATE TRIGGER IF NOT EXISTS game_search_delete AFTER DELETE ON game BEGIN '
+  'DELETE FROM media_search WHERE rowid = OLD.id * 2 + 1; '
+  'END',
+  'CREATE TRIGGER IF NOT EXISTS game_search_update AFTER UPDATE OF title, '
+  'platform, user_id ON game BEGIN '
+  'DELETE FROM media_search WHERE rowid = OLD.id * 2 + 1; '
+  'INSERT INTO media_search (rowid, title, subtitle, owner, '
+  'media_type) VALUES (NEW.id * 2 + 1, NEW.title, '
+  "NEW.platform, 'u' || NEW.user_id, 'game'); "
+  'END',
+)
+
+SEARCH_REBUILD = (
+  'DELETE FROM media_search',
+  'INSERT INTO media_search (rowid, title, subtitle, owner, '
+  "media_type) SELECT id * 2 + 0, title, author, 'u' || user_id, 'book' FROM book",
+  'INSERT INTO media_search (rowid, title, subtitle, owner, '
+  "media_type) SELECT id * 2 + 1, title, platform, 'u' || user_id, 'game' "
+  'FROM game',
+)
+
+
+def media_search(database):
+  _execute(
+    database,
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "media_search" USING fts5 ("title", "subtitle", '
+    '"owner", "media_type" UNINDEXED, prefix=\'2 3\', '
+    'tokenize="unicode61 remove_diacritics 2")',
+  )
+  _execute(database, *SEARCH_TRIGGERS, *SEARCH_REBUILD)
+
+
+def media_list_indexes(database):
+  _execute(
+    database,
+    # index composites : listes par titre et parcours par date sans tri temporaire ;
+    # ils commencent par user_id, les index simples sur la cle etrangere deviennent
+    # redondants
+    'CREATE INDEX IF NOT EXISTS "book_user_id_title_id" '
+    'ON "book" ("user_id", "title", "id")',
+    'CREATE INDEX IF NOT EXISTS "book_user_id_updated_at" '
+    'ON "book" ("user_id", "updated_at")',
+    'CREATE INDEX IF NOT EXISTS "game_user_id_title_id" '
+    'ON "game" ("user_id", "title", "id")',
+    'CREATE INDEX IF NOT EXISTS "game_user_id_updated_at" '
+    'ON "game" ("user_id", "updated_at")',
+    'DROP INDEX IF EXISTS "book_user_id"',
+    'DROP INDEX IF EXISTS "game_user_id"',
+  )
+
+
+def media_activity_indexes(database):
+  _execute(
+    database,
+    'CREATE INDEX IF NOT EXISTS "book_user_id_activity" '
+    'ON "book" ("user_id", COALESCE("updated_at", "created_at"), "id")',
+    'CREATE INDEX IF NOT EXISTS "game_user_id_activity" '
+    'ON "game" ("user_id", COALESCE("updated_at", "created_at"), "id")',
+  )
+
+
+SYNC_TRIGGERS = (
+  'INSERT OR IGNORE INTO sync_sequence (id, value) VALUES (1, 0)',
+  'DROP TRIGGER IF EXISTS book_sync_insert',
+  'CREATE TRIGGER book_sync_insert AFTER INSERT ON book BEGIN '
+  'UPDATE sync_sequence SET value = value + 1 WHERE id = 1; '
+  'INSERT OR REPLACE INTO media_changes (media_type, media_id, user_id, '
+  "seq) VALUES ('book', NEW.id, NEW.user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1)); '
+  "DELETE FROM tombstones WHERE media_type = 'book' AND media_id = NEW.id; "
+  'END',
+  'DROP TRIGGER IF EXISTS book_sync_update',
+  'CREATE TRIGGER book_sync_update AFTER UPDATE ON book BEGIN '
+  'UPDATE sync_sequence SET value = value + 1 WHERE id = 1; '
+  'INSERT OR REPLACE INTO media_changes (media_type, media_id, user_id, '
+  "seq) VALUES ('book', NEW.id, NEW.user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1)); '
+  'END',
+  'DROP TRIGGER IF EXISTS book_sync_delete',
+  'CREATE TRIGGER book_sync_delete AFTER DELETE ON book BEGIN '
+  'UPDATE sync_sequence SET value = value + 1 WHERE id = 1; '
+  "DELETE FROM media_changes WHERE media_type = 'book' AND media_id = OLD.id; "
+  'INSERT OR REPLACE INTO tombstones (media_type, media_id, user_id, '
+  "seq) VALUES ('book', OLD.id, OLD.user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1)); '
+  'END',
+  'DROP TRIGGER IF EXISTS game_sync_insert',
+  'CREATE TRIGGER game_sync_insert AFTER INSERT ON game BEGIN '
+  'UPDATE sync_sequence SET value = value + 1 WHERE id = 1; '
+  'INSERT OR REPLACE INTO media_changes (media_type, media_id, user_id, '
+  "seq) VALUES ('game', NEW.id, NEW.user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1)); '
+  "DELETE FROM tombstones WHERE media_type = 'game' AND media_id = NEW.id; "
+  'END',
+  'DROP TRIGGER IF EXISTS game_sync_update',
+  'CREATE TRIGGER game_sync_update AFTER UPDATE ON game BEGIN '
+  'UPDATE sync_sequence SET value = value + 1 WHERE id = 1; '
+  'INSERT OR REPLACE INTO media_changes (media_type, media_id, user_id, '
+  "seq) VALUES ('game', NEW.id, NEW.user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1)); '
+  'END',
+  'DROP TRIGGER IF EXISTS game_sync_delete',
+  'CREATE TRIGGER game_sync_delete AFTER DELETE ON game BEGIN '
+  'UPDATE sync_sequence SET value = value + 1 WHERE id = 1; '
+  "DELETE FROM media_changes WHERE media_type = 'game' AND media_id = OLD.id; "
+  'INSERT OR REPLACE INTO tombstones (media_type, media_id, user_id, '
+  "seq) VALUES ('game', OLD.id, OLD.user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1)); '
+  'END',
+)
+
+# les medias deja presents comptent comme une premiere modification
+SYNC_REBUILD = (
+  'INSERT OR IGNORE INTO media_changes (media_type, media_id, user_id, '
+  "seq) SELECT 'book', id, user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1) + ROW_NUMBER() OVER (ORDER BY id) FROM book',
+  'UPDATE sync_sequence SET value = MAX(value, '
+  '(SELECT COALESCE(MAX(seq), 0) FROM media_changes)) WHERE id = 1',
+  'INSERT OR IGNORE INTO media_changes (media_type, media_id, user_id, '
+  "seq) SELECT 'game', id, user_id, (SELECT value FROM "
+  'sync_sequence WHERE id = 1) + ROW_NUMBER() OVER (ORDER BY id) FROM game',
+  'UPDATE sync_sequence SET value = MAX(value, '
+  '(SELECT COALESCE(MAX(seq), 0) FROM media_changes)) WHERE id = 1',
+)
+
+
+def sync_changes(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "sync_sequence" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"value" INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS "media_changes" ("media_type" VARCHAR(255) NOT NULL, '
+    '"media_id" INTEGER NOT NULL, "user_id" TEXT NOT NULL, "seq" INTEGER NOT NULL, '
+    'PRIMARY KEY ("media_type", "media_id"), '
+    'FOREIGN KEY ("user_id") REFERENCES "user" ("id") ON DELETE CASCADE)',
+    'CREATE INDEX IF NOT EXISTS "mediachange_user_id_seq" '
+    'ON "media_changes" ("user_id", "seq")',
+    'CREATE TABLE IF NOT EXISTS "tombstones" ("media_type" VARCHAR(255) NOT NULL, '
+    '"media_id" INTEGER NOT NULL, "user_id" TEXT NOT NULL, "seq" INTEGER NOT NULL, '
+    'PRIMARY KEY ("media_type", "media_id"), '
+    'FOREIGN KEY ("user_id") REFERENCES "user" ("id") ON DELETE CASCADE)',
+    'CREATE INDEX IF NOT EXISTS "tombstone_user_id_seq" ON "tombstones" ("user_id", "seq")',
+  )
+  _execute(database, *SYNC_TRIGGERS, *SYNC_REBUILD)
+
+
+# normalisations des migrations 9 et 11, copiees telles quelles
+ISBN_SEPARATORS = re.compile(r'[\s-]')
+
+
+def _normalize_isbn(isbn: str | None) -> str | None:
+  if not isbn:
+    return None
+  return ISBN_SEPARATORS.sub('', isbn).upper() or None
+
+
+def _game_key(title: str, platform: str | None) -> str:
+  return f'{title.strip().lower()}|{(platform or "").strip().lower()}'
+
+
+def works_catalog(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "works" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"media_type" VARCHAR(255) NOT NULL, "isbn" VARCHAR(255), '
+    '"google_books_id" VARCHAR(255), "hltb_key" VARCHAR(255), '
+    '"title" VARCHAR(255) NOT NULL, "author" VARCHAR(255), "pages" INTEGER, '
+    '"platform" VARCHAR(255), "completion_time" REAL, "cover_url" VARCHAR(255), '
+    '"created_at" DATETIME NOT NULL, "updated_at" DATETIME)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "work_isbn" ON "works" ("isbn")',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "work_google_books_id" '
+    'ON "works" ("google_books_id")',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "work_hltb_key" ON "works" ("hltb_key")',
+  )
+  for table in ('book', 'game'):
+    columns = [c[1] for c in database.execute_sql(f'PRAGMA table_info("{table}")')]
+    if 'work_id' not in columns:
+      database.execute_sql(
+        f'ALTER TABLE "{table}" ADD COLUMN "work_id" INTEGER '
+        'REFERENCES "works" ("id") ON DELETE SET NULL'
+      )
+  _execute(
+    database,
+    'CREATE INDEX IF NOT EXISTS "book_work_id" ON "book" ("work_id")',
+    'CREATE INDEX IF NOT EXISTS "game_work_id" ON "game" ("work_id")',
+    # un ISBN unique par utilisateur, plus pour toute la base
+    'DROP INDEX IF EXISTS "book_isbn"',
+    'DROP INDEX IF EXISTS "book_google_books_id"',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "book_user_id_isbn" ON "book" ("user_id", "isbn")',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "book_user_id_google_books_id" '
+    'ON "book" ("user_id", "google_books_id")',
+  )
+  # fiches des medias existants
+  connection = database.connection()
+  connection.create_function('normalize_isbn', 1, _normalize_isbn, deterministic=True)
+  connection.create_function('game_key', 2, _game_key, deterministic=True)
+  _execute(
+    database,
+    'INSERT OR IGNORE INTO "works" ("media_type", "isbn", "google_books_id", "title", '
+    '"author", "pages", "cover_url", "created_at") '
+    'SELECT \'book\', normalize_isbn("isbn"), "google_books_id", "title", "author", '
+    '"pages", "cover_url", "created_at" FROM "book" '
+    'WHERE "isbn" IS NOT NULL OR "google_books_id" IS NOT NULL ORDER BY "id"',
+    'UPDATE "book" SET "work_id" = COALESCE('
+    '(SELECT "id" FROM "works" WHERE "isbn" = normalize_isbn("book"."isbn")), '
+    '(SELECT "id" FROM "works" WHERE "google_books_id" = "book"."google_books_id")) '
+    'WHERE "work_id" IS NULL '
+    'AND ("isbn" IS NOT NULL OR "google_books_id" IS NOT NULL)',
+    'INSERT OR IGNORE INTO "works" ("media_type", "hltb_key", "title", "platform", '
+    '"cover_url", "created_at") '
+    'SELECT \'game\', game_key("title", "platform"), "title", "platform", "cover_url", '
+    '"created_at" FROM "game" ORDER BY "id"',
+    'UPDATE "game" SET "work_id" = (SELECT "id" FROM "works" '
+    'WHERE "hltb_key" = game_key("game"."title", "game"."platform")) '
+    'WHERE "work_id" IS NULL',
+    # duree HowLongToBeat deja recuperee par l'un des exemplaires
+    'UPDATE "works" SET "completion_time" = (SELECT MAX("completion_time") '
+    'FROM "game" WHERE "game"."work_id" = "works"."id") '
+    'WHERE "media_type" = \'game\' AND "completion_time" IS NULL',
+  )
+
+
+def jobs(database):
+  _execute(
+    database,
+    'CREATE TABLE IF NOT EXISTS "jobs" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"kind" VARCHAR(255) NOT NULL, "payload" TEXT NOT NULL, '
+    '"status" VARCHAR(255) NOT NULL, "priority" INTEGER NOT NULL, '
+    '"attempts" INTEGER NOT NULL, "max_attempts" INTEGER NOT NULL, '
+    '"run_at" DATETIME NOT NULL, "idempotency_key" VARCHAR(255), "user_id" TEXT, '
+    '"result" TEXT, "last_error" TEXT, "created_at" DATETIME NOT NULL, '
+    '"started_at" DATETIME, "finished_at" DATETIME, '
+    'FOREIGN KEY ("user_id") REFERENCES "user" ("id") ON DELETE CASCADE)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "job_idempotency_key" '
+    'ON "jobs" ("idempotency_key")',
+    'CREATE INDEX IF NOT EXISTS "job_user_id" ON "jobs" ("user_id")',
+    'CREATE INDEX IF NOT EXISTS "job_status_priority" '
+    'ON "jobs" ("status", "priority" DESC, "run_at", "id")',
+  )
+
+
+def normalized_book_isbn(database):
+  # ISBN des livres sous la forme du catalogue : l'index unique (user_id, isbn)
+  # compare enfin 978-2-266-32081-0 et 9782266320810
+  connection = database.connection()
+  connection.create_function('normalize_isbn', 1, _normalize_isbn, deterministic=True)
+  _execute(
+    database,
+    # meme ISBN une fois normalise chez un utilisateur : le livre le plus ancien le
+    # garde, les autres le perdent (livres et fiches Work conserves)
+    'UPDATE "book" SET "isbn" = NULL WHERE "isbn" IS NOT NULL AND EXISTS ('
+    'SELECT 1 FROM "book" AS "other" WHERE "other"."user_id" = "book"."user_id" '
+    'AND "other"."id" < "book"."id" '
+    'AND normalize_isbn("other"."isbn") = normalize_isbn("book"."isbn"))',
+    'UPDATE "book" SET "isbn" = normalize_isbn("isbn") '
+    'WHERE "isbn" IS NOT normalize_isbn("isbn")',
+  )
+
+
+def job_heartbeat(database):
+  _execute(
+    database,
+    'ALTER TABLE "jobs" ADD COLUMN "heartbeat_at" DATETIME',
+    # jobs en cours avant la migration : leur bail part du debut de l'essai
+    'UPDATE "jobs" SET "heartbeat_at" = "started_at" WHERE "status" = \'running\'',
+  )
+
+
+MIGRATIONS = [
+  Migration(1, 'core tables', core_tables),
+  Migration(2, 'user stats', user_stats),
+  Migration(3, 'progress events', progress_events),
+  Migration(4, 'metadata cache', metadata_cache),
+  Migration(5, 'media search', media_search),
+  Migration(6, 'media list indexes', media_list_indexes),
+  Migration(7, 'media activity indexes', media_activity_indexes),
+  Migration(8, 'sync changes', sync_changes),
+  Migration(9, 'works catalog', works_catalog),
+  Migration(10, 'jobs', jobs),
+  Migration(11, 'normalized book isbn', normalized_book_isbn),
+  Migration(12, 'job heartbeat', job_heartbeat),
+]
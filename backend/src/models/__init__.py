@@ -1,5 +1,25 @@
 from src.models.books import Book
 from src.models.games import Game
+from src.models.jobs import Job
+from src.models.metadata_cache import MetadataCache
+from src.models.progress import ProgressEvent
+from src.models.search import MediaSearch
+from src.models.stats import UserStats
+from src.models.sync import MediaChange, SyncSequence, Tombstone
 from src.models.users import User
+from src.models.works import Work
 
-__all__ = ['User', 'Book', 'Game']
+__all__ = [
+  'User',
+  'Book',
+  'Game',
+  'Work',
+  'UserStats',
+  'ProgressEvent',
+  'MetadataCache',
+  'MediaSearch',
+  'SyncSequence',
+  'MediaChange',
+  'Tombstone',
+  'Job',
+]
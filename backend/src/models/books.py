@@ -1,20 +1,30 @@
 from datetime import datetime
 
-from peewee import AutoField, CharField, DateTimeField, ForeignKeyField, IntegerField
+from peewee import (
+  AutoField,
+  CharField,
+  DateTimeField,
+  ForeignKeyField,
+  IntegerField,
+  fn,
+)
 
 from src.database import BaseModel
 from src.models.users import User
+from src.models.works import Work
 
 
 class Book(BaseModel):
   id = AutoField()
   user = ForeignKeyField(
-    User, backref='books', null=False
-  )  # relation avec l'utilisateur
-  isbn = CharField(unique=True, null=True)
+    User, backref='books', null=False, index=False
+  )  # relation avec l'utilisateur, indexee par les index composites
+  isbn = CharField(null=True)  # unique par utilisateur, voir Meta
   google_books_id = CharField(
-    unique=True, null=True
+    null=True
   )  # null False à vérifier si on laisse creér un livre sans qu'il soit dans google_books
+  # surcharges de l'utilisateur : copiees de la fiche Work au rattachement,
+  # puis modifiables sans toucher aux autres lecteurs ; l'API sert ces colonnes
   title = CharField(null=False)
   author = CharField(null=True)
   pages = IntegerField(null=True)
@@ -24,9 +34,33 @@ class Book(BaseModel):
   updated_at = DateTimeField(null=True)
   type = CharField(null=False, default='book')
   ended_at = DateTimeField(null=True)
+  # fiche partagee du catalogue, null si le livre n'a aucun identifiant externe
+  work = ForeignKeyField(Work, backref='books', null=True, on_delete='SET NULL')
+
+  class Meta:
+    indexes = (
+      # liste paginee par titre : recherche par utilisateur, deja triee
+      (('user', 'title', 'id'), False),
+      # parcours par date de modification
+      (('user', 'updated_at'), False),
+      # deux utilisateurs peuvent posseder la meme edition, pas un utilisateur deux fois
+      (('user', 'isbn'), True),
+      (('user', 'google_books_id'), True),
+    )
 
   def save(self, *args, **kwargs):
     # Mettre à jour updated_at à chaque sauvegarde
     if self.id is not None:  # Si c'est une mise à jour (pas une création)
       self.updated_at = datetime.now()
     return super().save(*args, **kwargs)
+
+
+# fil d'activite (/api/media) : updated_at reste nul tant que la ligne n'a pas change
+Book.add_index(
+  Book.index(
+    Book.user,
+    fn.COALESCE(Book.updated_at, Book.created_at),
+    Book.id,
+    name='book_user_id_activity',
+  )
+)
@@ -1,16 +1,19 @@
 from datetime import datetime
 
-from peewee import AutoField, CharField, DateTimeField, FloatField, ForeignKeyField
+from peewee import AutoField, CharField, DateTimeField, FloatField, ForeignKeyField, fn
 
 from src.database import BaseModel
 from src.models.users import User
+from src.models.works import Work
 
 
 class Game(BaseModel):
   id = AutoField()
   user = ForeignKeyField(
-    User, backref='games', null=False
-  )  # relation avec l'utilisateur
+    User, backref='games', null=False, index=False
+  )  # relation avec l'utilisateur, indexee par les index composites
+  # surcharges de l'utilisateur, comme Book : la fiche Work ne fait que combler
+  # les trous au rattachement (couverture, duree HowLongToBeat)
   title = CharField(null=False)
   platform = CharField(null=True)
   completion_time = FloatField(null=True)
@@ -20,3 +23,30 @@ class Game(BaseModel):
   updated_at = DateTimeField(null=True)
   type = CharField(null=False, default='game')
   ended_at = DateTimeField(null=True)
+  # fiche partagee du catalogue (titre et plateforme normalises)
+  work = ForeignKeyField(Work, backref='games', null=True, on_delete='SET NULL')
+
+  class Meta:
+    indexes = (
+      # liste paginee par titre : recherche par utilisateur, deja triee
+      (('user', 'title', 'id'), False),
+      # parcours par date de modification
+      (('user', 'updated_at'), False),
+    )
+
+  def save(self, *args, **kwargs):
+    # Mettre à jour updated_at à chaque sauvegarde, comme Book
+    if self.id is not None:  # Si c'est une mise à jour (pas une création)
+      self.updated_at = datetime.now()
+    return super().save(*args, **kwargs)
+
+
+# fil d'activite (/api/media) : updated_at reste nul tant que la ligne n'a pas change
+Game.add_index(
+  Game.index(
+    Game.user,
+    fn.COALESCE(Game.updated_at, Game.created_at),
+    Game.id,
+    name='game_user_id_activity',
+  )
+)
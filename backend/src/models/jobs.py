@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from peewee import (
+  AutoField,
+  CharField,
+  DateTimeField,
+  ForeignKeyField,
+  IntegerField,
+  TextField,
+)
+
+from src.database import BaseModel
+from src.models.users import User
+
+# queued -> running -> done, ou retour a queued (nouvel essai) puis failed
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class Job(BaseModel):
+  # travail differe, persistant : survit a un redemarrage de l'API
+  id = AutoField()
+  kind = CharField(null=False)  # nom du handler, ex. 'hltb.enrich'
+  payload = TextField(null=False)  # JSON, arguments nommes du handler
+  status = CharField(null=False, default='queued')
+  priority = IntegerField(null=False, default=0)  # la plus haute passe d'abord
+  attempts = IntegerField(null=False, default=0)
+  max_attempts = IntegerField(null=False)
+  run_at = DateTimeField(null=False, default=datetime.now)  # pas avant (backoff)
+  idempotency_key = CharField(unique=True, null=True)
+  user = ForeignKeyField(User, backref='jobs', null=True, on_delete='CASCADE')
+  result = TextField(null=True)  # JSON
+  last_error = TextField(null=True)
+  created_at = DateTimeField(null=False, default=datetime.now)
+  started_at = DateTimeField(null=True)
+  finished_at = DateTimeField(null=True)
+  # bail du worker, renouvele pendant l'execution ; expire : job abandonne
+  heartbeat_at = DateTimeField(null=True)
+
+  class Meta:
+    table_name = 'jobs'
+
+
+# prochain job : status = 'queued', run_at echu, ordre de l'index sans tri temporaire
+Job.add_index(
+  Job.index(
+    Job.status, Job.priority.desc(), Job.run_at, Job.id, name='job_status_priority'
+  )
+)
@@ -0,0 +1,16 @@
+from peewee import CharField, CompositeKey, DateTimeField, TextField
+
+from src.database import BaseModel
+
+
+class MetadataCache(BaseModel):
+  # reponses des APIs externes, partagees entre tous les utilisateurs
+  source = CharField(null=False)  # 'google_books', 'howlongtobeat'...
+  key = CharField(null=False)
+  payload = TextField(null=True)  # JSON, null = pas de resultat (cache negatif)
+  fetched_at = DateTimeField(null=False)
+  expires_at = DateTimeField(null=False)
+
+  class Meta:
+    table_name = 'metadata_cache'
+    primary_key = CompositeKey('source', 'key')
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from peewee import (
+  AutoField,
+  CharField,
+  DateTimeField,
+  FloatField,
+  ForeignKeyField,
+  IntegerField,
+)
+
+from src.database import BaseModel
+from src.models.users import User
+
+
+class ProgressEvent(BaseModel):
+  # journal en ajout seul : une ligne par progression envoyee par le client
+  id = AutoField()
+  user = ForeignKeyField(User, backref='progress_events', null=False)
+  media_type = CharField(null=False)  # 'book' ou 'game'
+  media_id = IntegerField(null=False)
+  value = FloatField(null=False)  # page atteinte ou heures jouees
+  recorded_at = DateTimeField(null=False, default=datetime.now)
+  created_at = DateTimeField(null=False, default=datetime.now)
+
+  class Meta:
+    table_name = 'progress_events'
+    indexes = ((('user', 'media_type', 'media_id', 'recorded_at'), False),)
@@ -0,0 +1,72 @@
+from playhouse.sqlite_ext import FTS5Model, SearchField
+
+from src.database import db
+from src.models.books import Book
+from src.models.games import Game
+
+# rowid de l'index : id * 2 pour un livre, id * 2 + 1 pour un jeu
+MEDIA_INDEX = {
+  'book': (Book, 0, 'author'),
+  'game': (Game, 1, 'platform'),
+}
+
+
+class MediaSearch(FTS5Model):
+  title = SearchField()
+  subtitle = SearchField()  # auteur ou plateforme
+  owner = SearchField()  # 'u' + user_id, pour filtrer dans l'index lui-meme
+  media_type = SearchField(unindexed=True)
+
+  class Meta:
+    database = db
+    table_name = 'media_search'
+    options = {'tokenize': 'unicode61 remove_diacritics 2', 'prefix': '2 3'}
+
+
+def _index_row(media_type: str, row: str) -> str:
+  model, offset, subtitle = MEDIA_INDEX[media_type]
+  return (
+    f'INSERT INTO {MediaSearch._meta.table_name} '
+    '(rowid, title, subtitle, owner, media_type) VALUES '
+    f"({row}.id * 2 + {offset}, {row}.title, {row}.{subtitle}, 'u' || {row}.user_id, "
+    f"'{media_type}');"
+  )
+
+
+def _unindex_row(media_type: str, row: str) -> str:
+  _, offset, _ = MEDIA_INDEX[media_type]
+  return (
+    f'DELETE FROM {MediaSearch._meta.table_name} WHERE rowid = {row}.id * 2 + {offset};'
+  )
+
+
+def create_search_triggers():
+  database = MediaSearch._meta.database
+  for media_type, (model, _, subtitle) in MEDIA_INDEX.items():
+    table = model._meta.table_name
+    database.execute_sql(
+      f'CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} '
+      f'BEGIN {_index_row(media_type, "NEW")} END'
+    )
+    database.execute_sql(
+      f'CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} '
+      f'BEGIN {_unindex_row(media_type, "OLD")} END'
+    )
+    database.execute_sql(
+      f'CREATE TRIGGER IF NOT EXISTS {table}_search_update '
+      f'AFTER UPDATE OF title, {subtitle}, user_id ON {table} '
+      f'BEGIN {_unindex_row(media_type, "OLD")} {_index_row(media_type, "NEW")} END'
+    )
+
+
+def rebuild_search_index():
+  database = MediaSearch._meta.database
+  search_table = MediaSearch._meta.table_name
+  with database.atomic():
+    database.execute_sql(f'DELETE FROM {search_table}')
+    for media_type, (model, offset, subtitle) in MEDIA_INDEX.items():
+      database.execute_sql(
+        f'INSERT INTO {search_table} (rowid, title, subtitle, owner, media_type) '
+        f"SELECT id * 2 + {offset}, title, {subtitle}, 'u' || user_id, '{media_type}' "
+        f'FROM {model._meta.table_name}'
+      )
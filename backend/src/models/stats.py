@@ -0,0 +1,103 @@
+from peewee import SQL, FloatField, ForeignKeyField, IntegerField
+
+from src.database import BaseModel
+from src.models.books import Book
+from src.models.games import Game
+from src.models.users import User
+
+# compteurs maintenus par triggers : expression SQL de la contribution d'une ligne
+BOOK_COUNTERS = {
+  'books_total': '1',
+  'books_finished': '({row}.ended_at IS NOT NULL)',
+  'books_in_progress': '({row}.ended_at IS NULL AND COALESCE({row}.current_page, 0) > 0)',
+  'pages_read': 'COALESCE({row}.current_page, 0)',
+}
+GAME_COUNTERS = {
+  'games_total': '1',
+  'games_finished': '({row}.ended_at IS NOT NULL)',
+  'games_in_progress': '({row}.ended_at IS NULL AND COALESCE({row}.time_played, 0) > 0)',
+  'hours_played': 'COALESCE({row}.time_played, 0)',
+}
+
+
+class UserStats(BaseModel):
+  user = ForeignKeyField(User, primary_key=True, backref='stats', on_delete='CASCADE')
+  books_total = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  books_finished = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  books_in_progress = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  pages_read = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  games_total = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  games_finished = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  games_in_progress = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  hours_played = FloatField(default=0, constraints=[SQL('DEFAULT 0')])
+  # incremente a chaque ecriture : version des collections pour les ETags
+  books_version = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+  games_version = IntegerField(default=0, constraints=[SQL('DEFAULT 0')])
+
+  class Meta:
+    table_name = 'user_stats'
+
+
+def _apply(counters: dict, version: str, row: str, sign: str) -> str:
+  table = UserStats._meta.table_name
+  assignments = ', '.join(
+    [
+      f'{column} = {column} {sign} {expr.format(row=row)}'
+      for column, expr in counters.items()
+    ]
+    + [f'{version} = {version} + 1']
+  )
+  return (
+    f'INSERT OR IGNORE INTO {table} (user_id) VALUES ({row}.user_id); '
+    f'UPDATE {table} SET {assignments} WHERE user_id = {row}.user_id;'
+  )
+
+
+def _media_counters():
+  return (
+    (Book._meta.table_name, BOOK_COUNTERS, 'books_version'),
+    (Game._meta.table_name, GAME_COUNTERS, 'games_version'),
+  )
+
+
+def create_user_stats_triggers():
+  # memes triggers que la migration 2 ; une migration qui les change fige son SQL
+  database = UserStats._meta.database
+  for table, counters, version in _media_counters():
+    triggers = {
+      f'{table}_stats_insert': (
+        f'AFTER INSERT ON {table} BEGIN {_apply(counters, version, "NEW", "+")} END'
+      ),
+      f'{table}_stats_delete': (
+        f'AFTER DELETE ON {table} BEGIN {_apply(counters, version, "OLD", "-")} END'
+      ),
+      f'{table}_stats_update': (
+        f'AFTER UPDATE ON {table} BEGIN {_apply(counters, version, "OLD", "-")} '
+        f'{_apply(counters, version, "NEW", "+")} END'
+      ),
+    }
+    with database.atomic():
+      for name, body in triggers.items():
+        database.execute_sql(f'DROP TRIGGER IF EXISTS {name}')
+        database.execute_sql(f'CREATE TRIGGER {name} {body}')
+
+
+def rebuild_user_stats():
+  # recalcul complet, pour initialiser la table sur une base existante ;
+  # les versions ne font qu'augmenter pour ne jamais reproduire un ancien ETag
+  database = UserStats._meta.database
+  stats_table = UserStats._meta.table_name
+  with database.atomic():
+    database.execute_sql(
+      f'INSERT OR IGNORE INTO {stats_table} (user_id) '
+      f'SELECT id FROM {User._meta.table_name}'
+    )
+    for table, counters, version in _media_counters():
+      columns = ', '.join(counters)
+      sums = ', '.join(
+        f'COALESCE(SUM({expr.format(row=table)}), 0)' for expr in counters.values()
+      )
+      database.execute_sql(
+        f'UPDATE {stats_table} SET ({columns}) = (SELECT {sums} FROM {table} '
+        f'WHERE {table}.user_id = {stats_table}.user_id), {version} = {version} + 1'
+      )
@@ -0,0 +1,97 @@
+from peewee import CharField, CompositeKey, ForeignKeyField, IntegerField
+
+from src.database import BaseModel
+from src.models.books import Book
+from src.models.games import Game
+from src.models.users import User
+
+# type de media -> modele suivi par la synchronisation
+SYNC_MEDIA = {'book': Book, 'game': Game}
+
+
+class SyncSequence(BaseModel):
+  # compteur global, une seule ligne : chaque ecriture de media prend la valeur suivante
+  value = IntegerField(default=0)
+
+  class Meta:
+    table_name = 'sync_sequence'
+
+
+class MediaChange(BaseModel):
+  # derniere modification de chaque media vivant
+  media_type = CharField(null=False)
+  media_id = IntegerField(null=False)
+  user = ForeignKeyField(User, on_delete='CASCADE', index=False)
+  seq = IntegerField(null=False)
+
+  class Meta:
+    table_name = 'media_changes'
+    primary_key = CompositeKey('media_type', 'media_id')
+    indexes = ((('user', 'seq'), False),)
+
+
+class Tombstone(BaseModel):
+  # media supprime, conserve pour les clients qui le possedent encore
+  media_type = CharField(null=False)
+  media_id = IntegerField(null=False)
+  user = ForeignKeyField(User, on_delete='CASCADE', index=False)
+  seq = IntegerField(null=False)
+
+  class Meta:
+    table_name = 'tombstones'
+    primary_key = CompositeKey('media_type', 'media_id')
+    indexes = ((('user', 'seq'), False),)
+
+
+def _next_seq() -> str:
+  sequence = SyncSequence._meta.table_name
+  return f'UPDATE {sequence} SET value = value + 1 WHERE id = 1;'
+
+
+def _current_seq() -> str:
+  return f'(SELECT value FROM {SyncSequence._meta.table_name} WHERE id = 1)'
+
+
+def _record(table: str, media_type: str, row: str) -> str:
+  return (
+    f'INSERT OR REPLACE INTO {table} (media_type, media_id, user_id, seq) '
+    f"VALUES ('{media_type}', {row}.id, {row}.user_id, {_current_seq()});"
+  )
+
+
+def _forget(table: str, media_type: str, row: str) -> str:
+  return (
+    f"DELETE FROM {table} WHERE media_type = '{media_type}' AND media_id = {row}.id;"
+  )
+
+
+def create_sync_triggers():
+  # triggers plutot que du code dans les services : create, update, bulk, progression
+  # et rafraichissement HowLongToBeat passent tous par la table
+  database = SyncSequence._meta.database
+  changes = MediaChange._meta.table_name
+  tombstones = Tombstone._meta.table_name
+  database.execute_sql(
+    f'INSERT OR IGNORE INTO {SyncSequence._meta.table_name} (id, value) VALUES (1, 0)'
+  )
+  for media_type, model in SYNC_MEDIA.items():
+    table = model._meta.table_name
+    triggers = {
+      # un id reutilise apres suppression redevient vivant : plus de tombstone
+      f'{table}_sync_insert': (
+        f'AFTER INSERT ON {table} BEGIN {_next_seq()} '
+        f'{_record(changes, media_type, "NEW")} {_forget(tombstones, media_type, "NEW")} END'
+      ),
+      f'{table}_sync_update': (
+        f'AFTER UPDATE ON {table} BEGIN {_next_seq()} '
+        f'{_record(changes, media_type, "NEW")} END'
+      ),
+      f'{table}_sync_delete': (
+        f'AFTER DELETE ON {table} BEGIN {_next_seq()} '
+        f'{_forget(changes, media_type, "OLD")} {_record(tombstones, media_type, "OLD")} END'
+      ),
+    }
+    with database.atomic():
+      for name, body in triggers.items():
+        database.execute_sql(f'DROP TRIGGER IF EXISTS {name}')
+        database.execute_sql(f'CREATE TRIGGER {name} {body}')
@@ -1,11 +1,27 @@
 from datetime import datetime
 from uuid import uuid4
 
-from peewee import CharField, DateTimeField, UUIDField
+from peewee import CharField, DateTimeField, ModelDelete, ModelUpdate, UUIDField
 
+from src.auth.cache import user_cache
 from src.database import BaseModel
 
 
+class _UserUpdate(ModelUpdate):
+  def _execute(self, database):
+    updated = super()._execute(database)
+    # role, mot de passe, desactivation... : les tokens en cache relisent l'utilisateur
+    user_cache.invalidate_all()
+    return updated
+
+
+class _UserDelete(ModelDelete):
+  def _execute(self, database):
+    deleted = super()._execute(database)
+    user_cache.invalidate_all()
+    return deleted
+
+
 class User(BaseModel):
   id = UUIDField(primary_key=True, default=uuid4)
   username = CharField(unique=True, null=False)
@@ -21,3 +37,13 @@ class User(BaseModel):
     if self.id is not None:  # Si c'est une mise à jour (pas une création)
       self.updated_at = datetime.now()
     return super().save(*args, **kwargs)
+
+  # toute ecriture passe par ces requetes, save et delete_instance compris :
+  # le cache d'authentification n'est jamais contourne
+  @classmethod
+  def update(cls, __data=None, **update):
+    return _UserUpdate(cls, cls._normalize_data(__data, update))
+
+  @classmethod
+  def delete(cls):
+    return _UserDelete(cls)
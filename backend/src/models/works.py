@@ -0,0 +1,49 @@
+import re
+from datetime import datetime
+
+from peewee import (
+  AutoField,
+  CharField,
+  DateTimeField,
+  FloatField,
+  IntegerField,
+)
+
+from src.database import BaseModel
+
+ISBN_SEPARATORS = re.compile(r'[\s-]')
+
+
+def normalize_isbn(isbn: str | None) -> str | None:
+  # 978-2-07-036822-8 et 9782070368228 designent la meme edition
+  if not isbn:
+    return None
+  return ISBN_SEPARATORS.sub('', isbn).upper() or None
+
+
+def game_key(title: str, platform: str | None) -> str:
+  # meme cle que le cache HowLongToBeat : un scraping par oeuvre
+  return f'{title.strip().lower()}|{(platform or "").strip().lower()}'
+
+
+class Work(BaseModel):
+  # fiche partagee entre utilisateurs, dedoublonnee par identifiant externe ;
+  # Book et Game restent les lignes de possession et de progression ; leurs
+  # metadonnees sont des surcharges par utilisateur, la fiche n'est que la reference
+  # qui comble les colonnes vides
+  id = AutoField()
+  media_type = CharField(null=False)  # 'book' ou 'game'
+  isbn = CharField(unique=True, null=True)  # normalise, sans tirets
+  google_books_id = CharField(unique=True, null=True)
+  hltb_key = CharField(unique=True, null=True)  # jeux : titre|plateforme
+  title = CharField(null=False)
+  author = CharField(null=True)
+  pages = IntegerField(null=True)
+  platform = CharField(null=True)
+  completion_time = FloatField(null=True)
+  cover_url = CharField(null=True)
+  created_at = DateTimeField(null=False, default=datetime.now)
+  updated_at = DateTimeField(null=True)
+
+  class Meta:
+    table_name = 'works'
@@ -1,27 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+  APIRouter,
+  Depends,
+  HTTPException,
+  Query,
+  Request,
+  Response,
+  UploadFile,
+)
+from fastapi.responses import StreamingResponse
 
 from src.auth.dependencies import get_current_admin, get_current_user
-from src.models import User
-from src.schemas.books import BookBase, BookResponse, BookUpdate
+from src.external.google_books import google_books
+from src.models import Book, User
+from src.schemas.books import BookBase, BookBulkRequest, BookResponse, BookUpdate
+from src.schemas.bulk import BulkResponse
+from src.schemas.jobs import JobResponse
+from src.schemas.pagination import Page
 from src.services.books_service import books_service
+from src.services.etag import etag_matches
+from src.services.export_service import ExportFormat, export_service
+from src.services.import_service import import_service
+from src.services.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
+from src.services.serialization import FastJSONResponse
 
 router = APIRouter(prefix='/books', tags=['books'])
 
 
-@router.get('/', response_model=list[BookResponse])
-def list_user_books(current_user: User = Depends(get_current_user)):
-  return books_service.list(current_user.id)
+@router.get('/', response_model=Page[BookResponse])
+def list_user_books(
+  request: Request,
+  limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+  cursor: str | None = None,
+  current_user: User = Depends(get_current_user),
+):
+  etag = books_service.etag(str(current_user.id), 'list', limit, cursor)
+  if etag_matches(request, etag):
+    return Response(status_code=304, headers={'ETag': etag})
+  books = books_service.list_rows(current_user.id, limit + 1, cursor)
+  page = paginate(books, limit, key=lambda book: (book['title'], book['id']))
+  return FastJSONResponse(page, headers={'ETag': etag})
+
+
+@router.get('/lookup', response_model=BookBase)
+async def lookup_book(
+  isbn: str | None = None,
+  google_books_id: str | None = None,
+  current_user: User = Depends(get_current_user),
+):
+  if not isbn and not google_books_id:
+    raise HTTPException(status_code=400, detail='isbn or google_books_id is required')
+  book = await google_books.lookup(isbn=isbn, google_books_id=google_books_id)
+  if book is None:
+    raise HTTPException(status_code=404, detail='Book not found')
+  return book
+
+
+@router.get('/export', response_class=StreamingResponse)
+def export_user_books(
+  export_format: ExportFormat = Query('ndjson', alias='format'),
+  gzip: bool = False,
+  current_user: User = Depends(get_current_user),
+):
+  # toute la collection en un flux, dans l'ordre des listes
+  return export_service.response(
+    Book, BookResponse, export_format, gzip, user=current_user.id
+  )
 
 
 @router.get('/{book_id}', response_model=BookResponse)
-def get_books(book_id: int, current_user: User = Depends(get_current_user)):
+def get_books(
+  book_id: int,
+  request: Request,
+  response: Response,
+  current_user: User = Depends(get_current_user),
+):
+  # un admin peut lire le book d'un autre : sa propre version ne suffit pas
+  if current_user.role != 'admin':
+    etag = books_service.etag(str(current_user.id), book_id)
+    if etag_matches(request, etag):
+      return Response(status_code=304, headers={'ETag': etag})
+    response.headers['ETag'] = etag
   book = books_service.get(book_id, current_user)
   return book
 
 
-@router.get('/admin/all', response_model=list[BookResponse])
-def list_all_books(current_user: User = Depends(get_current_admin)):
-  return books_service.list_all()
+@router.get('/admin/all', response_model=Page[BookResponse])
+def list_all_books(
+  limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+  cursor: str | None = None,
+  current_user: User = Depends(get_current_admin),
+):
+  books = books_service.list_all_rows(limit + 1, cursor)
+  page = paginate(books, limit, key=lambda book: (book['id'],))
+  return FastJSONResponse(page)
+
+
+@router.get('/admin/export', response_class=StreamingResponse)
+def export_all_books(
+  export_format: ExportFormat = Query('ndjson', alias='format'),
+  gzip: bool = False,
+  current_user: User = Depends(get_current_admin),
+):
+  return export_service.response(Book, BookResponse, export_format, gzip)
 
 
 @router.get('/admin/{book_id}', response_model=BookResponse)
@@ -34,6 +114,23 @@ def create_book(book: BookBase, current_user: User = Depends(get_current_user)):
   return books_service.create(book, user=str(current_user.id))
 
 
+@router.post('/bulk', response_model=BulkResponse)
+def bulk_books(data: BookBulkRequest, current_user: User = Depends(get_current_user)):
+  return books_service.bulk(data, user=str(current_user.id))
+
+
+@router.post('/import', response_model=JobResponse, status_code=202)
+def import_books(
+  file: UploadFile,
+  response: Response,
+  current_user: User = Depends(get_current_user),
+):
+  # export Goodreads ou CSV title,author,pages,isbn... ; progression dans le job
+  job = import_service.enqueue(file.file, current_user.id)
+  response.headers['Location'] = f'/api/jobs/{job.id}'
+  return job
+
+
 @router.patch('/{book_id}', response_model=BookResponse)
 def update_book(
   book_id: int, book: BookUpdate, current_user: User = Depends(get_current_user)
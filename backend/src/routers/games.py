@@ -1,27 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+  APIRouter,
+  Depends,
+  HTTPException,
+  Query,
+  Request,
+  Response,
+)
+from fastapi.responses import StreamingResponse
 
 from src.auth.dependencies import get_current_admin, get_current_user
-from src.models import User
-from src.schemas.games import GameCreate, GameResponse, GameUpdate
+from src.external.howlongtobeat import ENRICH_JOB
+from src.jobs import job_queue
+from src.models import Game, User
+from src.schemas.bulk import BulkResponse
+from src.schemas.games import GameBulkRequest, GameCreate, GameResponse, GameUpdate
+from src.schemas.pagination import Page
+from src.services.etag import etag_matches
+from src.services.export_service import ExportFormat, export_service
 from src.services.games_service import games_service
+from src.services.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
+from src.services.serialization import FastJSONResponse
 
 router = APIRouter(prefix='/games', tags=['games'])
 
 
-@router.get('/', response_model=list[GameResponse])
-def list_user_games(current_user: User = Depends(get_current_user)):
-  return games_service.list(str(current_user.id))
+@router.get('/', response_model=Page[GameResponse])
+def list_user_games(
+  request: Request,
+  limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+  cursor: str | None = None,
+  current_user: User = Depends(get_current_user),
+):
+  etag = games_service.etag(str(current_user.id), 'list', limit, cursor)
+  if etag_matches(request, etag):
+    return Response(status_code=304, headers={'ETag': etag})
+  games = games_service.list_rows(str(current_user.id), limit + 1, cursor)
+  page = paginate(games, limit, key=lambda game: (game['title'], game['id']))
+  return FastJSONResponse(page, headers={'ETag': etag})
+
+
+@router.get('/export', response_class=StreamingResponse)
+def export_user_games(
+  export_format: ExportFormat = Query('ndjson', alias='format'),
+  gzip: bool = False,
+  current_user: User = Depends(get_current_user),
+):
+  # toute la collection en un flux, dans l'ordre des listes
+  return export_service.response(
+    Game, GameResponse, export_format, gzip, user=current_user.id
+  )
 
 
 @router.get('/{game_id}', response_model=GameResponse)
-def get_games(game_id: int, current_user: User = Depends(get_current_user)):
+def get_games(
+  game_id: int,
+  request: Request,
+  response: Response,
+  current_user: User = Depends(get_current_user),
+):
+  # un admin peut lire le game d'un autre : sa propre version ne suffit pas
+  if current_user.role != 'admin':
+    etag = games_service.etag(str(current_user.id), game_id)
+    if etag_matches(request, etag):
+      return Response(status_code=304, headers={'ETag': etag})
+    response.headers['ETag'] = etag
   game = games_service.get(game_id, current_user)
   return game
 
 
-@router.get('/admin/all', response_model=list[GameResponse])
-def list_all_games(current_user: User = Depends(get_current_admin)):
-  return games_service.list_all()
+@router.get('/admin/all', response_model=Page[GameResponse])
+def list_all_games(
+  limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+  cursor: str | None = None,
+  current_user: User = Depends(get_current_admin),
+):
+  games = games_service.list_all_rows(limit + 1, cursor)
+  page = paginate(games, limit, key=lambda game: (game['id'],))
+  return FastJSONResponse(page)
+
+
+@router.get('/admin/export', response_class=StreamingResponse)
+def export_all_games(
+  export_format: ExportFormat = Query('ndjson', alias='format'),
+  gzip: bool = False,
+  current_user: User = Depends(get_current_admin),
+):
+  return export_service.response(Game, GameResponse, export_format, gzip)
 
 
 @router.get('/admin/{game_id}', response_model=GameResponse)
@@ -31,7 +95,24 @@ def get_all_games(game_id: int, current_user: User = Depends(get_current_admin))
 
 @router.post('/', response_model=GameResponse)
 def create_game(game: GameCreate, current_user: User = Depends(get_current_user)):
-  return games_service.create(game, user=str(current_user.id))
+  def enrich(created: Game):
+    if created.completion_time is None:
+      # scraping hors requete, par les workers ; une seule fois par jeu
+      job_queue.enqueue(
+        ENRICH_JOB,
+        {'game_id': created.id},
+        user=current_user.id,
+        priority=10,
+        key=f'{ENRICH_JOB}:{created.id}',
+      )
+
+  # jeu et job dans la meme transaction du thread d'ecriture
+  return games_service.create(game, user=str(current_user.id), after_create=enrich)
+
+
+@router.post('/bulk', response_model=BulkResponse)
+def bulk_games(data: GameBulkRequest, current_user: User = Depends(get_current_user)):
+  return games_service.bulk(data, user=str(current_user.id))
 
 
 @router.patch('/{game_id}', response_model=GameResponse)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+
+from src.auth.dependencies import get_current_user
+from src.models import User
+from src.schemas.jobs import JobResponse
+from src.services.jobs_service import jobs_service
+
+router = APIRouter(prefix='/jobs', tags=['jobs'])
+
+
+@router.get('/{job_id}', response_model=JobResponse)
+def get_job(job_id: int, current_user: User = Depends(get_current_user)):
+  return jobs_service.get(job_id, current_user)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from src.auth.dependencies import get_current_user
+from src.models import User
+from src.schemas.media import MediaItem, MediaStatus, MediaType
+from src.schemas.pagination import Page
+from src.services.etag import etag_matches
+from src.services.media_service import media_service
+from src.services.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
+from src.services.serialization import FastJSONResponse
+
+router = APIRouter(prefix='/media', tags=['media'])
+
+
+@router.get('/', response_model=Page[MediaItem])
+def list_user_media(
+  request: Request,
+  media_type: MediaType | None = Query(None, alias='type'),
+  status: MediaStatus | None = None,
+  limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+  cursor: str | None = None,
+  current_user: User = Depends(get_current_user),
+):
+  # livres et jeux melanges, du plus recemment actif au plus ancien
+  etag = media_service.etag(
+    str(current_user.id), 'list', media_type, status, limit, cursor
+  )
+  if etag_matches(request, etag):
+    return Response(status_code=304, headers={'ETag': etag})
+  rows = media_service.list_rows(current_user.id, limit + 1, cursor, media_type, status)
+  page = paginate(
+    rows, limit, key=lambda row: (str(row['activity_at']), row['id'], row['type'])
+  )
+  return FastJSONResponse(page, headers={'ETag': etag})
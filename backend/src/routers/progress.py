@@ -0,0 +1,33 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from src.auth.dependencies import get_current_user
+from src.models import User
+from src.schemas.progress import (
+  ProgressBatch,
+  ProgressBatchResponse,
+  ProgressEventResponse,
+)
+from src.services.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from src.services.progress_service import progress_service
+
+router = APIRouter(prefix='/progress', tags=['progress'])
+
+
+@router.post('/', response_model=ProgressBatchResponse)
+def ingest_progress(
+  batch: ProgressBatch, current_user: User = Depends(get_current_user)
+):
+  inserted = progress_service.ingest(batch.events, user=str(current_user.id))
+  return {'inserted': inserted}
+
+
+@router.get('/{media_type}/{media_id}', response_model=list[ProgressEventResponse])
+def list_progress(
+  media_type: Literal['book', 'game'],
+  media_id: int,
+  limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+  current_user: User = Depends(get_current_user),
+):
+  return progress_service.list(str(current_user.id), media_type, media_id, limit)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.auth.dependencies import get_current_user
+from src.models import User
+from src.schemas.search import SearchResult
+from src.services.pagination import MAX_LIMIT
+from src.services.search_service import search_service
+
+router = APIRouter(prefix='/search', tags=['search'])
+
+
+@router.get('/', response_model=list[SearchResult])
+def search(
+  q: str = Query(min_length=1, max_length=200),
+  limit: int = Query(20, ge=1, le=MAX_LIMIT),
+  current_user: User = Depends(get_current_user),
+):
+  return search_service.search(current_user.id.hex, q, limit)
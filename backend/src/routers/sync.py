@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.auth.dependencies import get_current_user
+from src.models import User
+from src.schemas.sync import SyncResponse
+from src.services.serialization import FastJSONResponse
+from src.services.sync_service import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, sync_service
+
+router = APIRouter(prefix='/sync', tags=['sync'])
+
+
+@router.get('/', response_model=SyncResponse)
+def sync(
+  since: int = Query(0, ge=0),
+  limit: int = Query(DEFAULT_SYNC_LIMIT, ge=1, le=MAX_SYNC_LIMIT),
+  current_user: User = Depends(get_current_user),
+):
+  # since=0 : collection complete ; ensuite, le token de la reponse precedente
+  return FastJSONResponse(sync_service.changes(current_user.id, since, limit))
@@ -1,13 +1,31 @@
-from src.schemas.books import BookBase, BookCreate, BookResponse, BookUpdate
-from src.schemas.games import GameBase, GameCreate, GameResponse, GameUpdate
+from src.schemas.books import (
+  BookBase,
+  BookBulkRequest,
+  BookBulkUpdate,
+  BookCreate,
+  BookResponse,
+  BookUpdate,
+)
+from src.schemas.games import (
+  GameBase,
+  GameBulkRequest,
+  GameBulkUpdate,
+  GameCreate,
+  GameResponse,
+  GameUpdate,
+)
 from src.schemas.users import UserBase, UserCreate, UserResponse, UserUpdate
 
 __all__ = [
   'BookBase',
+  'BookBulkRequest',
+  'BookBulkUpdate',
   'BookCreate',
   'BookResponse',
   'BookUpdate',
   'GameBase',
+  'GameBulkRequest',
+  'GameBulkUpdate',
   'GameCreate',
   'GameResponse',
   'GameUpdate',
@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict, field_serializer
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_serializer
+
+from src.schemas.bulk import MAX_BULK_ITEMS
 
 
 class BookBase(BaseModel):
@@ -26,9 +28,20 @@ class BookUpdate(BaseModel):
   ended_at: datetime | None = None
 
 
+class BookBulkUpdate(BookUpdate):
+  id: int
+
+
+class BookBulkRequest(BaseModel):
+  create: list[BookBase] = Field(default=[], max_length=MAX_BULK_ITEMS)
+  update: list[BookBulkUpdate] = Field(default=[], max_length=MAX_BULK_ITEMS)
+  delete: list[int] = Field(default=[], max_length=MAX_BULK_ITEMS)
+
+
 class BookResponse(BookBase):
   id: int
-  user: str | object
+  # lit la colonne brute user_id pour ne pas charger le User a chaque ligne
+  user: str | object = Field(validation_alias=AliasChoices('user_id', 'user'))
   current_page: int | None = None
   type: str
   created_at: datetime
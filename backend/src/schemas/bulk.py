@@ -0,0 +1,18 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+MAX_BULK_ITEMS = 500
+
+
+class BulkItemResult(BaseModel):
+  index: int
+  status: Literal['created', 'updated', 'deleted', 'error']
+  id: int | None = None
+  detail: str | None = None
+
+
+class BulkResponse(BaseModel):
+  create: list[BulkItemResult] = []
+  update: list[BulkItemResult] = []
+  delete: list[BulkItemResult] = []
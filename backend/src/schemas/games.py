@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict, field_serializer
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_serializer
+
+from src.schemas.bulk import MAX_BULK_ITEMS
 
 
 class GameBase(BaseModel):
@@ -25,9 +27,20 @@ class GameUpdate(BaseModel):
   ended_at: datetime | None = None
 
 
+class GameBulkUpdate(GameUpdate):
+  id: int
+
+
+class GameBulkRequest(BaseModel):
+  create: list[GameCreate] = Field(default=[], max_length=MAX_BULK_ITEMS)
+  update: list[GameBulkUpdate] = Field(default=[], max_length=MAX_BULK_ITEMS)
+  delete: list[int] = Field(default=[], max_length=MAX_BULK_ITEMS)
+
+
 class GameResponse(GameBase):
   id: int
-  user: str | object  # type: ignore[assignment]
+  # lit la colonne brute user_id pour ne pas charger le User a chaque ligne
+  user: str | object = Field(validation_alias=AliasChoices('user_id', 'user'))  # type: ignore[assignment]
   type: str
   created_at: datetime
   updated_at: datetime | None = None
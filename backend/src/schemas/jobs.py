@@ -0,0 +1,31 @@
+import json
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+JobStatus = Literal['queued', 'running', 'done', 'failed']
+
+
+class JobResponse(BaseModel):
+  id: int
+  kind: str
+  status: JobStatus
+  priority: int
+  attempts: int
+  max_attempts: int
+  # prochain essai, ou premier passage pour un job differe
+  run_at: datetime
+  result: Any = None
+  last_error: str | None = None
+  created_at: datetime
+  started_at: datetime | None = None
+  finished_at: datetime | None = None
+
+  model_config = ConfigDict(from_attributes=True)
+
+  @field_validator('result', mode='before')
+  @classmethod
+  def parse_result(cls, result):
+    # stocke en JSON dans la table
+    return json.loads(result) if isinstance(result, str) else result
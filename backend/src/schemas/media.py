@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+MediaType = Literal['book', 'game']
+MediaStatus = Literal['in_progress', 'finished']
+
+
+class MediaItem(BaseModel):
+  # colonnes communes a Book et Game, pour le fil d'activite
+  type: MediaType
+  id: int
+  title: str
+  cover_url: str | None = None
+  created_at: datetime
+  updated_at: datetime | None = None
+  ended_at: datetime | None = None
+  # updated_at, ou created_at si la ligne n'a jamais ete modifiee : cle du tri
+  activity_at: datetime
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+MAX_PROGRESS_BATCH = 1000
+
+
+class ProgressEventCreate(BaseModel):
+  media_type: Literal['book', 'game']
+  media_id: int
+  value: float = Field(ge=0)
+  recorded_at: datetime | None = None
+
+  @field_validator('recorded_at')
+  @classmethod
+  def to_local_time(cls, recorded_at):
+    # les dates en base sont naives (heure locale), comme datetime.now
+    if recorded_at is not None and recorded_at.tzinfo is not None:
+      return recorded_at.astimezone().replace(tzinfo=None)
+    return recorded_at
+
+
+class ProgressBatch(BaseModel):
+  events: list[ProgressEventCreate] = Field(min_length=1, max_length=MAX_PROGRESS_BATCH)
+
+
+class ProgressBatchResponse(BaseModel):
+  inserted: int
+
+
+class ProgressEventResponse(BaseModel):
+  id: int
+  media_type: str
+  media_id: int
+  value: float
+  recorded_at: datetime
+
+  model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,11 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+  type: Literal['book', 'game']
+  id: int
+  title: str
+  subtitle: str | None = None
+  rank: float
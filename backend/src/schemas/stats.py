@@ -0,0 +1,14 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class UserStatsResponse(BaseModel):
+  books_total: int = 0
+  books_finished: int = 0
+  books_in_progress: int = 0
+  pages_read: int = 0
+  games_total: int = 0
+  games_finished: int = 0
+  games_in_progress: int = 0
+  hours_played: float = 0
+
+  model_config = ConfigDict(from_attributes=True)
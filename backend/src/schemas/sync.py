@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+
+from src.schemas.books import BookResponse
+from src.schemas.games import GameResponse
+from src.schemas.media import MediaType
+
+
+class DeletedMedia(BaseModel):
+  type: MediaType
+  id: int
+
+
+class SyncResponse(BaseModel):
+  # a renvoyer dans since au prochain appel
+  token: int
+  # la page est pleine : rappeler tout de suite avec le nouveau token
+  has_more: bool
+  books: list[BookResponse]
+  games: list[GameResponse]
+  deleted: list[DeletedMedia]
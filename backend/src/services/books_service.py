@@ -1,17 +1,52 @@
+from datetime import datetime
+
 from fastapi import HTTPException
+from peewee import Tuple
+
+from src.models import Book, User, UserStats
+from src.models.works import normalize_isbn
+from src.schemas import BookBulkRequest, BookCreate, BookResponse, BookUpdate
+from src.services.bulk import bulk_write
+from src.services.etag import collection_version, make_etag
+from src.services.pagination import decode_cursor
+from src.services.serialization import response_columns
+from src.services.works_service import works_service
+from src.write_queue import write_queue
+
 
-from src.models import Book, User
-from src.schemas import BookCreate, BookUpdate
+def _normalized(book: dict) -> dict:
+  # ISBN stocke sans tirets, comme a l'import : l'unicite (user, isbn) porte dessus
+  if book.get('isbn') is not None:
+    book['isbn'] = normalize_isbn(book['isbn'])
+  return book
 
 
 class BooksService:
   # list all books for a user
-  def list(self, user: str):
-    return Book.select().where(Book.user == user).order_by(Book.title)
+  def list(self, user: str, limit: int | None = None, cursor: str | None = None):
+    query = Book.select().where(Book.user == user)
+    if cursor:
+      title, book_id = decode_cursor(cursor, str, int)
+      # comparaison de lignes : SQLite reprend l'index (user, title, id) au curseur
+      query = query.where(Tuple(Book.title, Book.id) > Tuple(title, book_id))
+    return query.order_by(Book.title, Book.id).limit(limit)
 
   # list all books for admin
-  def list_all(self):
-    return Book.select()
+  def list_all(self, limit: int | None = None, cursor: str | None = None):
+    query = Book.select()
+    if cursor:
+      (book_id,) = decode_cursor(cursor, int)
+      query = query.where(Book.id > book_id)
+    return query.order_by(Book.id).limit(limit)
+
+  # variantes en dicts pour les listes, sans validation pydantic ligne par ligne
+  def list_rows(self, user: str, limit: int | None = None, cursor: str | None = None):
+    query = self.list(user, limit, cursor)
+    return query.select(*response_columns(Book, BookResponse)).dicts()
+
+  def list_all_rows(self, limit: int | None = None, cursor: str | None = None):
+    query = self.list_all(limit, cursor)
+    return query.select(*response_columns(Book, BookResponse)).dicts()
 
   def get(self, book_id: int, user: User):
     try:
@@ -23,25 +58,59 @@ class BooksService:
       raise HTTPException(status_code=404, detail='Book not found') from None
 
   def create(self, data: BookCreate, user: str):
-    book = data.model_dump()
+    book = _normalized(data.model_dump())
     book['user'] = user
-    return Book.create(**book)
+    return write_queue.run(self._create, book)
+
+  def _create(self, book: dict):
+    # rattachement au catalogue dans le thread d'ecriture, avec l'insertion
+    return Book.create(**works_service.attach_book(book))
 
   def update(self, book_id: int, user: User, data: BookUpdate):
-    q = Book.update(**data.model_dump(exclude_unset=True)).where(
-      Book.id == book_id, Book.user == user.id
-    )
-    row_updated = q.execute()
+    changes = _normalized(data.model_dump(exclude_unset=True))
+
+    def apply():
+      linked = works_service.relink_book(book_id, user.id, changes)
+      # une requete UPDATE ne passe pas par Book.save : updated_at pose ici
+      q = Book.update(**linked, updated_at=datetime.now()).where(
+        Book.id == book_id, Book.user == user.id
+      )
+      return q.execute()
+
+    row_updated = write_queue.run(apply)
     if row_updated == 0:
       raise HTTPException(status_code=404, detail='Book not found')
     return Book.get_by_id(book_id)
 
   def delete(self, book_id: int, user: User):
     q = Book.delete().where(Book.id == book_id, Book.user == user.id)
-    row_deleted = q.execute()
+    row_deleted = write_queue.run(q.execute)
     if row_deleted == 0:
       raise HTTPException(status_code=404, detail='Book not found')
     return row_deleted
 
+  def bulk(self, data: BookBulkRequest, user: str):
+    return write_queue.run(
+      bulk_write,
+      Book,
+      user,
+      create=[_normalized(book.model_dump()) for book in data.create],
+      update=[
+        (book.id, _normalized(book.model_dump(exclude_unset=True, exclude={'id'})))
+        for book in data.update
+      ],
+      delete=data.delete,
+      prepare_create=works_service.attach_books,
+      prepare_update=lambda book_id, changes: works_service.relink_book(
+        book_id, user, changes
+      ),
+      unique_fields=('isbn', 'google_books_id'),
+    )
+
+  # ETag fort : change des qu'un book de l'utilisateur est cree, modifie ou supprime
+  def etag(self, user: str, *params):
+    version = collection_version(user, UserStats.books_version)
+    return make_etag('books', user, version, *params)
+
 
 books_service = BooksService()
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from peewee import IntegrityError, chunked
+
+CHUNK_SIZE = 100
+
+
+def _result(index: int, status: str, id: int | None = None, detail: str | None = None):
+  return {'index': index, 'status': status, 'id': id, 'detail': detail}
+
+
+def _owned_ids(model, ids: list[int], user: str) -> set[int]:
+  owned: set[int] = set()
+  for chunk in chunked(ids, CHUNK_SIZE):
+    query = model.select(model.id).where(model.id.in_(chunk), model.user == user)
+    owned.update(id for (id,) in query.tuples())
+  return owned
+
+
+def bulk_create(model, rows: list[dict], user: str, unique_fields=(), prepare=None):
+  database = model._meta.database
+  results: list[dict | None] = [None] * len(rows)
+
+  # doublons detectes a l'avance, parmi les lignes de l'utilisateur ou dans le lot
+  for name in unique_fields:
+    field = getattr(model, name)
+    values = list({row[name] for row in rows if row.get(name) is not None})
+    taken: set[object] = set()
+    for chunk in chunked(values, CHUNK_SIZE):
+      query = model.select(field).where(field.in_(chunk), model.user == user)
+      taken.update(v for (v,) in query.tuples())
+    for index, row in enumerate(rows):
+      value = row.get(name)
+      if value is None or results[index] is not None:
+        continue
+      if value in taken:
+        results[index] = _result(index, 'error', detail=f'Duplicate {name}')
+      else:
+        taken.add(value)
+
+  pending = [(i, {**row, 'user': user}) for i, row in enumerate(rows) if not results[i]]
+  if prepare:
+    # prepare(lignes) -> lignes : tout le lot d'un coup (fiches Work en une passe)
+    prepared = prepare([row for _, row in pending])
+    pending = [(i, row) for (i, _), row in zip(pending, prepared, strict=True)]
+  for chunk in chunked(pending, CHUNK_SIZE):
+    try:
+      with database.atomic():
+        query = model.insert_many([row for _, row in chunk]).returning(model.id)
+        # les rowid sont attribues dans l'ordre des VALUES
+        ids: list[int | None] = sorted(id for (id,) in query.tuples().execute())
+    except IntegrityError:
+      # ecriture concurrente entre la verification et l'insert : ligne par ligne
+      ids = []
+      for index, row in chunk:
+        try:
+          with database.atomic():
+            ids.append(model.insert(row).execute())
+        except IntegrityError as e:
+          ids.append(None)
+          results[index] = _result(index, 'error', detail=str(e))
+    for (index, _), id in zip(chunk, ids, strict=True):
+      if id is not None:
+        results[index] = _result(index, 'created', id=id)
+  return results
+
+
+def bulk_update(model, updates: list[tuple[int, dict]], user: str, prepare=None):
+  database = model._meta.database
+  owned = _owned_ids(model, [id for id, _ in updates], user)
+  results = []
+  for index, (id, data) in enumerate(updates):
+    if id not in owned:
+      results.append(_result(index, 'error', id, f'{model.__name__} not found'))
+      continue
+    try:
+      if data:
+        if prepare:
+          data = prepare(id, data)
+        with database.atomic():
+          model.update(**data, updated_at=datetime.now()).where(
+            model.id == id
+          ).execute()
+      results.append(_result(index, 'updated', id))
+    except IntegrityError as e:
+      results.append(_result(index, 'error', id, str(e)))
+  return results
+
+
+def bulk_delete(model, ids: list[int], user: str):
+  owned = _owned_ids(model, ids, user)
+  for chunk in chunked(list(owned), CHUNK_SIZE):
+    model.delete().where(model.id.in_(chunk)).execute()
+  return [
+    _result(index, 'deleted', id)
+    if id in owned
+    else _result(index, 'error', id, f'{model.__name__} not found')
+    for index, id in enumerate(ids)
+  ]
+
+
+def bulk_write(
+  model,
+  user: str,
+  create,
+  update,
+  delete,
+  unique_fields=(),
+  prepare_create=None,
+  prepare_update=None,
+):
+  # prepare_* : transformation des lignes juste avant l'ecriture (catalogue Work)
+  with model._meta.database.atomic():
+    return {
+      'create': bulk_create(model, create, user, unique_fields, prepare_create),
+      'update': bulk_update(model, update, user, prepare_update),
+      'delete': bulk_delete(model, delete, user),
+    }
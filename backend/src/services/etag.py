@@ -0,0 +1,26 @@
+import hashlib
+
+from fastapi import Request
+
+from src.models import UserStats
+
+
+def collection_version(user: str, version_field) -> int:
+  version = UserStats.select(version_field).where(UserStats.user == user).scalar()
+  return version or 0
+
+
+def make_etag(*parts) -> str:
+  digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+  return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+  header = request.headers.get('if-none-match')
+  if not header:
+    return False
+  if header.strip() == '*':
+    return True
+  # If-None-Match compare en mode faible (RFC 9110)
+  tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+  return etag in tags
@@ -0,0 +1,114 @@
+import csv
+import io
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from typing import Literal
+
+import orjson
+from fastapi.responses import StreamingResponse
+from peewee import Tuple, chunked
+from pydantic import BaseModel
+
+from src.database import db
+from src.services.serialization import response_columns
+
+ExportFormat = Literal['ndjson', 'csv']
+# lignes encodees par morceau envoye : assez pour amortir l'envoi, assez peu pour
+# garder la memoire plate
+EXPORT_BATCH = 500
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+
+def _ndjson(names: list[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+  for batch in chunked(rows, EXPORT_BATCH):
+    yield b''.join(
+      orjson.dumps(dict(zip(names, row, strict=True)), option=orjson.OPT_APPEND_NEWLINE)
+      for row in batch
+    )
+
+
+def _csv_value(value):
+  # memes dates que le JSON de l'API
+  return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv(names: list[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(names)
+  # en-tete envoye avant la premiere lecture en base
+  yield buffer.getvalue().encode()
+  for batch in chunked(rows, EXPORT_BATCH):
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerows([_csv_value(value) for value in row] for row in batch)
+    yield buffer.getvalue().encode()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+  # 16 + MAX_WBITS : en-tete et controle gzip, compression au fil de l'eau
+  compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+  for chunk in chunks:
+    if data := compressor.compress(chunk):
+      yield data
+  yield compressor.flush()
+
+
+class ExportService:
+  """Export complet en flux : lu par lots en suivant l'index, encode et envoye
+  par morceaux, jamais charge en entier."""
+
+  def rows(self, model, schema: type[BaseModel], user=None) -> Iterator[tuple]:
+    names = list(schema.model_fields)
+    # toute la table : ordre du rowid ; un utilisateur : index (user, title, id)
+    order = (model.id,) if user is None else (model.title, model.id)
+    positions = [names.index(field.name) for field in order]
+    last = None
+    while True:
+      query = model.select(*response_columns(model, schema))
+      if user is not None:
+        query = query.where(model.user == user)
+      if last is not None:
+        query = query.where(Tuple(*order) > Tuple(*last))
+      query = query.order_by(*order).limit(EXPORT_BATCH).tuples()
+      # une connexion par lot : un client lent n'en tient aucune entre deux lots
+      with db.connection_scope():
+        batch = list(query)
+      yield from batch
+      if len(batch) < EXPORT_BATCH:
+        return
+      last = [batch[-1][i] for i in positions]
+
+  def stream(
+    self,
+    model,
+    schema: type[BaseModel],
+    export_format: ExportFormat,
+    compress: bool = False,
+    user=None,
+  ) -> Iterator[bytes]:
+    encode = _ndjson if export_format == 'ndjson' else _csv
+    chunks = encode(list(schema.model_fields), self.rows(model, schema, user))
+    return _gzip(chunks) if compress else chunks
+
+  def response(
+    self,
+    model,
+    schema: type[BaseModel],
+    export_format: ExportFormat,
+    compress: bool = False,
+    user=None,
+  ) -> StreamingResponse:
+    filename = f'{model._meta.table_name}s.{export_format}'
+    media_type = MEDIA_TYPES[export_format]
+    if compress:
+      filename, media_type = f'{filename}.gz', 'application/gzip'
+    return StreamingResponse(
+      self.stream(model, schema, export_format, compress, user),
+      media_type=media_type,
+      headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+export_service = ExportService()
@@ -1,17 +1,44 @@
+from datetime import datetime
+
 from fastapi import HTTPException
+from peewee import Tuple
 
-from src.models import Game, User
-from src.schemas.games import GameCreate, GameUpdate
+from src.models import Game, User, UserStats
+from src.schemas.games import GameBulkRequest, GameCreate, GameResponse, GameUpdate
+from src.services.bulk import bulk_write
+from src.services.etag import collection_version, make_etag
+from src.services.pagination import decode_cursor
+from src.services.serialization import response_columns
+from src.services.works_service import works_service
+from src.write_queue import write_queue
 
 
 class GamesService:
   # list all Games for a user
-  def list(self, user: str):
-    return Game.select().where(Game.user == user).order_by(Game.title)
+  def list(self, user: str, limit: int | None = None, cursor: str | None = None):
+    query = Game.select().where(Game.user == user)
+    if cursor:
+      title, game_id = decode_cursor(cursor, str, int)
+      # comparaison de lignes : SQLite reprend l'index (user, title, id) au curseur
+      query = query.where(Tuple(Game.title, Game.id) > Tuple(title, game_id))
+    return query.order_by(Game.title, Game.id).limit(limit)
 
   # list all Games for admin
-  def list_all(self):
-    return Game.select()
+  def list_all(self, limit: int | None = None, cursor: str | None = None):
+    query = Game.select()
+    if cursor:
+      (game_id,) = decode_cursor(cursor, int)
+      query = query.where(Game.id > game_id)
+    return query.order_by(Game.id).limit(limit)
+
+  # variantes en dicts pour les listes, sans validation pydantic ligne par ligne
+  def list_rows(self, user: str, limit: int | None = None, cursor: str | None = None):
+    query = self.list(user, limit, cursor)
+    return query.select(*response_columns(Game, GameResponse)).dicts()
+
+  def list_all_rows(self, limit: int | None = None, cursor: str | None = None):
+    query = self.list_all(limit, cursor)
+    return query.select(*response_columns(Game, GameResponse)).dicts()
 
   def get(self, game_id: int, user: User):
     try:
@@ -22,26 +49,64 @@ class GamesService:
     except Game.DoesNotExist:
       raise HTTPException(status_code=404, detail='Game not found') from None
 
-  def create(self, data: GameCreate, user: str):
+  def create(self, data: GameCreate, user: str, after_create=None):
     game = data.model_dump()
     game['user'] = user
-    return Game.create(**game)
+    return write_queue.run(self._create, game, after_create)
+
+  def _create(self, game: dict, after_create=None):
+    # rattachement au catalogue dans le thread d'ecriture, avec l'insertion ;
+    # after_create(jeu) (job d'enrichissement) commite ou annule avec lui
+    with Game._meta.database.atomic():
+      created = Game.create(**works_service.attach_game(game))
+      if after_create:
+        after_create(created)
+    return created
 
   def update(self, game_id: int, user: User, data: GameUpdate):
-    q = Game.update(**data.model_dump(exclude_unset=True)).where(
-      Game.id == game_id, Game.user == user.id
-    )
-    row_updated = q.execute()
+    changes = data.model_dump(exclude_unset=True)
+
+    def apply():
+      linked = works_service.relink_game(game_id, user.id, changes)
+      # une requete UPDATE ne passe pas par Game.save : updated_at pose ici
+      q = Game.update(**linked, updated_at=datetime.now()).where(
+        Game.id == game_id, Game.user == user.id
+      )
+      return q.execute()
+
+    row_updated = write_queue.run(apply)
     if row_updated == 0:
       raise HTTPException(status_code=404, detail='Game not found')
     return Game.get_by_id(game_id)
 
   def delete(self, game_id: int, user: User):
     q = Game.delete().where(Game.id == game_id, Game.user == user.id)
-    row_deleted = q.execute()
+    row_deleted = write_queue.run(q.execute)
     if row_deleted == 0:
       raise HTTPException(status_code=404, detail='Game not found')
     return row_deleted
 
+  def bulk(self, data: GameBulkRequest, user: str):
+    return write_queue.run(
+      bulk_write,
+      Game,
+      user,
+      create=[game.model_dump() for game in data.create],
+      update=[
+        (game.id, game.model_dump(exclude_unset=True, exclude={'id'}))
+        for game in data.update
+      ],
+      delete=data.delete,
+      prepare_create=works_service.attach_games,
+      prepare_update=lambda game_id, changes: works_service.relink_game(
+        game_id, user, changes
+      ),
+    )
+
+  # ETag fort : change des qu'un game de l'utilisateur est cree, modifie ou supprime
+  def etag(self, user: str, *params):
+    version = collection_version(user, UserStats.games_version)
+    return make_etag('games', user, version, *params)
+
 
 games_service = GamesService()
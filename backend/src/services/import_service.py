@@ -0,0 +1,189 @@
+import csv
+import json
+import shutil
+import uuid
+from collections.abc import Iterator
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import HTTPException
+from peewee import JOIN, chunked
+from pydantic import ValidationError
+
+from src.config import settings
+from src.jobs import job_queue
+from src.models import Book, Job, Work
+from src.models.works import normalize_isbn
+from src.schemas.books import BookBase
+from src.services.bulk import CHUNK_SIZE, bulk_create
+from src.services.works_service import works_service
+from src.write_queue import write_queue
+
+IMPORT_JOB = 'books.import'
+# quelques erreurs en exemple dans la progression, le reste est seulement compte
+MAX_ERROR_SAMPLES = 20
+
+# champ de BookBase -> colonnes acceptees, par ordre de preference ; en-tetes
+# compares en minuscules : export Goodreads ou CSV aux noms de champs de l'API
+COLUMNS = {
+  'title': ('title',),
+  'author': ('author',),
+  'pages': ('pages', 'number of pages'),
+  'isbn': ('isbn13', 'isbn'),
+  'google_books_id': ('google_books_id',),
+  'cover_url': ('cover_url',),
+}
+
+
+def _clean(value: str | None) -> str | None:
+  # Goodreads exporte les ISBN sous la forme ="9780439023481"
+  if value is None:
+    return None
+  value = value.strip().removeprefix('=').strip('"').strip()
+  return value or None
+
+
+def _header_map(header: list[str]) -> dict[str, int]:
+  positions = {name.strip().lower(): i for i, name in enumerate(header)}
+  mapping = {}
+  for field, names in COLUMNS.items():
+    for name in names:
+      if name in positions:
+        mapping[field] = positions[name]
+        break
+  if 'title' not in mapping:
+    raise ValueError('CSV header has no title column')
+  return mapping
+
+
+def parse_books(lines: Iterator[str]) -> Iterator[tuple[int, dict | str]]:
+  """(numero de ligne, livre) ou (numero de ligne, erreur), une ligne a la fois."""
+  reader = csv.reader(lines)
+  mapping = _header_map(next(reader, []))
+  for row in reader:
+    if not any(cell.strip() for cell in row):
+      continue
+    values = {
+      field: _clean(row[i]) if i < len(row) else None for field, i in mapping.items()
+    }
+    try:
+      book = BookBase.model_validate({k: v for k, v in values.items() if v is not None})
+    except ValidationError as e:
+      error = e.errors()[0]
+      yield reader.line_num, f'{".".join(map(str, error["loc"]))}: {error["msg"]}'
+      continue
+    book.isbn = normalize_isbn(book.isbn)
+    yield reader.line_num, book.model_dump()
+
+
+class ImportService:
+  """Import d'une bibliotheque CSV : fichier lu en flux par un job, insere par
+  paquets, chaque paquet commite avec la progression du job."""
+
+  def __init__(self, directory: str, chunk_size: int):
+    self.directory = Path(directory)
+    self.chunk_size = chunk_size
+
+  def enqueue(self, upload: BinaryIO, user) -> Job:
+    # copie par blocs : l'upload deja sur disque n'est jamais charge en memoire
+    self.directory.mkdir(parents=True, exist_ok=True)
+    path = self.directory / f'{uuid.uuid4().hex}.csv'
+    with path.open('wb') as destination:
+      shutil.copyfileobj(upload, destination)
+    # en-tete verifie tout de suite : un fichier illisible ne part pas en job
+    try:
+      with path.open(encoding='utf-8-sig', newline='') as file:
+        _header_map(next(csv.reader(file), []))
+    except (ValueError, csv.Error) as e:
+      path.unlink()
+      raise HTTPException(status_code=400, detail=str(e)) from e
+    return job_queue.enqueue(
+      IMPORT_JOB, {'path': str(path), 'user': str(user)}, user=user
+    )
+
+  def run(self, path: str, user: str) -> dict:
+    job = job_queue.current_job()
+    # nouvel essai : reprise apres le dernier paquet commite
+    progress = json.loads(job.result) if job and job.result else None
+    progress = progress or {
+      'rows': 0,
+      'created': 0,
+      'duplicates': 0,
+      'errors': 0,
+      'error_samples': [],
+    }
+    with open(path, encoding='utf-8-sig', newline='') as file:
+      rows = islice(parse_books(file), progress['rows'], None)
+      for chunk in chunked(rows, self.chunk_size):
+        progress = write_queue.run(
+          self._write_chunk, chunk, user, progress, job.id if job else None
+        )
+    # le fichier reste en place tant que le job peut etre retente
+    self.discard(path, user)
+    return progress
+
+  def discard(self, path: str, user: str):
+    # fin du job, reussi ou en echec definitif : le fichier n'est plus relu
+    Path(path).unlink(missing_ok=True)
+
+  def _taken_isbns(self, isbns: list[str], user: str) -> set[str]:
+    # deja possedes, y compris saisis avec tirets : compares via la fiche Work
+    taken: set[str] = set()
+    for chunk in chunked(isbns, CHUNK_SIZE):
+      owned = Book.select(Book.isbn).where(Book.user == user, Book.isbn.in_(chunk))
+      taken.update(isbn for (isbn,) in owned.tuples())
+      # CROSS JOIN : works reste la table externe, cherchee par l'index isbn ; sans
+      # lui, SQLite parcourt tous les livres de l'utilisateur des que la liste grandit
+      linked = (
+        Work.select(Work.isbn)
+        .join(Book, JOIN.CROSS)
+        .where(Book.work == Work.id, Work.isbn.in_(chunk), Book.user == user)
+      )
+      taken.update(isbn for (isbn,) in linked.tuples())
+    return taken
+
+  def _write_chunk(self, chunk, user: str, progress: dict, job_id: int | None):
+    with Book._meta.database.atomic():
+      return self._insert_chunk(chunk, user, progress, job_id)
+
+  def _insert_chunk(self, chunk, user: str, progress: dict, job_id: int | None):
+    progress = {**progress, 'error_samples': list(progress['error_samples'])}
+    books = []
+    for line, book in chunk:
+      if isinstance(book, str):
+        progress['errors'] += 1
+        if len(progress['error_samples']) < MAX_ERROR_SAMPLES:
+          progress['error_samples'].append({'line': line, 'detail': book})
+      else:
+        books.append(book)
+    taken = self._taken_isbns([b['isbn'] for b in books if b['isbn']], user)
+    fresh = [b for b in books if b['isbn'] is None or b['isbn'] not in taken]
+    progress['duplicates'] += len(books) - len(fresh)
+
+    # doublons dans le fichier et ecritures concurrentes : verifies par bulk_create
+    results = bulk_create(
+      Book, fresh, user, ('isbn', 'google_books_id'), works_service.attach_books
+    )
+    for result in results:
+      if result['status'] == 'created':
+        progress['created'] += 1
+      elif result['detail'].startswith('Duplicate'):
+        progress['duplicates'] += 1
+      else:
+        progress['errors'] += 1
+    progress['rows'] += len(chunk)
+    # meme transaction que les livres : un job repris ne rejoue aucun paquet
+    if job_id is not None:
+      Job.update(result=json.dumps(progress)).where(Job.id == job_id).execute()
+    return progress
+
+
+import_service = ImportService(settings.IMPORT_DIR, settings.IMPORT_CHUNK_SIZE)
+job_queue.register(
+  IMPORT_JOB,
+  import_service.run,
+  # fichier mal encode ou CSV casse : un nouvel essai relirait les memes octets
+  fatal=(UnicodeDecodeError, csv.Error),
+  on_failed=import_service.discard,
+)
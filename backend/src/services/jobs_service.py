@@ -0,0 +1,15 @@
+from fastapi import HTTPException
+
+from src.models import Job, User
+
+
+class JobsService:
+  def get(self, job_id: int, user: User) -> Job:
+    job: Job | None = Job.get_or_none(Job.id == job_id)
+    # jobs systeme (sans utilisateur) et jobs des autres : visibles par l'admin seul
+    if job is None or (user.role != 'admin' and job.user_id != user.id):
+      raise HTTPException(status_code=404, detail='Job not found')
+    return job
+
+
+jobs_service = JobsService()
@@ -0,0 +1,80 @@
+from peewee import SQL, Tuple, fn
+
+from src.models import Book, Game, UserStats
+from src.services.etag import make_etag
+from src.services.pagination import decode_cursor
+
+# type -> (modele, colonne de progression), comme les compteurs de UserStats
+MEDIA = {
+  'book': (Book, Book.current_page),
+  'game': (Game, Game.time_played),
+}
+
+
+def activity(model):
+  # meme expression que l'index <table>_user_id_activity
+  return fn.COALESCE(model.updated_at, model.created_at)
+
+
+class MediaService:
+  """Fil d'activite : livres et jeux d'un utilisateur en une requete UNION ALL."""
+
+  def _select(self, media_type: str, user, status: str | None, cursor: list | None):
+    model, progress = MEDIA[media_type]
+    last_activity = activity(model)
+    query = model.select(
+      model.type,
+      model.id,
+      model.title,
+      model.cover_url,
+      model.created_at,
+      model.updated_at,
+      model.ended_at,
+      last_activity.python_value(model.updated_at.python_value).alias('activity_at'),
+    ).where(model.user == user)
+    if status == 'finished':
+      query = query.where(model.ended_at.is_null(False))
+    elif status == 'in_progress':
+      query = query.where(model.ended_at.is_null(), fn.COALESCE(progress, 0) > 0)
+    if cursor:
+      activity_at, media_id, cursor_type = cursor
+      # ordre (activity_at, id, type) decroissant ; type est constant dans une branche
+      key, position = Tuple(last_activity, model.id), Tuple(activity_at, media_id)
+      after = key <= position if media_type < cursor_type else key < position
+      # borne simple en plus : SQLite ne demarre pas l'index sur la comparaison de lignes
+      query = query.where(last_activity <= activity_at, after)
+    return query
+
+  def list_rows(
+    self,
+    user: str,
+    limit: int | None = None,
+    cursor: str | None = None,
+    media_type: str | None = None,
+    status: str | None = None,
+  ):
+    position = decode_cursor(cursor, str, int, str) if cursor else None
+    types = [media_type] if media_type else list(MEDIA)
+    arms = [self._select(t, user, status, position) for t in types]
+    query = arms[0]
+    for arm in arms[1:]:
+      query = query + arm  # UNION ALL
+    # chaque branche suit son index (user_id, activite, id) : fusion sans tri
+    return (
+      query.order_by(SQL('activity_at').desc(), SQL('id').desc(), SQL('type').desc())
+      .limit(limit)
+      .dicts()
+    )
+
+  # change des qu'un livre ou un jeu de l'utilisateur est ecrit
+  def etag(self, user: str, *params):
+    versions = (
+      UserStats.select(UserStats.books_version, UserStats.games_version)
+      .where(UserStats.user == user)
+      .tuples()
+      .first()
+    )
+    return make_etag('media', user, *(versions or (0, 0)), *params)
+
+
+media_service = MediaService()
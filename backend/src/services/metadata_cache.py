@@ -0,0 +1,35 @@
+import json
+from datetime import datetime, timedelta
+
+from src.models import MetadataCache
+from src.write_queue import write_queue
+
+MISSING = object()
+
+
+def get_cached(source: str, key: str):
+  """Retourne le payload en cache, ou MISSING si absent ou expire."""
+  entry = MetadataCache.get_or_none(
+    MetadataCache.source == source,
+    MetadataCache.key == key,
+    MetadataCache.expires_at > datetime.now(),
+  )
+  if entry is None:
+    return MISSING
+  return None if entry.payload is None else json.loads(entry.payload)
+
+
+def set_cached(source: str, key: str, payload, ttl: float):
+  # par le thread d'ecriture : jamais en concurrence avec un lot en cours
+  write_queue.run(_set_cached, source, key, payload, ttl)
+
+
+def _set_cached(source: str, key: str, payload, ttl: float):
+  now = datetime.now()
+  MetadataCache.insert(
+    source=source,
+    key=key,
+    payload=None if payload is None else json.dumps(payload),
+    fetched_at=now,
+    expires_at=now + timedelta(seconds=ttl),
+  ).on_conflict_replace().execute()
@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from fastapi import HTTPException
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(*values: Any) -> str:
+  raw = json.dumps(values, separators=(',', ':')).encode()
+  return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+  # un type attendu par valeur : un curseur forge ne va jamais jusqu'a la requete
+  try:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded))
+  except (binascii.Error, ValueError):
+    raise HTTPException(status_code=400, detail='Invalid cursor') from None
+  if (
+    not isinstance(values, list)
+    or len(values) != len(types)
+    or any(type(v) is not t for v, t in zip(values, types, strict=False))
+  ):
+    raise HTTPException(status_code=400, detail='Invalid cursor')
+  return values
+
+
+def paginate(rows: Iterable, limit: int, key: Callable[[Any], tuple]) -> dict:
+  # la query doit etre limitee a limit + 1 pour savoir s'il reste une page
+  items = list(rows)
+  next_cursor = None
+  if len(items) > limit:
+    items = items[:limit]
+    next_cursor = encode_cursor(*key(items[-1]))
+  return {'items': items, 'next_cursor': next_cursor}
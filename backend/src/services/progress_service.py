@@ -0,0 +1,112 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import TypedDict
+
+from fastapi import HTTPException
+from peewee import Case, chunked, fn
+
+from src.models import Book, Game, ProgressEvent
+from src.schemas.progress import ProgressEventCreate
+from src.write_queue import write_queue
+
+MEDIA_MODELS = {'book': (Book, Book.current_page), 'game': (Game, Game.time_played)}
+
+
+class ProgressRow(TypedDict):
+  user: str
+  media_type: str
+  media_id: int
+  value: float
+  recorded_at: datetime
+  created_at: datetime
+
+
+class ProgressService:
+  def list(self, user: str, media_type: str, media_id: int, limit: int):
+    return (
+      ProgressEvent.select()
+      .where(
+        ProgressEvent.user == user,
+        ProgressEvent.media_type == media_type,
+        ProgressEvent.media_id == media_id,
+      )
+      .order_by(ProgressEvent.recorded_at.desc(), ProgressEvent.id.desc())
+      .limit(limit)
+    )
+
+  def ingest(self, events: Sequence[ProgressEventCreate], user: str):
+    now = datetime.now()
+    rows: list[ProgressRow] = [
+      {
+        'user': user,
+        'media_type': event.media_type,
+        'media_id': event.media_id,
+        'value': event.value,
+        'recorded_at': event.recorded_at or now,
+        'created_at': now,
+      }
+      for event in events
+    ]
+    # derniere valeur de chaque media : un seul UPDATE par type pour tout le lot
+    latest: dict[str, dict[int, ProgressRow]] = {'book': {}, 'game': {}}
+    for row in rows:
+      current = latest[row['media_type']].get(row['media_id'])
+      if current is None or row['recorded_at'] >= current['recorded_at']:
+        latest[row['media_type']][row['media_id']] = row
+
+    write_queue.run(self._write, rows, latest, user, now)
+    return len(rows)
+
+  def _write(
+    self,
+    rows: Sequence[ProgressRow],
+    latest: dict[str, dict[int, ProgressRow]],
+    user: str,
+    now,
+  ):
+    with ProgressEvent._meta.database.atomic():
+      for media_type, last_rows in latest.items():
+        if last_rows:
+          self._update_progress(media_type, last_rows, user, now)
+      for batch in chunked(rows, 100):
+        ProgressEvent.insert_many(batch).execute()
+
+  def _update_progress(
+    self, media_type: str, last_rows: dict[int, ProgressRow], user: str, now
+  ):
+    model, field = MEDIA_MODELS[media_type]
+    ids = list(last_rows)
+    owned = model.select(model.id).where(model.id.in_(ids), model.user == user)
+    if owned.count() != len(ids):
+      raise HTTPException(status_code=404, detail=f'{model.__name__} not found')
+
+    # deja enregistre plus recent : un lot arrive en retard n'ecrase pas la valeur
+    stored = (
+      ProgressEvent.select(ProgressEvent.media_id, fn.MAX(ProgressEvent.recorded_at))
+      .where(
+        ProgressEvent.user == user,
+        ProgressEvent.media_type == media_type,
+        ProgressEvent.media_id.in_(ids),
+      )
+      .group_by(ProgressEvent.media_id)
+      .tuples()
+    )
+    last_rows = dict(last_rows)
+    for media_id, recorded_at in stored:
+      if last_rows[media_id]['recorded_at'] < ProgressEvent.recorded_at.python_value(
+        recorded_at
+      ):
+        del last_rows[media_id]
+    if not last_rows:
+      return
+
+    cast = int if media_type == 'book' else float
+    value = Case(
+      model.id, [(media_id, cast(row['value'])) for media_id, row in last_rows.items()]
+    )
+    model.update({field: value, model.updated_at: now}).where(
+      model.id.in_(list(last_rows))
+    ).execute()
+
+
+progress_service = ProgressService()
@@ -0,0 +1,48 @@
+import re
+
+from src.models import MediaSearch
+
+WORD = re.compile(r'\w+')
+
+
+def match_expression(q: str, user: str) -> str | None:
+  # chaque mot devient un prefixe entre guillemets : pas d'injection de syntaxe FTS5
+  words = WORD.findall(q)
+  if not words:
+    return None
+  terms = ' '.join(f'"{word}"*' for word in words)
+  return f'owner:"u{user}" AND {{title subtitle}} : ({terms})'
+
+
+class SearchService:
+  def search(self, user: str, q: str, limit: int):
+    match = match_expression(q, user)
+    if match is None:
+      return []
+    rank = MediaSearch.bm25().alias('rank')
+    rows = (
+      MediaSearch.select(
+        MediaSearch.rowid,
+        MediaSearch.media_type,
+        MediaSearch.title,
+        MediaSearch.subtitle,
+        rank,
+      )
+      .where(MediaSearch.match(match))
+      .order_by(rank)
+      .limit(limit)
+      .tuples()
+    )
+    return [
+      {
+        'type': media_type,
+        'id': rowid // 2,
+        'title': title,
+        'subtitle': subtitle,
+        'rank': score,
+      }
+      for rowid, media_type, title, subtitle, score in rows
+    ]
+
+
+search_service = SearchService()
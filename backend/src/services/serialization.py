@@ -0,0 +1,19 @@
+from typing import Any
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class FastJSONResponse(Response):
+  """Reponse deja prete : lignes .dicts() encodees directement par orjson."""
+
+  media_type = 'application/json'
+
+  def render(self, content: Any) -> bytes:
+    return orjson.dumps(content)
+
+
+def response_columns(model, schema: type[BaseModel]) -> list:
+  # seules les colonnes du schema de reponse : le contrat reste BookResponse/GameResponse
+  return [getattr(model, name) for name in schema.model_fields]
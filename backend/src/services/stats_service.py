@@ -0,0 +1,13 @@
+from src.models import UserStats
+
+
+class StatsService:
+  # une seule lecture par cle primaire, la table est tenue a jour par triggers
+  def get(self, user: str):
+    stats = UserStats.get_or_none(UserStats.user == user)
+    if stats is None:
+      return UserStats(user=user)
+    return stats
+
+
+stats_service = StatsService()
@@ -0,0 +1,62 @@
+from peewee import SQL, Model, Value
+from pydantic import BaseModel
+
+from src.models import Book, Game, MediaChange, Tombstone
+from src.schemas import BookResponse, GameResponse
+from src.services.serialization import response_columns
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 1000
+
+# type -> (modele, schema de reponse)
+SYNC_RESPONSES: dict[str, tuple[type[Model], type[BaseModel]]] = {
+  'book': (Book, BookResponse),
+  'game': (Game, GameResponse),
+}
+
+
+class SyncService:
+  """Medias crees, modifies ou supprimes depuis un jeton de synchronisation."""
+
+  def _log(self, model, since: int, user: str, deleted: bool):
+    return model.select(
+      model.seq, model.media_type, model.media_id, Value(deleted).alias('deleted')
+    ).where(model.user == user, model.seq > since)
+
+  def _rows(self, media_type: str, ids: list[int], user: str) -> list[dict]:
+    if not ids:
+      return []
+    model, schema = SYNC_RESPONSES[media_type]
+    query = model.select(*response_columns(model, schema)).where(
+      model.id.in_(ids), model.user == user
+    )
+    return list(query.order_by(model.id).dicts())
+
+  def changes(self, user: str, since: int, limit: int) -> dict:
+    # journal et tombstones fusionnes par seq : chacun suit son index (user_id, seq)
+    query = self._log(MediaChange, since, user, False) + self._log(
+      Tombstone, since, user, True
+    )
+    log = list(query.order_by(SQL('seq')).limit(limit + 1).tuples())
+    has_more = len(log) > limit
+    log = log[:limit]
+
+    updated: dict[str, list[int]] = {media_type: [] for media_type in SYNC_RESPONSES}
+    deleted = []
+    for _, media_type, media_id, is_deleted in log:
+      if is_deleted:
+        deleted.append({'type': media_type, 'id': media_id})
+      else:
+        updated[media_type].append(media_id)
+    # une ligne modifiee entre les deux lectures est renvoyee dans son dernier etat, et
+    # reviendra au prochain appel : le client converge sans transaction de lecture
+    return {
+      'token': log[-1][0] if log else since,
+      'has_more': has_more,
+      'books': self._rows('book', updated['book'], user),
+      'games': self._rows('game', updated['game'], user),
+      'deleted': deleted,
+    }
+
+
+sync_service = SyncService()
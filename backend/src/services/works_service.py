@@ -0,0 +1,143 @@
+from collections.abc import Callable
+from datetime import datetime
+
+from peewee import chunked
+
+from src.models import Book, Game, Work
+from src.models.works import game_key, normalize_isbn
+from src.services.bulk import CHUNK_SIZE
+
+# metadonnees partagees : la fiche complete la ligne de l'utilisateur et inversement ;
+# la ligne reste une surcharge propre a l'utilisateur, jamais reecrite depuis la fiche
+BOOK_METADATA = ('author', 'pages', 'cover_url')
+GAME_METADATA = ('cover_url',)
+# colonnes qui designent l'oeuvre : les modifier change la fiche rattachee
+BOOK_KEYS = {'isbn', 'google_books_id'}
+GAME_KEYS = {'title', 'platform'}
+
+
+def _share(work: Work, row: dict, fields: tuple[str, ...]):
+  # les valeurs saisies par l'utilisateur gagnent ; les trous se remplissent
+  missing = {
+    name: row[name]
+    for name in fields
+    if row.get(name) is not None and getattr(work, name) is None
+  }
+  if missing:
+    Work.update(**missing, updated_at=datetime.now()).where(
+      Work.id == work.id
+    ).execute()
+    for name, value in missing.items():
+      setattr(work, name, value)
+  for name in fields:
+    if row.get(name) is None:
+      row[name] = getattr(work, name)
+
+
+class WorksService:
+  """Catalogue partage : rattache chaque livre ou jeu a sa fiche Work."""
+
+  def attach_books(self, rows: list[dict]) -> list[dict]:
+    # un lot : une lecture des fiches connues, une insertion des nouvelles ;
+    # a appeler depuis le thread d'ecriture, pas de course entre lecture et creation
+    rows = [dict(row) for row in rows]
+    keys = [
+      (normalize_isbn(row.get('isbn')), row.get('google_books_id')) for row in rows
+    ]
+    by_isbn: dict[str, Work] = {}
+    by_google_id: dict[str, Work] = {}
+    for chunk in chunked({isbn for isbn, _ in keys if isbn}, CHUNK_SIZE):
+      by_isbn.update((w.isbn, w) for w in Work.select().where(Work.isbn.in_(chunk)))
+    for chunk in chunked({gid for _, gid in keys if gid}, CHUNK_SIZE):
+      by_google_id.update(
+        (w.google_books_id, w)
+        for w in Work.select().where(Work.google_books_id.in_(chunk))
+      )
+
+    works: list[Work | None] = []
+    created: list[Work] = []
+    for row, (isbn, google_books_id) in zip(rows, keys, strict=True):
+      work = (by_isbn.get(isbn) if isbn else None) or (
+        by_google_id.get(google_books_id) if google_books_id else None
+      )
+      if work is None and (isbn or google_books_id):
+        work = Work(
+          media_type='book',
+          isbn=isbn,
+          google_books_id=google_books_id,
+          title=row['title'],
+          **{name: row.get(name) for name in BOOK_METADATA},
+        )
+        created.append(work)
+      if work is not None:
+        # les lignes suivantes du lot retrouvent la nouvelle fiche
+        if isbn:
+          by_isbn.setdefault(isbn, work)
+        if google_books_id:
+          by_google_id.setdefault(google_books_id, work)
+      works.append(work)
+
+    for chunk in chunked(created, CHUNK_SIZE):
+      query = Work.insert_many([w.__data__ for w in chunk]).returning(Work.id)
+      # les rowid sont attribues dans l'ordre des VALUES
+      ids = sorted(id for (id,) in query.tuples().execute())
+      for work, id in zip(chunk, ids, strict=True):
+        work.id = id
+
+    for row, work in zip(rows, works, strict=True):
+      if work is not None:
+        _share(work, row, BOOK_METADATA)
+      row['work'] = work.id if work else None
+    return rows
+
+  def attach_book(self, row: dict) -> dict:
+    return self.attach_books([row])[0]
+
+  def attach_game(self, row: dict) -> dict:
+    row = dict(row)
+    key = game_key(row['title'], row.get('platform'))
+    work = Work.get_or_none(Work.hltb_key == key)
+    if work is None:
+      work = Work.create(
+        media_type='game',
+        hltb_key=key,
+        title=row['title'],
+        platform=row.get('platform'),
+        cover_url=row.get('cover_url'),
+      )
+    _share(work, row, GAME_METADATA)
+    # duree HowLongToBeat deja connue pour cette oeuvre : pas de nouveau scraping
+    if row.get('completion_time') is None:
+      row['completion_time'] = work.completion_time
+    row['work'] = work.id
+    return row
+
+  def attach_games(self, rows: list[dict]) -> list[dict]:
+    return [self.attach_game(row) for row in rows]
+
+  def _relink(
+    self,
+    model,
+    keys: set,
+    attach: Callable[[dict], dict],
+    media_id: int,
+    user,
+    changes: dict,
+  ) -> dict:
+    if not keys & changes.keys():
+      return changes
+    current = (
+      model.select().where(model.id == media_id, model.user == user).dicts().first()
+    )
+    if current is None:
+      return changes
+    return {**changes, 'work': attach({**current, **changes})['work']}
+
+  def relink_book(self, book_id: int, user, changes: dict) -> dict:
+    return self._relink(Book, BOOK_KEYS, self.attach_book, book_id, user, changes)
+
+  def relink_game(self, game_id: int, user, changes: dict) -> dict:
+    return self._relink(Game, GAME_KEYS, self.attach_game, game_id, user, changes)
+
+
+works_service = WorksService()
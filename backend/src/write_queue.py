@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+from peewee import Database
+
+from src.config import settings
+from src.database import dedicated_connection
+
+
+@dataclass
+class _Job:
+  fn: Callable[..., Any]
+  args: tuple
+  kwargs: dict
+  future: Future = field(default_factory=Future)
+
+
+class WriteQueue:
+  """Thread d'ecriture unique : les ecritures concurrentes sont regroupees dans
+  une seule transaction (group commit), chaque appelant recoit son resultat."""
+
+  def __init__(self, max_batch: int, max_latency: float):
+    self.max_batch = max_batch
+    self.max_latency = max_latency
+    self.batches = 0
+    self.jobs = 0
+    self._queue: queue.Queue[_Job | None] = queue.Queue()
+    self._thread: threading.Thread | None = None
+    self._database: Database | None = None
+    # protege _thread et _stopping : aucun job ne passe derriere la sentinelle
+    self._lock = threading.Lock()
+    self._stopping = False
+
+  def start(self, database):
+    with self._lock:
+      if self._thread is not None:
+        return
+      self._database = database
+      self._thread = threading.Thread(target=self._loop, name='db-writer', daemon=True)
+      self._thread.start()
+
+  def stop(self):
+    with self._lock:
+      thread = self._thread
+      if thread is None or self._stopping:
+        return
+      self._stopping = True
+      self._queue.put(None)
+    thread.join()
+    # jobs restes en file (thread sorti en cours de lot) : l'appelant ne bloque pas
+    self._fail_pending(RuntimeError('Write queue stopped'))
+    with self._lock:
+      self._thread = None
+      self._stopping = False
+
+  def run(self, fn, *args, **kwargs):
+    if threading.current_thread() is self._thread:
+      return fn(*args, **kwargs)
+    with self._lock:
+      if self._stopping:
+        raise RuntimeError('Write queue is stopping')
+      # sans thread d'ecriture (tests, scripts) : direct
+      inline = self._thread is None
+      if not inline:
+        job = _Job(fn, args, kwargs)
+        self._queue.put(job)
+    if inline:
+      return fn(*args, **kwargs)
+    return job.future.result()
+
+  def _fail_pending(self, error: Exception):
+    while True:
+      try:
+        job = self._queue.get_nowait()
+      except queue.Empty:
+        return
+      if job is not None:
+        job.future.set_exception(error)
+
+  def _loop(self):
+    # connexion dediee : jamais en attente derriere les lecteurs du pool
+    with dedicated_connection(self._database):
+      stopping = False
+      while not stopping:
+        job = self._queue.get()
+        if job is None:
+          break
+        batch = [job]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+          timeout = deadline - time.monotonic()
+          if timeout <= 0:
+            break
+          try:
+            job = self._queue.get(timeout=timeout)
+          except queue.Empty:
+            break
+          if job is None:
+            stopping = True
+            break
+          batch.append(job)
+        self._commit(batch)
+
+  def _commit(self, batch: list[_Job]):
+    database = self._database
+    assert database is not None
+    outcomes: list[tuple[_Job, Any, Exception | None]] = []
+    try:
+      # BEGIN IMMEDIATE : verrou d'ecriture pris d'emblee ; en differe, un lot qui
+      # lit avant d'ecrire echoue (database is locked) si une autre connexion a
+      # commite entre-temps
+      with database.atomic('IMMEDIATE'):
+        for job in batch:
+          # un savepoint par appelant : une erreur n'annule que sa propre ecriture
+          try:
+            with database.atomic():
+              outcomes.append((job, job.fn(*job.args, **job.kwargs), None))
+          except Exception as e:
+            outcomes.append((job, None, e))
+    except Exception as e:
+      for job in batch:
+        job.future.set_exception(e)
+      return
+    self.batches += 1
+    self.jobs += len(batch)
+    # resultats rendus seulement une fois le commit fait
+    for job, result, error in outcomes:
+      if error is None:
+        job.future.set_result(result)
+      else:
+        job.future.set_exception(error)
+
+  def stats(self) -> dict:
+    return {'batches': self.batches, 'jobs': self.jobs, 'pending': self._queue.qsize()}
+
+
+write_queue = WriteQueue(
+  max_batch=settings.WRITE_BATCH_MAX_SIZE,
+  max_latency=settings.WRITE_BATCH_MAX_LATENCY_MS / 1000,
+)
@@ -1,11 +1,46 @@
+import re
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
 from peewee import SqliteDatabase
 
+from src.auth.cache import user_cache
 from src.auth.security import create_access_token
-from src.models import Book, Game, User
+from src.external.howlongtobeat import howlongtobeat
+from src.models import (
+  Book,
+  Game,
+  Job,
+  MediaChange,
+  MediaSearch,
+  MetadataCache,
+  ProgressEvent,
+  SyncSequence,
+  Tombstone,
+  User,
+  UserStats,
+  Work,
+)
+from src.models.search import create_search_triggers
+from src.models.stats import create_user_stats_triggers
+from src.models.sync import create_sync_triggers
 
 test_db = SqliteDatabase('file::memory:?cache=shared', uri=True)
+MODELS = [
+  Work,
+  Book,
+  User,
+  Game,
+  UserStats,
+  ProgressEvent,
+  MetadataCache,
+  MediaSearch,
+  SyncSequence,
+  MediaChange,
+  Tombstone,
+  Job,
+]
 
 
 def seed_users():
@@ -21,10 +56,13 @@ def seed_users():
 @pytest.fixture(autouse=True)  # autouse equivalent de beforeEach et afterEach
 def context():
   # 1. lier le modele a la base de données
-  test_db.bind([Book, User, Game], bind_refs=False, bind_backrefs=False)
+  test_db.bind(MODELS, bind_refs=False, bind_backrefs=False)
   test_db.connect()
   # 2. créer les tables
-  test_db.create_tables([Book, User, Game])
+  test_db.create_tables(MODELS)
+  create_user_stats_triggers()
+  create_search_triggers()
+  create_sync_triggers()
 
   # 3. créer un utilisateur de test
   ctx = seed_users()
@@ -33,8 +71,128 @@ def context():
   yield ctx
 
   # 5. nettoyer après le test
-  test_db.drop_tables([Book, User, Game])
+  test_db.drop_tables(MODELS)
   test_db.close()
+  user_cache.clear()
+
+
+class FakeHowLongToBeat:
+  def __init__(self, times=None):
+    self.times = times or {}
+    self.calls = []
+
+  async def search(self, title, platform):
+    self.calls.append((title, platform))
+    return self.times.get(title)
+
+
+@pytest.fixture(autouse=True)
+def hltb_scraper(monkeypatch):
+  # jamais de scraping reel pendant les tests
+  scraper = FakeHowLongToBeat()
+  monkeypatch.setattr(howlongtobeat, 'scraper', scraper)
+  monkeypatch.setattr(howlongtobeat, 'min_interval', 0)
+  return scraper
+
+
+class QueryLog(list):
+  """SQL execute sur la base de test, dans l'ordre ; les observateurs recoivent
+  aussi les parametres."""
+
+  def __init__(self, execute_sql):
+    super().__init__()
+    # execute_sql d'origine : ce qu'on y passe (EXPLAIN...) n'est pas enregistre
+    self.execute_sql = execute_sql
+    self.observers: list = []
+
+
+@pytest.fixture
+def queries(monkeypatch):
+  # enregistre chaque requete SQL executee sur la base de test
+  log = QueryLog(test_db.execute_sql)
+
+  def recording_execute_sql(sql, params=None, *args, **kwargs):
+    log.append(sql)
+    for observer in log.observers:
+      observer(sql, params)
+    return log.execute_sql(sql, params, *args, **kwargs)
+
+  monkeypatch.setattr(test_db, 'execute_sql', recording_execute_sql)
+  return log
+
+
+# SCAN t1 / SCAN TABLE book AS t1 (selon la version de SQLite), hors parcours d'index
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$')
+TABLE_ALIAS = re.compile(r'"(\w+)" AS "(\w+)"')
+# ORDER BY ou GROUP BY non couvert par un index
+TEMP_SORT = 'USE TEMP B-TREE'
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+# controle de transaction : hors budget
+TRANSACTION = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+class QueryBudget:
+  """Capture le SQL emis dans un bloc, verifie un nombre maximum de requetes et
+  signale parcours complets de table et tris temporaires via EXPLAIN QUERY PLAN."""
+
+  def __init__(self, execute_sql):
+    self.execute_sql = execute_sql
+    self.statements: list[tuple[str, tuple]] = []
+
+  def record(self, sql, params):
+    self.statements.append((sql, tuple(params or ())))
+
+  def plan(self, sql, params) -> list[str]:
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+      return []
+    rows = self.execute_sql(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    return [row[-1] for row in rows]
+
+  def full_scans(self, sql, params) -> list[str]:
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+    scans = (FULL_SCAN.match(detail) for detail in self.plan(sql, params))
+    return [aliases.get(scan.group(1), scan.group(1)) for scan in scans if scan]
+
+  def temp_sorts(self, sql, params) -> list[str]:
+    return [detail for detail in self.plan(sql, params) if TEMP_SORT in detail]
+
+  @contextmanager
+  def __call__(
+    self,
+    max_queries: int,
+    allow_scans: tuple[str, ...] = (),
+    allow_sorts: bool = False,
+  ):
+    start = len(self.statements)
+    captured: list[str] = []
+    yield captured
+    statements = [
+      (sql, params)
+      for sql, params in self.statements[start:]
+      if not sql.lstrip().upper().startswith(TRANSACTION)
+    ]
+    captured.extend(sql for sql, _ in statements)
+    listing = '\n'.join(f'  {sql}' for sql in captured)
+    if len(statements) > max_queries:
+      pytest.fail(
+        f'{len(statements)} queries for a budget of {max_queries}:\n{listing}'
+      )
+    for sql, params in statements:
+      scans = [t for t in self.full_scans(sql, params) if t not in allow_scans]
+      if scans:
+        pytest.fail(f'Full scan of {", ".join(scans)}:\n  {sql}')
+      sorts = [] if allow_sorts else self.temp_sorts(sql, params)
+      if sorts:
+        pytest.fail(f'{sorts[0]}:\n  {sql}')
+
+
+@pytest.fixture
+def query_budget(queries):
+  # with query_budget(3): client.get(...) -> au plus 3 requetes, sans full scan ni
+  # tri temporaire ; meme enregistrement que queries
+  budget = QueryBudget(queries.execute_sql)
+  queries.observers.append(budget.record)
+  return budget
 
 
 @pytest.fixture
@@ -0,0 +1,72 @@
+import time
+
+from src.auth.cache import UserCache, user_cache
+from src.models import User
+
+
+def test_authenticated_requests_hit_cache(auth_user, queries):
+  auth_user.get('/api/books/')
+  first = len(queries)
+  queries.clear()
+
+  auth_user.get('/api/books/')
+
+  assert user_cache.stats()['hits'] == 1
+  assert user_cache.stats()['misses'] == 1
+  # plus de lecture du User au deuxieme appel
+  assert len(queries) == first - 1
+
+
+def test_role_change_invalidates_cache(auth_user, context):
+  response = auth_user.get('/api/books/admin/all')
+  assert response.status_code == 403
+
+  user = User.get_by_id(context['test_user'].id)
+  user.role = 'admin'
+  user.save()
+
+  response = auth_user.get('/api/books/admin/all')
+  assert response.status_code == 200
+
+
+def test_deleted_user_is_rejected(auth_user, context):
+  assert auth_user.get('/api/books/').status_code == 200
+
+  User.get_by_id(context['test_user'].id).delete_instance()
+
+  response = auth_user.get('/api/books/')
+  assert response.status_code == 401
+
+
+def test_cache_evicts_least_recently_used(context):
+  cache = UserCache(max_size=2, ttl=60)
+  cache.set('a', context['test_user'])
+  cache.set('b', context['test_admin'])
+  cache.get('a')
+  cache.set('c', context['test_user'])
+
+  assert cache.get('b') is None
+  assert cache.get('a') is context['test_user']
+  assert cache.get('c') is context['test_user']
+  assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2}
+
+
+def test_cache_never_outlives_token(context):
+  cache = UserCache(max_size=10, ttl=60)
+  cache.set('expired', context['test_user'], expires_at=time.time() - 1)
+  cache.set('short', context['test_user'], expires_at=time.time() + 0.05)
+
+  assert cache.get('expired') is None
+  assert cache.get('short') is context['test_user']
+  time.sleep(0.06)
+  assert cache.get('short') is None
+
+
+def test_update_query_invalidates_cache(auth_user, context):
+  assert auth_user.get('/api/books/admin/all').status_code == 403
+
+  User.update(role='admin').where(User.id == context['test_user'].id).execute()
+
+  assert auth_user.get('/api/books/admin/all').status_code == 200
+  User.delete().where(User.id == context['test_user'].id).execute()
+  assert auth_user.get('/api/books/').status_code == 401
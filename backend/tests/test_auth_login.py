@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from src.auth import security
+from src.auth.security import decode_access_token, get_password_hash
+from src.main import app
+from src.models import User
+
+
+def create_user(password_hash):
+  return User.create(username='reader', email='reader@test.com', password=password_hash)
+
+
+def test_login(context):
+  user = create_user(get_password_hash('secret'))
+  client = TestClient(app)
+
+  response = client.post(
+    '/login', json={'email': 'reader@test.com', 'password': 'secret'}
+  )
+
+  assert response.status_code == 200
+  token = response.json()['access_token']
+  assert decode_access_token(token)['sub'] == str(user.id)
+
+
+def test_login_wrong_password(context):
+  create_user(get_password_hash('secret'))
+  client = TestClient(app)
+
+  response = client.post(
+    '/login', json={'email': 'reader@test.com', 'password': 'wrong'}
+  )
+  assert response.status_code == 401
+  response = client.post(
+    '/login', json={'email': 'unknown@test.com', 'password': 'secret'}
+  )
+  assert response.status_code == 401
+
+
+def test_login_rehashes_outdated_hash(context):
+  old_context = CryptContext(schemes=['bcrypt'], bcrypt__rounds=4)
+  user = create_user(old_context.hash('secret'))
+  client = TestClient(app)
+
+  response = client.post(
+    '/login', json={'email': 'reader@test.com', 'password': 'secret'}
+  )
+
+  assert response.status_code == 200
+  new_hash = User.get_by_id(user.id).password
+  assert new_hash != user.password
+  assert not security.pwd_context.needs_update(new_hash)
+  assert security.verify_password('secret', new_hash)
+
+
+def test_login_returns_503_when_pool_is_saturated(context, monkeypatch):
+  create_user(get_password_hash('secret'))
+  monkeypatch.setattr(security, '_password_slots', security.threading.Semaphore(0))
+  client = TestClient(app)
+
+  response = client.post(
+    '/login', json={'email': 'reader@test.com', 'password': 'secret'}
+  )
+
+  assert response.status_code == 503
+  assert response.headers['Retry-After'] == '1'
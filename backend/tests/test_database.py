@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from contextvars import copy_context
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from playhouse.pool import MaxConnectionsExceeded
+
+from src.database import ConnectionScopeMiddleware, MeteredPooledDatabase
+
+
+@pytest.fixture
+def pooled_db(tmp_path):
+  database = MeteredPooledDatabase(
+    str(tmp_path / 'pool.db'), max_connections=2, timeout=1, check_same_thread=False
+  )
+  yield database
+  database.close_all()
+
+
+def in_thread(fn):
+  # comme run_in_threadpool : le thread recoit une copie du contexte courant
+  result = []
+  context = copy_context()
+  thread = threading.Thread(target=lambda: result.append(context.run(fn)))
+  thread.start()
+  thread.join()
+  return result[0]
+
+
+def test_connection_scope_shares_one_connection_and_returns_it(pooled_db):
+  with pooled_db.connection_scope():
+    conn = pooled_db.connection()
+    assert in_thread(pooled_db.connection) is conn
+    assert pooled_db.pool_stats()['in_use'] == 1
+
+  stats = pooled_db.pool_stats()
+  assert stats['in_use'] == 0
+  assert stats['idle'] == 1
+  assert stats['checkouts'] == 1
+
+
+def test_threads_outside_scope_get_their_own_connection(pooled_db):
+  conn = pooled_db.connection()
+  assert in_thread(lambda: pooled_db.connection() is conn) is False
+  pooled_db.close()
+
+
+def test_exhausted_pool_waits_then_times_out(pooled_db):
+  # deux connexions tenues hors scope (thread principal + writer par ex.)
+  pooled_db.connect()
+  in_thread(pooled_db.connect)
+
+  with pytest.raises(MaxConnectionsExceeded):
+    with pooled_db.connection_scope():
+      pooled_db.connection()
+
+  stats = pooled_db.pool_stats()
+  assert stats['timeouts'] == 1
+  assert stats['checkouts'] == 2
+
+
+def test_middleware_scopes_connection_to_request(pooled_db):
+  app = FastAPI()
+  app.add_middleware(ConnectionScopeMiddleware, database=pooled_db)
+  seen = []
+
+  def dependency():
+    seen.append(pooled_db.connection())
+
+  @app.get('/')
+  def endpoint(_=Depends(dependency)):
+    seen.append(pooled_db.connection())
+    return {}
+
+  client = TestClient(app)
+  client.get('/')
+  client.get('/')
+
+  # dependance et route partagent la connexion, reutilisee d'une requete a l'autre
+  assert len(set(map(id, seen))) == 1
+  stats = pooled_db.pool_stats()
+  assert stats['in_use'] == 0
+  assert stats['checkouts'] == 2
+
+
+def test_dedicated_scope_stays_outside_reader_pool(pooled_db):
+  pooled_db.connect()
+  in_thread(pooled_db.connect)
+
+  with pooled_db.connection_scope(dedicated=True):
+    pooled_db.execute_sql('SELECT 1')
+    assert pooled_db.pool_stats()['dedicated'] == 1
+
+  stats = pooled_db.pool_stats()
+  assert (stats['in_use'], stats['dedicated'], stats['timeouts']) == (2, 0, 0)
+
+
+def test_middleware_releases_connection_before_body(pooled_db):
+  app = FastAPI()
+  app.add_middleware(ConnectionScopeMiddleware, database=pooled_db)
+  in_use = []
+
+  def body():
+    # corps envoye en flux : plus aucune connexion tenue par la requete
+    in_use.append(pooled_db.pool_stats()['in_use'])
+    yield b'ok'
+
+  @app.get('/')
+  def endpoint():
+    pooled_db.execute_sql('SELECT 1')
+    in_use.append(pooled_db.pool_stats()['in_use'])
+    return StreamingResponse(body())
+
+  TestClient(app).get('/')
+
+  assert in_use == [1, 0]
+
+
+def test_run_in_scope_gives_each_call_its_own_connection(pooled_db):
+  barrier = threading.Barrier(2)
+
+  def connection():
+    conn = pooled_db.connection()
+    barrier.wait(timeout=1)
+    return conn
+
+  async def concurrent():
+    return await asyncio.gather(
+      pooled_db.run_in_scope(connection), pooled_db.run_in_scope(connection)
+    )
+
+  first, second = asyncio.run(concurrent())
+
+  assert first is not second
+  assert pooled_db.pool_stats()['in_use'] == 0
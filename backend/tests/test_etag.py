@@ -0,0 +1,61 @@
+from src.models import Book
+
+
+def test_list_not_modified(auth_user, seed_books, queries):
+  response = auth_user.get('/api/books/')
+  etag = response.headers['ETag']
+  assert etag.startswith('"')
+  queries.clear()
+
+  response = auth_user.get('/api/books/', headers={'If-None-Match': etag})
+
+  assert response.status_code == 304
+  assert response.headers['ETag'] == etag
+  assert response.content == b''
+  # seulement la lecture de la version, pas de requete sur book
+  assert len(queries) == 1
+  assert 'user_stats' in queries[0]
+
+
+def test_list_etag_changes_on_write(auth_user, seed_books, context):
+  etag = auth_user.get('/api/books/').headers['ETag']
+
+  Book.create(title='New', user=context['test_user'].id)
+
+  response = auth_user.get('/api/books/', headers={'If-None-Match': etag})
+  assert response.status_code == 200
+  assert response.headers['ETag'] != etag
+  assert len(response.json()['items']) == 4
+
+
+def test_list_etag_depends_on_page(auth_user, seed_books):
+  first = auth_user.get('/api/books/', params={'limit': 1}).headers['ETag']
+  second = auth_user.get('/api/books/', params={'limit': 2}).headers['ETag']
+  assert first != second
+
+
+def test_other_users_writes_keep_etag(auth_user, seed_books, seed_games):
+  etag = auth_user.get('/api/books/').headers['ETag']
+  games_etag = auth_user.get('/api/games/').headers['ETag']
+
+  Book.update(current_page=10).where(Book.id == seed_books[3].id).execute()
+
+  response = auth_user.get('/api/books/', headers={'If-None-Match': etag})
+  assert response.status_code == 304
+  response = auth_user.get('/api/games/', headers={'If-None-Match': games_etag})
+  assert response.status_code == 304
+
+
+def test_detail_not_modified(auth_user, seed_games):
+  game = seed_games[0]
+  etag = auth_user.get(f'/api/games/{game.id}').headers['ETag']
+
+  response = auth_user.get(
+    f'/api/games/{game.id}', headers={'If-None-Match': f'W/{etag}, "other"'}
+  )
+  assert response.status_code == 304
+
+  auth_user.patch(f'/api/games/{game.id}', json={'time_played': 6.0})
+  response = auth_user.get(f'/api/games/{game.id}', headers={'If-None-Match': etag})
+  assert response.status_code == 200
+  assert response.json()['time_played'] == 6.0
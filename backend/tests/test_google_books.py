@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+
+from src.external.google_books import GoogleBooksClient
+from src.routers import books as books_router
+
+VOLUME = {
+  'id': 'zyTCAlFPjgYC',
+  'volumeInfo': {
+    'title': '1984',
+    'authors': ['George Orwell'],
+    'pageCount': 328,
+    'industryIdentifiers': [
+      {'type': 'ISBN_10', 'identifier': '0451524934'},
+      {'type': 'ISBN_13', 'identifier': '9780451524935'},
+    ],
+    'imageLinks': {'thumbnail': 'https://books.example/1984.jpg'},
+  },
+}
+
+
+def stub_google_books(request: httpx.Request):
+  # serveur Google Books minimal : /volumes?q=isbn:... et /volumes/{id}
+  if request.url.path == '/volumes':
+    isbn = request.url.params['q'].removeprefix('isbn:')
+    items = [VOLUME] if isbn == '9780451524935' else []
+    return httpx.Response(200, json={'totalItems': len(items), 'items': items})
+  if request.url.path == f'/volumes/{VOLUME["id"]}':
+    return httpx.Response(200, json=VOLUME)
+  return httpx.Response(404, json={'error': {'code': 404}})
+
+
+def make_client():
+  return GoogleBooksClient(
+    base_url='http://google-books.test',
+    api_key=None,
+    max_concurrency=2,
+    cache_ttl=60,
+    transport=httpx.MockTransport(stub_google_books),
+  )
+
+
+def test_lookup_fills_book_base(context):
+  client = make_client()
+
+  book = asyncio.run(client.lookup(isbn='9780451524935'))
+
+  assert book.title == '1984'
+  assert book.author == 'George Orwell'
+  assert book.pages == 328
+  assert book.isbn == '9780451524935'
+  assert book.google_books_id == 'zyTCAlFPjgYC'
+  assert book.cover_url == 'https://books.example/1984.jpg'
+
+
+def test_concurrent_lookups_are_coalesced(context):
+  client = make_client()
+
+  async def lookups():
+    return await asyncio.gather(
+      *(client.lookup(google_books_id='zyTCAlFPjgYC') for _ in range(10))
+    )
+
+  books = asyncio.run(lookups())
+
+  assert {book.title for book in books} == {'1984'}
+  assert client.upstream_calls == 1
+
+
+def test_lookups_are_cached_across_clients(context):
+  asyncio.run(make_client().lookup(isbn='9780451524935'))
+  client = make_client()
+
+  assert asyncio.run(client.lookup(isbn='9780451524935')).title == '1984'
+  assert client.upstream_calls == 0
+
+
+def test_isbn_spellings_share_one_lookup(context):
+  client = make_client()
+
+  for isbn in ('978-0-451-52493-5', '9780451524935', '978 0451524935'):
+    assert asyncio.run(client.lookup(isbn=isbn)).title == '1984'
+  assert client.upstream_calls == 1
+
+
+def test_missing_books_are_cached(context):
+  client = make_client()
+
+  assert asyncio.run(client.lookup(isbn='0000000000')) is None
+  assert asyncio.run(client.lookup(isbn='0000000000')) is None
+  assert client.upstream_calls == 1
+
+
+def test_lookup_route(auth_user, monkeypatch):
+  monkeypatch.setattr(books_router, 'google_books', make_client())
+
+  response = auth_user.get('/api/books/lookup', params={'isbn': '9780451524935'})
+  assert response.status_code == 200
+  assert response.json()['title'] == '1984'
+
+  response = auth_user.get('/api/books/lookup', params={'isbn': '0000000000'})
+  assert response.status_code == 404
+  response = auth_user.get('/api/books/lookup')
+  assert response.status_code == 400
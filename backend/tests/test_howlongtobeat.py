@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+
+from src.external.howlongtobeat import SOURCE, howlongtobeat
+from src.jobs import job_queue
+from src.models import Game, MetadataCache, Work
+from src.services.works_service import works_service
+
+
+def test_create_game_enriches_completion_time(auth_user, hltb_scraper):
+  hltb_scraper.times['Hades'] = 22.5
+
+  response = auth_user.post(
+    '/api/games/', json={'title': 'Hades', 'platform': 'PC', 'user': 'ignored'}
+  )
+
+  assert response.status_code == 200
+  # la reponse part avant l'enrichissement, fait par un worker de la file
+  assert response.json()['completion_time'] is None
+  assert Game.get_by_id(response.json()['id']).completion_time is None
+  assert job_queue.run_pending() == 1
+  assert Game.get_by_id(response.json()['id']).completion_time == 22.5
+  assert hltb_scraper.calls == [('Hades', 'PC')]
+
+
+def test_manual_completion_time_is_kept(auth_user, hltb_scraper):
+  response = auth_user.post(
+    '/api/games/',
+    json={'title': 'Hades', 'completion_time': 30.0, 'user': 'ignored'},
+  )
+
+  assert Game.get_by_id(response.json()['id']).completion_time == 30.0
+  assert hltb_scraper.calls == []
+
+
+def test_resolve_is_cached_including_misses(context, hltb_scraper):
+  hltb_scraper.times['Celeste'] = 8.0
+
+  async def resolve_twice():
+    return [
+      await howlongtobeat.resolve(title, 'Switch')
+      for title in ('Celeste', 'Unknown Game', 'celeste ', 'Unknown Game')
+    ]
+
+  assert asyncio.run(resolve_twice()) == [8.0, None, 8.0, None]
+  assert hltb_scraper.calls == [('Celeste', 'Switch'), ('Unknown Game', 'Switch')]
+
+
+def test_refresh_stale_entries(context, hltb_scraper):
+  game = Game.create(
+    **works_service.attach_game(
+      {'title': 'Outer Wilds', 'platform': 'PC', 'user': context['test_user'].id}
+    )
+  )
+  asyncio.run(howlongtobeat.resolve('Outer Wilds', 'PC'))
+  MetadataCache.update(expires_at=datetime.now()).where(
+    MetadataCache.source == SOURCE
+  ).execute()
+  hltb_scraper.times['Outer Wilds'] = 17.0
+
+  assert asyncio.run(howlongtobeat.refresh_stale()) == 1
+
+  assert Game.get_by_id(game.id).completion_time == 17.0
+  assert Work.get_by_id(game.work_id).completion_time == 17.0
+  # titre et plateforme tels que saisis, pas la cle normalisee du cache
+  assert hltb_scraper.calls[-1] == ('Outer Wilds', 'PC')
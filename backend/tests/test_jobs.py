@@ -0,0 +1,336 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.concurrency import run_in_threadpool
+
+from src.database import MeteredPooledDatabase
+from src.jobs import JobQueue
+from src.models import Job, User
+from src.write_queue import write_queue
+from tests.conftest import test_db as database
+
+
+@pytest.fixture
+def jobs(context):
+  queue = JobQueue(
+    workers=2,
+    poll_interval=0.01,
+    max_attempts=3,
+    retry_base=10,
+    retry_max=15,
+    lease=60,
+  )
+  yield queue
+  queue.stop()
+
+
+def wait_for(predicate, timeout=5.0):
+  deadline = time.monotonic() + timeout
+  while not predicate():
+    assert time.monotonic() < deadline, 'timed out'
+    time.sleep(0.01)
+
+
+def test_run_pending_executes_handler_with_payload(jobs):
+  calls = []
+
+  def handler(title, pages):
+    calls.append((title, pages))
+    return {'pages': pages * 2}
+
+  jobs.register('double', handler)
+  job = jobs.enqueue('double', {'title': 'Dune', 'pages': 412})
+
+  assert Job.get_by_id(job.id).status == 'queued'
+  assert jobs.run_pending() == 1
+
+  job = Job.get_by_id(job.id)
+  assert calls == [('Dune', 412)]
+  assert (job.status, job.attempts) == ('done', 1)
+  assert json.loads(job.result) == {'pages': 824}
+  assert job.finished_at is not None
+
+
+def test_async_handler(jobs):
+  async def handler(value):
+    return value + 1
+
+  jobs.register('increment', handler)
+  job = jobs.enqueue('increment', {'value': 1})
+  jobs.run_pending()
+
+  assert json.loads(Job.get_by_id(job.id).result) == 2
+
+
+def test_higher_priority_first_then_fifo(jobs):
+  order = []
+  jobs.register('record', lambda name: order.append(name))
+  for name, priority in (('low', 0), ('first', 5), ('second', 5), ('urgent', 10)):
+    jobs.enqueue('record', {'name': name}, priority=priority)
+
+  jobs.run_pending()
+
+  assert order == ['urgent', 'first', 'second', 'low']
+
+
+def test_idempotency_key_enqueues_once(jobs):
+  calls = []
+  jobs.register('once', lambda: calls.append(1))
+
+  first = jobs.enqueue('once', key='import:42')
+  second = jobs.enqueue('once', key='import:42')
+  jobs.run_pending()
+  # deja fait : la meme cle ne relance rien
+  third = jobs.enqueue('once', key='import:42')
+  jobs.run_pending()
+
+  assert first.id == second.id == third.id
+  assert Job.select().count() == 1
+  assert calls == [1]
+
+
+def test_failed_job_is_retried_with_backoff(jobs):
+  jobs.register('flaky', lambda: 1 / 0)
+  job = jobs.enqueue('flaky')
+
+  before = datetime.now()
+  jobs.run_pending()
+  job = Job.get_by_id(job.id)
+  assert (job.status, job.attempts) == ('queued', 1)
+  assert job.last_error == 'ZeroDivisionError: division by zero'
+  assert before + timedelta(seconds=10) <= job.run_at
+  # pas encore echu
+  assert jobs.run_pending() == 0
+
+  # deuxieme essai : delai double, plafonne a retry_max
+  Job.update(run_at=datetime.now()).execute()
+  jobs.run_pending()
+  job = Job.get_by_id(job.id)
+  assert job.run_at >= datetime.now() + timedelta(seconds=14)
+
+  Job.update(run_at=datetime.now()).execute()
+  jobs.run_pending()
+  job = Job.get_by_id(job.id)
+  assert (job.status, job.attempts) == ('failed', 3)
+  assert jobs.stats()['retried'] == 2
+  assert jobs.stats()['failed'] == 1
+
+
+def test_fatal_error_fails_at_once_and_cleans_up(jobs):
+  cleaned = []
+
+  def parse(name):
+    raise ValueError(f'{name} is unreadable')
+
+  jobs.register(
+    'parse', parse, fatal=(ValueError,), on_failed=lambda name: cleaned.append(name)
+  )
+  jobs.register(
+    'flaky', lambda name: 1 / 0, on_failed=lambda name: cleaned.append(name)
+  )
+  parsed = jobs.enqueue('parse', {'name': 'a.csv'})
+  flaky = jobs.enqueue('flaky', {'name': 'b.csv'}, max_attempts=2)
+
+  jobs.run_pending()
+
+  parsed = Job.get_by_id(parsed.id)
+  assert (parsed.status, parsed.attempts) == ('failed', 1)
+  assert parsed.last_error == 'ValueError: a.csv is unreadable'
+  # erreur ordinaire : nettoyage au dernier essai seulement
+  assert cleaned == ['a.csv']
+  Job.update(run_at=datetime.now()).where(Job.id == flaky.id).execute()
+  jobs.run_pending()
+  assert Job.get_by_id(flaky.id).status == 'failed'
+  assert cleaned == ['a.csv', 'b.csv']
+
+
+def test_delayed_job_waits_for_run_at(jobs):
+  jobs.register('later', lambda: None)
+  job = jobs.enqueue('later', delay=60)
+
+  assert jobs.run_pending() == 0
+  Job.update(run_at=datetime.now()).where(Job.id == job.id).execute()
+  assert jobs.run_pending() == 1
+
+
+def test_unknown_kind_is_rejected(jobs):
+  with pytest.raises(LookupError, match='nothing'):
+    jobs.enqueue('nothing')
+
+
+def test_claim_uses_index(jobs, query_budget):
+  jobs.register('noop', lambda: None)
+  for priority in range(3):
+    jobs.enqueue('noop', priority=priority)
+
+  with query_budget(2):
+    job = jobs._claim()
+
+  assert job.priority == 2
+
+
+def test_workers_resume_interrupted_jobs(jobs):
+  done = threading.Event()
+  jobs.register('resume', lambda: done.set())
+  # job en cours lors d'un arret brutal, bail depasse
+  job = jobs.enqueue('resume')
+  expired = datetime.now() - timedelta(seconds=61)
+  Job.update(status='running', attempts=1, heartbeat_at=expired).where(
+    Job.id == job.id
+  ).execute()
+  # encore dans son bail : peut-etre en cours chez un autre processus
+  live = jobs.enqueue('resume')
+  Job.update(status='running', attempts=1, heartbeat_at=datetime.now()).where(
+    Job.id == live.id
+  ).execute()
+
+  jobs.start(database)
+
+  assert done.wait(5)
+  wait_for(lambda: Job.get_by_id(job.id).status == 'done')
+  assert Job.get_by_id(job.id).attempts == 2
+  assert Job.get_by_id(live.id).status == 'running'
+  assert jobs.stats()['workers'] == 2
+
+
+def test_expired_lease_counts_as_an_attempt(jobs):
+  cleaned = []
+  jobs.register('crash', lambda name: None, on_failed=lambda name: cleaned.append(name))
+  expired = datetime.now() - timedelta(seconds=61)
+  retried = jobs.enqueue('crash', {'name': 'a.csv'})
+  # worker mort a chaque essai : plus de nouvel essai apres max_attempts
+  exhausted = jobs.enqueue('crash', {'name': 'b.csv'})
+  for job, attempts in ((retried, 1), (exhausted, 3)):
+    Job.update(status='running', attempts=attempts, heartbeat_at=expired).where(
+      Job.id == job.id
+    ).execute()
+
+  jobs._requeue_if_due()
+
+  retried = Job.get_by_id(retried.id)
+  assert (retried.status, retried.last_error) == ('queued', 'Lease expired')
+  exhausted = Job.get_by_id(exhausted.id)
+  assert (exhausted.status, exhausted.attempts) == ('failed', 3)
+  assert exhausted.finished_at is not None
+  assert cleaned == ['b.csv']
+  assert (jobs.stats()['retried'], jobs.stats()['failed']) == (1, 1)
+
+
+def test_running_job_keeps_its_lease(context):
+  queue = JobQueue(
+    workers=2,
+    poll_interval=0.01,
+    max_attempts=3,
+    retry_base=10,
+    retry_max=15,
+    lease=0.3,
+  )
+  calls = []
+
+  def slow():
+    calls.append(1)
+    # bien plus long que le bail : le renouvellement le garde a ce worker
+    time.sleep(1)
+
+  queue.register('slow', slow)
+  job = queue.enqueue('slow')
+  queue.start(database)
+  try:
+    wait_for(lambda: Job.get_by_id(job.id).status == 'done')
+  finally:
+    queue.stop()
+
+  assert Job.get_by_id(job.id).attempts == 1
+  assert calls == [1]
+
+
+def test_worker_survives_a_failed_iteration(jobs, monkeypatch):
+  done = threading.Event()
+  jobs.register('after', lambda: done.set())
+  claim = jobs._claim
+  errors = []
+
+  def broken_claim():
+    # premiers essais en erreur (base verrouillee...) : le worker continue
+    if len(errors) < 3:
+      errors.append(1)
+      raise RuntimeError('database is locked')
+    return claim()
+
+  monkeypatch.setattr(jobs, '_claim', broken_claim)
+  jobs.enqueue('after')
+  jobs.start(database)
+
+  assert done.wait(5)
+  assert all(thread.is_alive() for thread in jobs._threads)
+
+
+def test_workers_pick_up_new_jobs(jobs):
+  seen = []
+  jobs.register('collect', lambda i: seen.append(i))
+  jobs.start(database)
+
+  for i in range(10):
+    jobs.enqueue('collect', {'i': i})
+
+  wait_for(lambda: len(seen) == 10)
+  assert sorted(seen) == list(range(10))
+  jobs.stop()
+  assert jobs.stats()['workers'] == 0
+
+
+def test_workers_return_connections_between_jobs(jobs, tmp_path, monkeypatch):
+  # write_queue global demarre sur cette base ; ses compteurs restaures apres
+  monkeypatch.setattr(write_queue, 'batches', 0)
+  monkeypatch.setattr(write_queue, 'jobs', 0)
+  pooled = MeteredPooledDatabase(
+    str(tmp_path / 'jobs.db'), max_connections=2, timeout=1, check_same_thread=False
+  )
+  in_use = []
+
+  async def probe():
+    # comme hltb.enrich : lectures dans le threadpool depuis un handler async
+    await run_in_threadpool(pooled.execute_sql, 'SELECT 1')
+    in_use.append(pooled.pool_stats()['in_use'])
+
+  jobs.register('probe', probe)
+  with pooled.bind_ctx([User, Job]):
+    pooled.create_tables([User, Job])
+    pooled.close()
+    write_queue.start(pooled)
+    try:
+      jobs.start(pooled)
+      for _ in range(20):
+        jobs.enqueue('probe')
+      wait_for(lambda: jobs.stats()['completed'] == 20)
+      # workers au repos : plus aucune connexion tenue entre deux jobs
+      stats = pooled.pool_stats()
+      jobs.stop()
+    finally:
+      write_queue.stop()
+  pooled.close_all()
+
+  # connexion dediee le temps de chaque job, jamais prise au pool des lecteurs
+  assert set(in_use) == {0}
+  assert (stats['in_use'], stats['timeouts']) == (0, 0)
+  # seul le thread d'ecriture garde la sienne
+  assert stats['dedicated'] == 1
+
+
+def test_job_status_endpoint(auth_user, auth_admin, context):
+  mine = Job.create(
+    kind='hltb.enrich', payload='{}', max_attempts=5, user=context['test_user'].id
+  )
+  system = Job.create(kind='hltb.enrich', payload='{}', max_attempts=5)
+
+  response = auth_user.get(f'/api/jobs/{mine.id}')
+  assert response.status_code == 200
+  assert response.json()['status'] == 'queued'
+  assert response.json()['kind'] == 'hltb.enrich'
+
+  assert auth_user.get(f'/api/jobs/{system.id}').status_code == 404
+  assert auth_user.get('/api/jobs/999').status_code == 404
+  assert auth_admin.get(f'/api/jobs/{system.id}').status_code == 200
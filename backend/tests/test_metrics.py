@@ -0,0 +1,68 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.database import MeteredPooledDatabase
+from src.main import app
+from src.metrics import Histogram, Metrics, MetricsMiddleware
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+  histogram = Histogram('latency', 'Latency.', ('route',), (0.1, 1))
+  histogram.observe(0.05, '/a')
+  histogram.observe(0.5, '/a')
+  histogram.observe(5, '/a')
+
+  lines = list(histogram.render())
+  assert '# TYPE latency histogram' in lines
+  assert 'latency_bucket{route="/a",le="0.1"} 1' in lines
+  assert 'latency_bucket{route="/a",le="1"} 2' in lines
+  assert 'latency_bucket{route="/a",le="+Inf"} 3' in lines
+  assert 'latency_sum{route="/a"} 5.55' in lines
+  assert 'latency_count{route="/a"} 3' in lines
+
+
+def test_metrics_endpoint_exposes_route_templates_and_gauges(auth_user):
+  client.get('/health')
+  auth_user.get('/api/books/1')
+  response = client.get('/metrics')
+
+  assert response.status_code == 200
+  assert response.headers['content-type'].startswith('text/plain')
+  body = response.text
+  assert (
+    'mediapace_http_requests_total{method="GET",route="/health",status="200"}' in body
+  )
+  # le gabarit de route, pas l'url concrete
+  assert 'route="/api/books/{book_id}"' in body
+  assert 'route="/api/books/1"' not in body
+  assert '# TYPE mediapace_http_requests_in_flight gauge' in body
+  assert 'mediapace_http_response_size_bytes_bucket' in body
+  assert 'mediapace_db_pool_checkouts ' in body
+  assert 'mediapace_write_queue_pending ' in body
+
+
+def test_sql_queries_are_counted_per_request(tmp_path):
+  database = MeteredPooledDatabase(
+    str(tmp_path / 'metrics.db'), check_same_thread=False
+  )
+  registry = Metrics()
+  mini = FastAPI()
+  mini.add_middleware(MetricsMiddleware, registry=registry)
+
+  @mini.get('/items/{item_id}')
+  def item(item_id: int):
+    database.execute_sql('SELECT 1')
+    database.execute_sql('SELECT 2')
+    return {}
+
+  TestClient(mini).get('/items/7')
+  database.close_all()
+
+  body = registry.render()
+  labels = '{method="GET",route="/items/{item_id}"}'
+  assert f'mediapace_http_request_sql_queries_sum{labels} 2' in body
+  assert f'mediapace_http_request_sql_queries_count{labels} 1' in body
+  assert f'mediapace_http_request_sql_seconds_count{labels} 1' in body
+  assert 'mediapace_http_requests_in_flight 0' in body
@@ -0,0 +1,193 @@
+import pytest
+from peewee import IntegrityError, SqliteDatabase
+
+from src.migrations import (
+  SchemaVersionError,
+  check_schema_version,
+  current_version,
+  latest_version,
+  migrate,
+)
+from src.models import Book, Game, User, UserStats, Work
+from src.models.search import create_search_triggers
+from src.models.stats import create_user_stats_triggers
+from src.models.sync import create_sync_triggers
+from src.services.search_service import search_service
+from src.services.sync_service import sync_service
+from tests.conftest import MODELS
+
+
+def schema(database):
+  # tables, colonnes, index et triggers, hors table de version
+  tables = {}
+  rows = database.execute_sql(
+    "SELECT name FROM sqlite_master WHERE type = 'table' "
+    "AND name NOT LIKE 'sqlite_%' AND name != 'schema_version'"
+  )
+  for (name,) in rows.fetchall():
+    columns = database.execute_sql(f'PRAGMA table_info("{name}")').fetchall()
+    indexes = {
+      index[1]: (
+        index[2],
+        [c[2] for c in database.execute_sql(f'PRAGMA index_info("{index[1]}")')],
+      )
+      for index in database.execute_sql(f'PRAGMA index_list("{name}")').fetchall()
+    }
+    tables[name] = ([tuple(column[1:]) for column in columns], indexes)
+  # SQL des triggers compare aussi : celui fige dans les migrations reste a jour
+  triggers = database.execute_sql(
+    "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+  )
+  return tables, sorted(triggers.fetchall())
+
+
+@pytest.fixture
+def database():
+  database = SqliteDatabase(':memory:')
+  with database.bind_ctx(MODELS, bind_refs=False, bind_backrefs=False):
+    yield database
+  database.close()
+
+
+def test_migrations_match_models(database):
+  applied = migrate(database)
+
+  assert [m.version for m in applied] == list(range(1, latest_version() + 1))
+  assert current_version(database) == latest_version()
+  migrated = schema(database)
+
+  reference = SqliteDatabase(':memory:')
+  with reference.bind_ctx(MODELS, bind_refs=False, bind_backrefs=False):
+    reference.create_tables(MODELS)
+    create_user_stats_triggers()
+    create_search_triggers()
+    create_sync_triggers()
+    assert migrated == schema(reference)
+
+
+def test_migrations_do_not_use_model_code(tmp_path):
+  # base quelconque, modeles non lies : tout passe par le SQL fige
+  database = SqliteDatabase(str(tmp_path / 'standalone.db'))
+  migrate(database)
+
+  assert current_version(database) == latest_version()
+  triggers = database.execute_sql(
+    "SELECT count(*) FROM sqlite_master WHERE type = 'trigger'"
+  ).fetchone()[0]
+  assert triggers > 0
+  database.close()
+
+
+def test_migrate_is_a_noop_once_current(database):
+  migrate(database)
+  assert migrate(database) == []
+  check_schema_version(database)
+
+
+def test_migrate_upgrades_database_created_before_migrations(database):
+  # base du demarrage par create_tables, avec user_stats sans versions d'ETag
+  database.create_tables([User, Book])
+  database.execute_sql(
+    'CREATE TABLE "user_stats" ("user_id" TEXT NOT NULL PRIMARY KEY, '
+    '"books_total" INTEGER NOT NULL DEFAULT 0)'
+  )
+  user = User.create(username='old', email='old@old.com', password='x')
+  Book.create(title='Legacy Book', user=user.id, current_page=10)
+
+  migrate(database)
+
+  assert current_version(database) == latest_version()
+  stats = UserStats.get_by_id(user.id)
+  assert (stats.books_total, stats.pages_read) == (1, 10)
+  assert [r['title'] for r in search_service.search(user.id.hex, 'legacy', 10)] == [
+    'Legacy Book'
+  ]
+  # les medias existants font partie de la premiere synchronisation
+  changes = sync_service.changes(user.id, 0, 10)
+  assert [b['title'] for b in changes['books']] == ['Legacy Book']
+  # triggers poses par les migrations
+  Book.create(title='New Book', user=user.id)
+  assert UserStats.get_by_id(user.id).books_total == 2
+  assert [
+    b['title'] for b in sync_service.changes(user.id, changes['token'], 10)['books']
+  ] == ['New Book']
+
+
+def test_works_catalog_backfills_existing_media(database):
+  migrate(database, target=8)
+  alice = User.create(username='alice', email='alice@a.com', password='x')
+  bob = User.create(username='bob', email='bob@b.com', password='x')
+  database.execute_sql(
+    'INSERT INTO "book" ("user_id", "title", "isbn", "author", "current_page", '
+    '"created_at", "type") VALUES '
+    "(?, 'Dune', '978-2-266', 'Herbert', 0, '2024-01-01', 'book'), "
+    "(?, 'Dune', '9782266', NULL, 0, '2024-01-02', 'book'), "
+    "(?, 'Carnet', NULL, NULL, 0, '2024-01-03', 'book')",
+    (alice.id.hex, bob.id.hex, alice.id.hex),
+  )
+  database.execute_sql(
+    'INSERT INTO "game" ("user_id", "title", "platform", "completion_time", '
+    '"time_played", "created_at", "type") VALUES '
+    "(?, 'Hades', 'PC', NULL, 0, '2024-01-01', 'game'), "
+    "(?, 'hades', 'pc', 22.5, 0, '2024-01-02', 'game')",
+    (alice.id.hex, bob.id.hex),
+  )
+
+  migrate(database)
+
+  dune = [b.work_id for b in Book.select().where(Book.title == 'Dune')]
+  assert dune[0] is not None and dune[0] == dune[1]
+  assert Work.get_by_id(dune[0]).isbn == '9782266'
+  assert Book.get(Book.title == 'Carnet').work_id is None
+  hades = {g.work_id for g in Game.select()}
+  assert len(hades) == 1
+  assert Work.get_by_id(hades.pop()).completion_time == 22.5
+  # l'ISBN n'est plus unique que par utilisateur
+  Book.create(title='Dune', isbn='978-2-266', user=bob.id)
+
+
+def test_book_isbns_are_normalized_per_user(database):
+  migrate(database, target=10)
+  alice = User.create(username='alice', email='alice@a.com', password='x')
+  bob = User.create(username='bob', email='bob@b.com', password='x')
+  database.execute_sql(
+    'INSERT INTO "book" ("user_id", "title", "isbn", "current_page", "created_at", '
+    '"type") VALUES '
+    "(?, 'Dune', '978-2-266-32081-0', 0, '2024-01-01', 'book'), "
+    "(?, 'Dune again', '9782266320810', 0, '2024-01-02', 'book'), "
+    "(?, 'Dune', '978 2266 320810', 0, '2024-01-03', 'book'), "
+    "(?, 'Blank', ' - ', 0, '2024-01-04', 'book')",
+    (alice.id.hex, alice.id.hex, bob.id.hex, bob.id.hex),
+  )
+
+  migrate(database)
+
+  isbns = {(b.user_id, b.title): b.isbn for b in Book.select()}
+  # doublon chez alice : le plus ancien garde l'ISBN
+  assert isbns == {
+    (alice.id, 'Dune'): '9782266320810',
+    (alice.id, 'Dune again'): None,
+    (bob.id, 'Dune'): '9782266320810',
+    (bob.id, 'Blank'): None,
+  }
+  with pytest.raises(IntegrityError):
+    Book.create(title='Dune', isbn='9782266320810', user=bob.id)
+
+
+def test_migrate_stops_at_target(database):
+  applied = migrate(database, target=2)
+  assert [m.version for m in applied] == [1, 2]
+  assert current_version(database) == 2
+
+
+def test_check_schema_version_rejects_outdated_or_newer_schema(database):
+  with pytest.raises(SchemaVersionError, match='version 0, expected'):
+    check_schema_version(database)
+
+  migrate(database)
+  database.execute_sql(
+    "INSERT INTO schema_version VALUES (?, 'from the future', '2030-01-01')",
+    (latest_version() + 1,),
+  )
+  with pytest.raises(SchemaVersionError, match='newer than this code'):
+    check_schema_version(database)
@@ -84,3 +84,29 @@ def test_book_delete(context):
   Book.delete_by_id(book_id)
   with pytest.raises(Book.DoesNotExist):  # a voir si on garde ce comportement d'erreur
     Book.get_by_id(book_id)
+
+
+def test_query_budget_flags_full_scans(seed_books, query_budget):
+  with pytest.raises(pytest.fail.Exception, match='Full scan of book'):
+    with query_budget(1):
+      list(Book.select().where(Book.title == 'Test Book 1'))
+
+  with query_budget(1):
+    list(Book.select().where(Book.user == seed_books[0].user_id, Book.isbn == '123'))
+
+
+def test_query_budget_flags_temp_sorts(seed_books, query_budget):
+  user_id = seed_books[0].user_id
+  with pytest.raises(pytest.fail.Exception, match='USE TEMP B-TREE FOR ORDER BY'):
+    with query_budget(1):
+      list(Book.select().where(Book.user == user_id).order_by(Book.pages))
+
+  with query_budget(1, allow_sorts=True):
+    list(Book.select().where(Book.user == user_id).order_by(Book.pages))
+
+
+def test_query_budget_flags_extra_queries(seed_books, query_budget):
+  with pytest.raises(pytest.fail.Exception, match='2 queries for a budget of 1'):
+    with query_budget(1):
+      for book in Book.select().where(Book.id == seed_books[0].id):
+        assert book.user.username == 'test'
@@ -1,12 +1,21 @@
+import pytest
+
+from src.auth.cache import user_cache
+from src.models import Book
+from src.services.import_service import import_service
+from src.services.metadata_cache import set_cached
+from src.services.pagination import encode_cursor
+
+
 def test_get_empty_books_list(auth_user):
   response = auth_user.get('/api/books/')
   assert response.status_code == 200
-  assert response.json() == []
+  assert response.json() == {'items': [], 'next_cursor': None}
 
 
 def test_get_user_books(auth_user, seed_books):
   response = auth_user.get('/api/books/')
-  books = response.json()
+  books = response.json()['items']
   assert response.status_code == 200
   assert len(books) == 3
   titles = [b['title'] for b in books]
@@ -18,10 +27,48 @@ def test_get_user_books(auth_user, seed_books):
 def test_get_all_books(auth_admin, seed_books):
   response = auth_admin.get('/api/books/admin/all')
   assert response.status_code == 200
-  books = response.json()
+  books = response.json()['items']
   assert len(books) == 5
 
 
+def test_paginate_user_books(auth_user, seed_books):
+  response = auth_user.get('/api/books/', params={'limit': 2})
+  assert response.status_code == 200
+  page = response.json()
+  assert [book['title'] for book in page['items']] == ['Test Book 1', 'Test Book 2']
+  assert page['next_cursor'] is not None
+
+  response = auth_user.get(
+    '/api/books/', params={'limit': 2, 'cursor': page['next_cursor']}
+  )
+  page = response.json()
+  assert [book['title'] for book in page['items']] == ['Test Book 3']
+  assert page['next_cursor'] is None
+
+
+def test_paginate_all_books(auth_admin, seed_books):
+  ids = []
+  cursor = None
+  while True:
+    params = {'limit': 2} if cursor is None else {'limit': 2, 'cursor': cursor}
+    page = auth_admin.get('/api/books/admin/all', params=params).json()
+    ids += [book['id'] for book in page['items']]
+    cursor = page['next_cursor']
+    if cursor is None:
+      break
+  assert ids == sorted(book.id for book in seed_books)
+
+
+def test_invalid_cursor(auth_user, seed_books):
+  response = auth_user.get('/api/books/', params={'cursor': 'not-a-cursor'})
+  assert response.status_code == 400
+  for values in ((1, 'Dune'), ('Dune', True), ('Dune', [1])):
+    response = auth_user.get('/api/books/', params={'cursor': encode_cursor(*values)})
+    assert response.status_code == 400
+  response = auth_user.get('/api/books/', params={'limit': 0})
+  assert response.status_code == 422
+
+
 def test_wrong_user_on_admin_endpoints(auth_user, seed_books):
   response = auth_user.get('/api/books/admin/all')
   assert response.status_code == 403
@@ -78,3 +125,144 @@ def test_admin_get_user_book(auth_admin, seed_books):
   assert book_response['title'] == book.title
   assert book_response['author'] == book.author
   assert book_response['pages'] == book.pages
+
+
+def test_list_books_runs_constant_queries(auth_user, seed_books, queries, context):
+  auth_user.get('/api/books/')
+  queries.clear()
+  auth_user.get('/api/books/')
+  baseline = len(queries)
+
+  for i in range(10):
+    Book.create(title=f'Extra Book {i}', pages=10, user=context['test_user'].id)
+  queries.clear()
+
+  response = auth_user.get('/api/books/')
+  assert len(response.json()['items']) == 13
+  assert len(queries) == baseline
+
+
+def test_get_book_does_not_load_user(auth_user, seed_books, queries):
+  response = auth_user.get(f'/api/books/{seed_books[0].id}')
+  assert response.status_code == 200
+  assert response.json()['user'] == str(seed_books[0].user_id)
+  # authentification + version pour l'ETag + lecture du livre
+  assert len(queries) == 3
+
+
+def test_bulk_books(auth_user, seed_books, queries):
+  Book.create(title='Taken', isbn='111', user=seed_books[0].user_id)
+  # l'unicite de l'ISBN est par utilisateur : le livre d'un autre ne bloque rien
+  Book.create(title='Elsewhere', isbn='333', user=seed_books[3].user_id)
+  queries.clear()
+  payload = {
+    'create': [
+      {'title': 'Bulk 1', 'isbn': '222'},
+      {'title': 'Bulk 2', 'isbn': '111'},
+      {'title': 'Bulk 3', 'isbn': '222'},
+      {'title': 'Bulk 4'},
+      {'title': 'Bulk 5', 'isbn': '333'},
+    ],
+    'update': [
+      {'id': seed_books[0].id, 'current_page': 12},
+      {'id': seed_books[3].id, 'current_page': 12},
+    ],
+    'delete': [seed_books[1].id, 999],
+  }
+
+  response = auth_user.post('/api/books/bulk', json=payload)
+
+  assert response.status_code == 200
+  result = response.json()
+  assert [r['status'] for r in result['create']] == [
+    'created',
+    'error',
+    'error',
+    'created',
+    'created',
+  ]
+  assert result['create'][1]['detail'] == 'Duplicate isbn'
+  assert Book.get_by_id(result['create'][3]['id']).title == 'Bulk 4'
+  assert [r['status'] for r in result['update']] == ['updated', 'error']
+  assert Book.get_by_id(seed_books[0].id).current_page == 12
+  assert Book.get_by_id(seed_books[3].id).current_page == 0
+  assert [r['status'] for r in result['delete']] == ['deleted', 'error']
+  assert Book.get_or_none(Book.id == seed_books[1].id) is None
+  inserts = [q for q in queries if q.startswith('INSERT INTO "book"')]
+  assert len(inserts) == 1
+
+
+def test_bulk_books_is_capped(auth_user):
+  payload = {'create': [{'title': f'Book {i}'} for i in range(501)]}
+  response = auth_user.post('/api/books/bulk', json=payload)
+  assert response.status_code == 422
+
+
+# fichier envoye en multipart plutot qu'en JSON
+IMPORT_FILE = {'file': ('library.csv', b'title,isbn\nImported,44\n', 'text/csv')}
+
+# (client, methode, chemin, corps, budget, tables dont le parcours complet est voulu)
+# les livres 1 a 3 appartiennent a test_user (tables recreees a chaque test)
+BOOK_ROUTES = [
+  ('user', 'GET', '/api/books/', None, 3, ()),
+  ('user', 'GET', '/api/books/?limit=1&cursor={cursor}', None, 3, ()),
+  ('user', 'GET', '/api/books/lookup?isbn=123', None, 2, ()),
+  ('user', 'GET', '/api/books/1', None, 3, ()),
+  # l'admin parcourt tous les livres par id : scan voulu, borne par la limite
+  ('admin', 'GET', '/api/books/admin/all', None, 2, ('book',)),
+  ('admin', 'GET', '/api/books/admin/1', None, 2, ()),
+  # creation : lecture puis creation de la fiche Work partagee
+  ('user', 'POST', '/api/books/', {'title': 'New', 'isbn': '42'}, 4, ()),
+  (
+    'user',
+    'POST',
+    '/api/books/bulk',
+    {
+      'create': [{'title': 'Bulk', 'isbn': '43'}],
+      'update': [{'id': 1, 'current_page': 3}],
+      'delete': [2],
+    },
+    9,
+    (),
+  ),
+  ('user', 'PATCH', '/api/books/1', {'current_page': 3}, 3, ()),
+  ('user', 'DELETE', '/api/books/1', None, 2, ()),
+  # export en flux par pages de l'index (user, title, id) : une page ici
+  ('user', 'GET', '/api/books/export', None, 2, ()),
+  ('admin', 'GET', '/api/books/admin/export', None, 2, ('book',)),
+  # import : le fichier part en job, seule l'insertion du job est faite ici
+  ('user', 'POST', '/api/books/import', IMPORT_FILE, 2, ()),
+]
+
+
+@pytest.mark.parametrize(
+  ('client', 'method', 'path', 'body', 'budget', 'scans'), BOOK_ROUTES
+)
+def test_books_routes_query_budget(
+  auth_user,
+  auth_admin,
+  seed_books,
+  query_budget,
+  tmp_path,
+  monkeypatch,
+  client,
+  method,
+  path,
+  body,
+  budget,
+  scans,
+):
+  set_cached('google_books', 'isbn:123', {'title': 'Cached'}, 60)
+  monkeypatch.setattr(import_service, 'directory', tmp_path)
+  cursor = auth_user.get('/api/books/', params={'limit': 1}).json()['next_cursor']
+  # cache d'authentification vide : chaque budget inclut la lecture de l'utilisateur
+  user_cache.clear()
+  http = auth_user if client == 'user' else auth_admin
+
+  content = {'files': body} if body is IMPORT_FILE else {'json': body}
+
+  with query_budget(budget, allow_scans=scans):
+    response = http.request(method, path.format(cursor=cursor), **content)
+
+  # import : 202, le fichier est traite par un job
+  assert response.status_code == (202 if body is IMPORT_FILE else 200)
@@ -1,12 +1,18 @@
+import pytest
+
+from src.auth.cache import user_cache
+from src.models import Game
+
+
 def test_get_empty_games_list(auth_user):
   response = auth_user.get('/api/games/')
   assert response.status_code == 200
-  assert response.json() == []
+  assert response.json() == {'items': [], 'next_cursor': None}
 
 
 def test_get_user_games(auth_user, seed_games):
   response = auth_user.get('/api/games/')
-  games = response.json()
+  games = response.json()['items']
   assert response.status_code == 200
   assert len(games) == 3
   titles = [g['title'] for g in games]
@@ -18,10 +24,45 @@ def test_get_user_games(auth_user, seed_games):
 def test_get_all_games(auth_admin, seed_games):
   response = auth_admin.get('/api/games/admin/all')
   assert response.status_code == 200
-  games = response.json()
+  games = response.json()['items']
   assert len(games) == 5
 
 
+def test_paginate_user_games(auth_user, seed_games):
+  response = auth_user.get('/api/games/', params={'limit': 2})
+  assert response.status_code == 200
+  page = response.json()
+  assert [game['title'] for game in page['items']] == ['Test Game 1', 'Test Game 2']
+  assert page['next_cursor'] is not None
+
+  response = auth_user.get(
+    '/api/games/', params={'limit': 2, 'cursor': page['next_cursor']}
+  )
+  page = response.json()
+  assert [game['title'] for game in page['items']] == ['Test Game 3']
+  assert page['next_cursor'] is None
+
+
+def test_paginate_all_games(auth_admin, seed_games):
+  ids = []
+  cursor = None
+  while True:
+    params = {'limit': 2} if cursor is None else {'limit': 2, 'cursor': cursor}
+    page = auth_admin.get('/api/games/admin/all', params=params).json()
+    ids += [game['id'] for game in page['items']]
+    cursor = page['next_cursor']
+    if cursor is None:
+      break
+  assert ids == sorted(game.id for game in seed_games)
+
+
+def test_invalid_cursor(auth_user, seed_games):
+  response = auth_user.get('/api/games/', params={'cursor': 'not-a-cursor'})
+  assert response.status_code == 400
+  response = auth_user.get('/api/games/', params={'limit': 0})
+  assert response.status_code == 422
+
+
 def test_wrong_user_on_admin_endpoints(auth_user, seed_games):
   response = auth_user.get('/api/games/admin/all')
   assert response.status_code == 403
@@ -81,3 +122,114 @@ def test_admin_get_user_game(auth_admin, seed_games):
   assert game_response['title'] == game.title
   assert game_response['platform'] == game.platform
   assert game_response['completion_time'] == game.completion_time
+
+
+def test_list_games_runs_constant_queries(auth_user, seed_games, queries, context):
+  auth_user.get('/api/games/')
+  queries.clear()
+  auth_user.get('/api/games/')
+  baseline = len(queries)
+
+  for i in range(10):
+    Game.create(title=f'Extra Game {i}', platform='PC', user=context['test_user'].id)
+  queries.clear()
+
+  response = auth_user.get('/api/games/')
+  assert len(response.json()['items']) == 13
+  assert len(queries) == baseline
+
+
+def test_get_game_does_not_load_user(auth_user, seed_games, queries):
+  response = auth_user.get(f'/api/games/{seed_games[0].id}')
+  assert response.status_code == 200
+  assert response.json()['user'] == str(seed_games[0].user_id)
+  # authentification + version pour l'ETag + lecture du jeu
+  assert len(queries) == 3
+
+
+def test_bulk_games(auth_user, seed_games, context):
+  user = str(context['test_user'].id)
+  payload = {
+    'create': [{'title': f'Bulk {i}', 'user': user} for i in range(3)],
+    'update': [{'id': seed_games[0].id, 'time_played': 8.0}],
+    'delete': [seed_games[4].id],
+  }
+
+  response = auth_user.post('/api/games/bulk', json=payload)
+
+  assert response.status_code == 200
+  result = response.json()
+  assert [r['status'] for r in result['create']] == ['created'] * 3
+  ids = [r['id'] for r in result['create']]
+  assert [Game.get_by_id(id).title for id in ids] == ['Bulk 0', 'Bulk 1', 'Bulk 2']
+  assert Game.get_by_id(seed_games[0].id).time_played == 8.0
+  assert result['delete'][0] == {
+    'index': 0,
+    'status': 'error',
+    'id': seed_games[4].id,
+    'detail': 'Game not found',
+  }
+
+
+# (client, methode, chemin, corps, budget, tables dont le parcours complet est voulu)
+# les jeux 1 a 3 appartiennent a test_user (tables recreees a chaque test)
+GAME_ROUTES = [
+  ('user', 'GET', '/api/games/', None, 3, ()),
+  ('user', 'GET', '/api/games/?limit=1&cursor={cursor}', None, 3, ()),
+  ('user', 'GET', '/api/games/1', None, 3, ()),
+  # l'admin parcourt tous les jeux par id : scan voulu, borne par la limite
+  ('admin', 'GET', '/api/games/admin/all', None, 2, ('game',)),
+  ('admin', 'GET', '/api/games/admin/1', None, 2, ()),
+  (
+    'user',
+    'POST',
+    '/api/games/',
+    {'title': 'New', 'user': '1', 'completion_time': 10},
+    # lecture puis creation de la fiche Work partagee
+    4,
+    (),
+  ),
+  (
+    'user',
+    'POST',
+    '/api/games/bulk',
+    {
+      'create': [{'title': 'Bulk', 'user': '1', 'completion_time': 10}],
+      'update': [{'id': 1, 'time_played': 3}],
+      'delete': [2],
+    },
+    9,
+    (),
+  ),
+  ('user', 'PATCH', '/api/games/1', {'time_played': 3}, 3, ()),
+  ('user', 'DELETE', '/api/games/1', None, 2, ()),
+  # export en flux par pages de l'index (user, title, id) : une page ici
+  ('user', 'GET', '/api/games/export', None, 2, ()),
+  ('admin', 'GET', '/api/games/admin/export', None, 2, ('game',)),
+]
+
+
+@pytest.mark.parametrize(
+  ('client', 'method', 'path', 'body', 'budget', 'scans'), GAME_ROUTES
+)
+def test_games_routes_query_budget(
+  auth_user,
+  auth_admin,
+  seed_games,
+  query_budget,
+  client,
+  method,
+  path,
+  body,
+  budget,
+  scans,
+):
+  cursor = auth_user.get('/api/games/', params={'limit': 1}).json()['next_cursor']
+  # cache d'authentification vide : chaque budget inclut la lecture de l'utilisateur
+  user_cache.clear()
+  http = auth_user if client == 'user' else auth_admin
+
+  with query_budget(budget, allow_scans=scans):
+    response = http.request(method, path.format(cursor=cursor), json=body)
+
+  assert response.status_code == 200
@@ -0,0 +1,176 @@
+import json
+
+import pytest
+
+from src.jobs import job_queue
+from src.models import Book, Job, Work
+from src.services.import_service import import_service, parse_books
+
+GOODREADS_HEADER = (
+  'Book Id,Title,Author,Author l-f,Additional Authors,ISBN,ISBN13,My Rating,'
+  'Average Rating,Publisher,Binding,Number of Pages,Year Published,'
+  'Original Publication Year,Date Read,Date Added,Bookshelves,'
+  'Bookshelves with positions,Exclusive Shelf\n'
+)
+
+
+def goodreads_row(title, isbn13='', pages=''):
+  return (
+    f'1,{title},Frank Herbert,"Herbert, Frank",,="",="{isbn13}",0,4.2,Ace,'
+    f'Paperback,{pages},1990,1965,,2024/01/01,,,to-read\n'
+  )
+
+
+@pytest.fixture(autouse=True)
+def import_dir(tmp_path, monkeypatch):
+  monkeypatch.setattr(import_service, 'directory', tmp_path)
+  return tmp_path
+
+
+def upload(client, content: str):
+  return client.post(
+    '/api/books/import', files={'file': ('library.csv', content.encode(), 'text/csv')}
+  )
+
+
+def test_import_goodreads_export(auth_user, context, import_dir):
+  content = (
+    # BOM ajoute par Excel
+    '\ufeff'
+    + GOODREADS_HEADER
+    + goodreads_row('Dune', '9780441172719', '412')
+    + goodreads_row('Dune Messiah', '9780593098233')
+    + goodreads_row('Notebook')
+  )
+
+  response = upload(auth_user, content)
+
+  assert response.status_code == 202
+  job_id = response.json()['id']
+  assert response.headers['Location'] == f'/api/jobs/{job_id}'
+  assert response.json()['status'] == 'queued'
+  assert job_queue.run_pending() == 1
+
+  job = auth_user.get(f'/api/jobs/{job_id}').json()
+  assert job['status'] == 'done'
+  assert job['result'] == {
+    'rows': 3,
+    'created': 3,
+    'duplicates': 0,
+    'errors': 0,
+    'error_samples': [],
+  }
+  dune = Book.get(Book.title == 'Dune')
+  assert (dune.author, dune.pages, dune.isbn) == ('Frank Herbert', 412, '9780441172719')
+  assert Work.get_by_id(dune.work_id).isbn == '9780441172719'
+  notebook = Book.get(Book.title == 'Notebook')
+  assert (notebook.isbn, notebook.work_id) == (None, None)
+  # fichier supprime une fois l'import termine
+  assert list(import_dir.iterdir()) == []
+
+
+def test_import_dedupes_on_isbn(auth_user, context):
+  user = context['test_user'].id
+  auth_user.post('/api/books/', json={'title': 'Owned', 'isbn': '978-0-441-17271-9'})
+  auth_user.post('/api/books/', json={'title': 'Owned too', 'isbn': '978-0593098233'})
+  content = (
+    'title,isbn,pages\n'
+    'Dune,9780441172719,412\n'
+    'Dune Messiah,9780593098233,\n'
+    'Children of Dune,9780593098240,\n'
+    'Children of Dune (again),978-0-593-09824-0,\n'
+  )
+
+  upload(auth_user, content)
+  job_queue.run_pending()
+
+  result = json.loads(Job.get(Job.kind == 'books.import').result)
+  assert (result['created'], result['duplicates']) == (1, 3)
+  titles = [b.title for b in Book.select().where(Book.user == user).order_by(Book.id)]
+  assert titles == ['Owned', 'Owned too', 'Children of Dune']
+
+
+def test_import_reports_invalid_rows(auth_user):
+  content = 'title,pages\nDune,412\n,12\nDune Messiah,many\n\nChildren of Dune,\n'
+
+  upload(auth_user, content)
+  job_queue.run_pending()
+
+  result = json.loads(Job.get(Job.kind == 'books.import').result)
+  assert (result['rows'], result['created'], result['errors']) == (4, 2, 2)
+  assert [e['line'] for e in result['error_samples']] == [3, 4]
+  assert result['error_samples'][1]['detail'].startswith('pages:')
+
+
+def test_import_rejects_file_without_title_column(auth_user, import_dir):
+  response = upload(auth_user, 'name,isbn\nDune,1\n')
+
+  assert response.status_code == 400
+  assert Job.select().count() == 0
+  assert list(import_dir.iterdir()) == []
+
+
+def test_import_of_undecodable_file_fails_without_retry(auth_user, import_dir):
+  # debut lisible, fin en latin-1 : l'erreur n'apparait qu'en cours de job
+  content = b'title\n' + b'Dune\n' * 5000 + 'Misérables\n'.encode('latin-1')
+  auth_user.post(
+    '/api/books/import', files={'file': ('library.csv', content, 'text/csv')}
+  )
+
+  job_queue.run_pending()
+
+  job = Job.get(Job.kind == 'books.import')
+  assert (job.status, job.attempts) == ('failed', 1)
+  assert job.last_error.startswith('UnicodeDecodeError')
+  assert list(import_dir.iterdir()) == []
+
+
+def test_import_commits_progress_per_chunk_and_resumes(auth_user, context, monkeypatch):
+  monkeypatch.setattr(import_service, 'chunk_size', 2)
+  content = 'title\n' + ''.join(f'Book {i}\n' for i in range(5))
+  upload(auth_user, content)
+
+  # echec apres le deuxieme paquet : les deux premiers restent commites
+  write_chunk = import_service._write_chunk
+  calls = []
+
+  def failing_write_chunk(*args):
+    calls.append(1)
+    if len(calls) == 3:
+      raise RuntimeError('disk full')
+    return write_chunk(*args)
+
+  monkeypatch.setattr(import_service, '_write_chunk', failing_write_chunk)
+  job_queue.run_pending()
+
+  job = Job.get(Job.kind == 'books.import')
+  assert job.status == 'queued'
+  assert json.loads(job.result)['rows'] == 4
+  assert Book.select().count() == 4
+
+  Job.update(run_at=job.created_at).execute()
+  job_queue.run_pending()
+
+  job = Job.get_by_id(job.id)
+  assert job.status == 'done'
+  assert json.loads(job.result)['created'] == 5
+  assert sorted(b.title for b in Book.select()) == [f'Book {i}' for i in range(5)]
+
+
+def test_parse_books_is_lazy():
+  def lines():
+    yield 'title\n'
+    yield 'Dune\n'
+    raise AssertionError('read past the first book')
+
+  assert next(parse_books(lines())) == (
+    2,
+    {
+      'title': 'Dune',
+      'author': None,
+      'pages': None,
+      'isbn': None,
+      'google_books_id': None,
+      'cover_url': None,
+    },
+  )
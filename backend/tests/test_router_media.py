@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.auth.cache import user_cache
+from src.models import Book, Game
+from src.services.pagination import encode_cursor
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def timeline(context):
+  # activite croissante : book 1, game 1, book 2 (modifie), game 2 (termine)
+  user = context['test_user'].id
+  at = [START + timedelta(hours=i) for i in range(4)]
+  book_1 = Book.create(title='Dune', user=user, created_at=at[0])
+  game_1 = Game.create(title='Celeste', user=user, created_at=at[1], time_played=3)
+  book_2 = Book.create(
+    title='Hyperion', user=user, created_at=at[0], updated_at=at[2], current_page=40
+  )
+  game_2 = Game.create(
+    title='Hades', user=user, created_at=at[0], updated_at=at[3], ended_at=at[3]
+  )
+  # medias d'un autre utilisateur, absents du fil
+  Book.create(title='Autre', user=context['test_admin'].id, created_at=at[3])
+  return [
+    ('game', game_2.id),
+    ('book', book_2.id),
+    ('game', game_1.id),
+    ('book', book_1.id),
+  ]
+
+
+def entries(page):
+  return [(item['type'], item['id']) for item in page['items']]
+
+
+def test_media_timeline(auth_user, timeline):
+  response = auth_user.get('/api/media/')
+  assert response.status_code == 200
+  page = response.json()
+  assert entries(page) == timeline
+  assert page['next_cursor'] is None
+  first = page['items'][0]
+  assert first['title'] == 'Hades'
+  assert first['activity_at'] == first['updated_at']
+  assert page['items'][-1]['activity_at'] == page['items'][-1]['created_at']
+
+
+def test_media_timeline_pages(auth_user, timeline):
+  seen, cursor = [], None
+  while True:
+    params = {'limit': 1} if cursor is None else {'limit': 1, 'cursor': cursor}
+    page = auth_user.get('/api/media/', params=params).json()
+    seen += entries(page)
+    cursor = page['next_cursor']
+    if cursor is None:
+      break
+  assert seen == timeline
+
+
+def test_media_timeline_ties(auth_user, context):
+  # meme activite et meme id : le jeu passe avant le livre, sans doublon ni trou
+  user = context['test_user'].id
+  for _ in range(2):
+    Book.create(title='Dune', user=user, created_at=START)
+    Game.create(title='Celeste', user=user, created_at=START)
+
+  seen, cursor = [], None
+  while True:
+    params = {'limit': 1} if cursor is None else {'limit': 1, 'cursor': cursor}
+    page = auth_user.get('/api/media/', params=params).json()
+    seen += entries(page)
+    cursor = page['next_cursor']
+    if cursor is None:
+      break
+  assert seen == [('game', 2), ('book', 2), ('game', 1), ('book', 1)]
+
+
+@pytest.mark.parametrize(
+  'params, expected',
+  [
+    ({'type': 'book'}, [1, 3]),
+    ({'type': 'game'}, [0, 2]),
+    ({'status': 'finished'}, [0]),
+    ({'status': 'in_progress'}, [1, 2]),
+    ({'type': 'game', 'status': 'in_progress'}, [2]),
+  ],
+)
+def test_media_timeline_filters(auth_user, timeline, params, expected):
+  response = auth_user.get('/api/media/', params=params)
+  assert response.status_code == 200
+  assert entries(response.json()) == [timeline[i] for i in expected]
+
+
+def test_media_timeline_invalid_params(auth_user, timeline):
+  assert auth_user.get('/api/media/', params={'type': 'film'}).status_code == 422
+  assert auth_user.get('/api/media/', params={'cursor': 'abc'}).status_code == 400
+  # bonne longueur, mauvais types : 400 plutot qu'une erreur a la comparaison
+  for values in (('x', 1, 5), ('x', '1', 'book'), (None, 1, 'book')):
+    response = auth_user.get('/api/media/', params={'cursor': encode_cursor(*values)})
+    assert response.status_code == 400
+
+
+def test_media_timeline_etag(auth_user, timeline):
+  response = auth_user.get('/api/media/')
+  etag = response.headers['ETag']
+  assert (
+    auth_user.get('/api/media/', headers={'If-None-Match': etag}).status_code == 304
+  )
+
+  auth_user.patch(f'/api/games/{timeline[0][1]}', json={'time_played': 12})
+  response = auth_user.get('/api/media/', headers={'If-None-Match': etag})
+  assert response.status_code == 200
+
+
+def test_media_timeline_query_budget(auth_user, timeline, query_budget):
+  user_cache.clear()
+  # utilisateur, versions pour l'ETag, puis une seule requete UNION ALL
+  with query_budget(3) as captured:
+    response = auth_user.get('/api/media/', params={'limit': 2})
+  assert response.status_code == 200
+  assert sum('UNION ALL' in sql for sql in captured) == 1
+
+  user_cache.clear()
+  with query_budget(3):
+    auth_user.get('/api/media/', params={'cursor': response.json()['next_cursor']})
@@ -0,0 +1,81 @@
+from src.models import Book, Game, ProgressEvent
+
+
+def test_ingest_progress_batch(auth_user, seed_books, seed_games, queries):
+  book, game = seed_books[0], seed_games[0]
+  events = [
+    {
+      'media_type': 'book',
+      'media_id': book.id,
+      'value': page,
+      'recorded_at': f'2026-01-01T10:00:{page:02d}',
+    }
+    for page in (10, 30, 20)
+  ]
+  events.append({'media_type': 'game', 'media_id': game.id, 'value': 7.5})
+
+  response = auth_user.post('/api/progress/', json={'events': events})
+
+  assert response.status_code == 200
+  assert response.json() == {'inserted': 4}
+  assert ProgressEvent.select().count() == 4
+  # la valeur la plus recente gagne, pas la derniere recue
+  assert Book.get_by_id(book.id).current_page == 30
+  assert Book.get_by_id(book.id).updated_at is not None
+  assert Game.get_by_id(game.id).time_played == 7.5
+  inserts = [q for q in queries if q.startswith('INSERT INTO "progress_events"')]
+  assert len(inserts) == 1
+
+
+def test_ingest_progress_ignores_late_batch(auth_user, seed_books):
+  book = seed_books[0]
+  recent = {'media_type': 'book', 'media_id': book.id, 'value': 30}
+  auth_user.post(
+    '/api/progress/',
+    json={'events': [{**recent, 'recorded_at': '2026-01-01T10:30:00'}]},
+  )
+
+  # lot hors ligne envoye apres coup, avec des evenements plus anciens
+  stale = {**recent, 'value': 5, 'recorded_at': '2026-01-01T10:05:00'}
+  response = auth_user.post('/api/progress/', json={'events': [stale]})
+
+  assert response.json() == {'inserted': 1}
+  assert ProgressEvent.select().count() == 2
+  assert Book.get_by_id(book.id).current_page == 30
+
+
+def test_ingest_progress_rejects_foreign_media(auth_user, seed_books):
+  admin_book = seed_books[3]
+  events = [
+    {'media_type': 'book', 'media_id': seed_books[0].id, 'value': 5},
+    {'media_type': 'book', 'media_id': admin_book.id, 'value': 5},
+  ]
+
+  response = auth_user.post('/api/progress/', json={'events': events})
+
+  assert response.status_code == 404
+  assert ProgressEvent.select().count() == 0
+  assert Book.get_by_id(seed_books[0].id).current_page == 0
+
+
+def test_ingest_progress_validates_batch(auth_user):
+  response = auth_user.post('/api/progress/', json={'events': []})
+  assert response.status_code == 422
+  response = auth_user.post(
+    '/api/progress/',
+    json={'events': [{'media_type': 'movie', 'media_id': 1, 'value': 1}]},
+  )
+  assert response.status_code == 422
+
+
+def test_list_progress_history(auth_user, seed_books):
+  book = seed_books[0]
+  events = [
+    {'media_type': 'book', 'media_id': book.id, 'value': page} for page in (5, 15)
+  ]
+  auth_user.post('/api/progress/', json={'events': events})
+
+  response = auth_user.get(f'/api/progress/book/{book.id}')
+
+  assert response.status_code == 200
+  assert sorted(e['value'] for e in response.json()) == [5, 15]
@@ -0,0 +1,54 @@
+from src.models import Book, Game
+from src.models.search import rebuild_search_index
+
+
+def search(client, q):
+  response = client.get('/api/search/', params={'q': q})
+  assert response.status_code == 200
+  return [(r['type'], r['title']) for r in response.json()]
+
+
+def test_search_by_prefix(auth_user, seed_books, seed_games):
+  assert search(auth_user, 'test boo') == [
+    ('book', 'Test Book 1'),
+    ('book', 'Test Book 2'),
+    ('book', 'Test Book 3'),
+  ]
+  assert search(auth_user, 'ps') == [('game', 'Test Game 2')]
+  assert search(auth_user, 'author 2') == [('book', 'Test Book 2')]
+
+
+def test_search_is_scoped_to_current_user(auth_user, seed_books):
+  assert search(auth_user, 'Test Book 4') == []
+
+
+def test_search_ranks_and_ignores_accents(auth_user, context):
+  user = context['test_user'].id
+  Book.create(title='Éloge de la lenteur', author='Carl Honoré', user=user)
+  Book.create(title='La lenteur', author='Milan Kundera', user=user)
+
+  results = search(auth_user, 'lenteur')
+  assert results[0] == ('book', 'La lenteur')
+  assert search(auth_user, 'eloge') == [('book', 'Éloge de la lenteur')]
+
+
+def test_search_index_follows_writes(auth_user, seed_books, seed_games):
+  book = seed_books[0]
+  Book.update(title='Dune').where(Book.id == book.id).execute()
+  Game.delete().where(Game.id == seed_games[0].id).execute()
+
+  assert search(auth_user, 'dune') == [('book', 'Dune')]
+  assert search(auth_user, 'Test Book 1') == []
+  assert ('game', 'Test Game 1') not in search(auth_user, 'test game')
+
+
+def test_search_syntax_is_escaped(auth_user, seed_books):
+  assert search(auth_user, 'owner:"u" OR *') == []
+  assert search(auth_user, '"') == []
+  response = auth_user.get('/api/search/', params={'q': ''})
+  assert response.status_code == 422
+
+
+def test_rebuild_search_index(auth_user, seed_books):
+  rebuild_search_index()
+  assert len(search(auth_user, 'test')) == 3
@@ -0,0 +1,119 @@
+from src.auth.cache import user_cache
+from src.models import Book, Game, MediaChange, Tombstone
+
+
+def sync(client, since=0, **params):
+  response = client.get('/api/sync/', params={'since': since, **params})
+  assert response.status_code == 200
+  return response.json()
+
+
+def test_sync_from_scratch(auth_user, seed_books, seed_games):
+  changes = sync(auth_user)
+  assert [b['title'] for b in changes['books']] == [
+    'Test Book 1',
+    'Test Book 2',
+    'Test Book 3',
+  ]
+  assert [g['title'] for g in changes['games']] == [
+    'Test Game 1',
+    'Test Game 2',
+    'Test Game 3',
+  ]
+  assert changes['deleted'] == []
+  assert changes['has_more'] is False
+  assert sync(auth_user, changes['token']) == {
+    'token': changes['token'],
+    'has_more': False,
+    'books': [],
+    'games': [],
+    'deleted': [],
+  }
+
+
+def test_sync_returns_only_changes_since_token(auth_user, seed_books, seed_games):
+  token = sync(auth_user)['token']
+  auth_user.patch(f'/api/books/{seed_books[0].id}', json={'current_page': 42})
+  auth_user.patch(f'/api/games/{seed_games[1].id}', json={'time_played': 16.5})
+
+  changes = sync(auth_user, token)
+  assert [(b['id'], b['current_page']) for b in changes['books']] == [
+    (seed_books[0].id, 42)
+  ]
+  assert [(g['id'], g['time_played']) for g in changes['games']] == [
+    (seed_games[1].id, 16.5)
+  ]
+  assert changes['token'] > token
+  # updated_at suit aussi les modifications par requete UPDATE, livres et jeux
+  assert changes['books'][0]['updated_at'] is not None
+  assert changes['games'][0]['updated_at'] is not None
+
+
+def test_sync_reports_deletions(auth_user, seed_books, seed_games):
+  token = sync(auth_user)['token']
+  auth_user.delete(f'/api/books/{seed_books[0].id}')
+  auth_user.request(
+    'POST', '/api/games/bulk', json={'delete': [seed_games[0].id, seed_games[1].id]}
+  )
+
+  changes = sync(auth_user, token)
+  assert changes['books'] == []
+  assert changes['games'] == []
+  assert changes['deleted'] == [
+    {'type': 'book', 'id': seed_books[0].id},
+    {'type': 'game', 'id': seed_games[0].id},
+    {'type': 'game', 'id': seed_games[1].id},
+  ]
+  # un client neuf ne recoit pas les medias supprimes comme vivants
+  fresh = sync(auth_user)
+  assert len(fresh['books']) == 2
+  assert len(fresh['games']) == 1
+
+
+def test_sync_pages(auth_user, seed_books, seed_games):
+  seen, token = [], 0
+  while True:
+    changes = sync(auth_user, token, limit=2)
+    seen += [('book', b['id']) for b in changes['books']]
+    seen += [('game', g['id']) for g in changes['games']]
+    token = changes['token']
+    if not changes['has_more']:
+      break
+  assert len(seen) == len(set(seen)) == 6
+
+
+def test_sync_is_scoped_to_the_user(auth_admin, seed_books, seed_games):
+  changes = sync(auth_admin)
+  assert {b['title'] for b in changes['books']} == {'Test Book 4', 'Test Book 5'}
+  assert {g['title'] for g in changes['games']} == {'Test Game 4', 'Test Game 5'}
+
+
+def test_reused_id_clears_tombstone(context, seed_books):
+  book = seed_books[0]
+  Book.delete_by_id(book.id)
+  assert Tombstone.select().count() == 1
+
+  Book.create(id=book.id, title='Again', user=context['test_user'].id)
+  assert Tombstone.select().count() == 0
+  assert MediaChange.get(media_type='book', media_id=book.id).seq > 0
+
+
+def test_game_save_sets_updated_at(seed_games):
+  game = Game.get_by_id(seed_games[0].id)
+  assert game.updated_at is None
+  game.time_played = 7
+  game.save()
+  assert Game.get_by_id(game.id).updated_at is not None
+
+
+def test_sync_query_budget(auth_user, seed_books, seed_games, query_budget):
+  token = sync(auth_user)['token']
+  auth_user.patch(f'/api/books/{seed_books[0].id}', json={'current_page': 42})
+  auth_user.delete(f'/api/games/{seed_games[0].id}')
+
+  user_cache.clear()
+  # utilisateur, journal et tombstones fusionnes, livres modifies ; pas de jeu vivant
+  with query_budget(3):
+    changes = sync(auth_user, token)
+  assert len(changes['books']) == 1
+  assert len(changes['deleted']) == 1
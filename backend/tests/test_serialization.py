@@ -0,0 +1,38 @@
+import json
+
+from pydantic import TypeAdapter
+
+from src.schemas import BookResponse, GameResponse
+from src.services.books_service import books_service
+from src.services.games_service import games_service
+from src.services.serialization import FastJSONResponse
+
+
+def schema_path(schema, rows):
+  adapter = TypeAdapter(list[schema])
+  return json.loads(adapter.dump_json(adapter.validate_python(list(rows))))
+
+
+def fast_path(rows):
+  return json.loads(FastJSONResponse(list(rows)).body)
+
+
+def test_fast_path_matches_book_response(context, seed_books):
+  user = str(context['test_user'].id)
+  seed_books[0].current_page = 3
+  seed_books[0].save()
+
+  assert fast_path(books_service.list_rows(user)) == schema_path(
+    BookResponse, books_service.list(user)
+  )
+  assert fast_path(books_service.list_all_rows()) == schema_path(
+    BookResponse, books_service.list_all()
+  )
+
+
+def test_fast_path_matches_game_response(context, seed_games):
+  user = str(context['test_user'].id)
+
+  assert fast_path(games_service.list_rows(user)) == schema_path(
+    GameResponse, games_service.list(user)
+  )
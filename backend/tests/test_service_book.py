@@ -1,8 +1,11 @@
+import pytest
 from fastapi import HTTPException
+from peewee import IntegrityError
 
 from src.models import Book
-from src.schemas import BookCreate, BookUpdate
+from src.schemas import BookBulkRequest, BookCreate, BookUpdate
 from src.services.books_service import books_service
+from src.services.pagination import encode_cursor
 
 
 def test_book_creation(context):
@@ -35,6 +38,25 @@ def test_book_update(context):
   assert updated_book.user.id == context['test_user'].id
 
 
+def test_isbn_is_stored_normalized(context):
+  user = context['test_user']
+  dune = BookCreate(title='Dune', isbn='978-2-266-32081-0', user=str(user.id))
+  book = books_service.create(dune, user.id)
+  assert Book.get_by_id(book.id).isbn == '9782266320810'
+
+  # meme ISBN ecrit autrement : doublon pour l'utilisateur
+  with pytest.raises(IntegrityError):
+    books_service.create(dune.model_copy(update={'isbn': '9782266320810'}), user.id)
+  result = books_service.bulk(
+    BookBulkRequest(create=[{'title': 'Dune', 'isbn': '978 2266 320810'}]), user.id
+  )
+  assert result['create'][0]['detail'] == 'Duplicate isbn'
+
+  other = books_service.create(BookCreate(title='Carnet', user=str(user.id)), user.id)
+  books_service.update(other.id, user, BookUpdate(isbn='978-0-00-000000-2'))
+  assert Book.get_by_id(other.id).isbn == '9780000000002'
+
+
 def test_book_delete(context):
   book_data = BookCreate(
     title='1984', author='George Orwell', pages=328, user=str(context['test_user'].id)
@@ -89,3 +111,54 @@ def test_fail_delete(context):
   except HTTPException as e:
     assert e.status_code == 404
     assert e.detail == 'Book not found'
+
+
+def test_user_book_list_cursor_on_same_title(context):
+  user_id = str(context['test_user'].id)
+  books = [
+    books_service.create(BookCreate(title='Dune', user=user_id), user_id)
+    for _ in range(3)
+  ]
+
+  first = books_service.list(user_id, limit=2)
+  assert [b.id for b in first] == [books[0].id, books[1].id]
+
+  cursor = encode_cursor(first[1].title, first[1].id)
+  rest = books_service.list(user_id, limit=2, cursor=cursor)
+  assert [b.id for b in rest] == [books[2].id]
+
+
+def test_book_list_query_plans(context, seed_books, query_budget):
+  user_id = str(context['test_user'].id)
+  cursor = encode_cursor('Test Book 1', seed_books[0].id)
+
+  first = query_budget.plan(*books_service.list_rows(user_id, 21).sql())
+  assert first == ['SEARCH t1 USING INDEX book_user_id_title_id (user_id=?)']
+  # reprise au curseur dans l'index, sans relire les pages precedentes
+  deep = query_budget.plan(*books_service.list_rows(user_id, 21, cursor).sql())
+  assert deep == ['SEARCH t1 USING INDEX book_user_id_title_id (user_id=? AND title>?)']
+
+  recent = Book.select().where(Book.user == user_id).order_by(Book.updated_at.desc())
+  assert query_budget.plan(*recent.sql()) == [
+    'SEARCH t1 USING INDEX book_user_id_updated_at (user_id=?)'
+  ]
+
+
+def test_book_lookup_query_plans(context, seed_books, query_budget):
+  user = context['test_user']
+  with query_budget(4):
+    books_service.get(seed_books[0].id, user)
+    books_service.update(seed_books[0].id, user, BookUpdate(pages=330))
+    books_service.delete(seed_books[1].id, user)
+
+  # (id, user) : la cle primaire suffit, le filtre sur user_id est residuel
+  lookups = [
+    (sql, params)
+    for sql, params in query_budget.statements
+    if '"id" = ?' in sql and '"user_id" = ?' in sql
+  ]
+  assert len(lookups) == 3
+  for sql, params in lookups:
+    assert query_budget.plan(sql, params)[0].endswith(
+      'USING INTEGER PRIMARY KEY (rowid=?)'
+    )
@@ -1,8 +1,10 @@
+import pytest
 from fastapi import HTTPException
 
 from src.models import Game
 from src.schemas import GameCreate, GameUpdate
 from src.services.games_service import games_service
+from src.services.pagination import encode_cursor
 
 
 def test_game_creation(context):
@@ -22,6 +24,19 @@ def test_game_creation(context):
   assert game.user.id == context['test_user'].id
 
 
+def test_game_creation_rolls_back_with_after_create(context):
+  game_data = GameCreate(title='Hades', user=str(context['test_user'].id))
+
+  def enqueue(game):
+    # job refuse : le jeu n'est pas garde seul
+    raise LookupError('no handler')
+
+  with pytest.raises(LookupError):
+    games_service.create(game_data, context['test_user'].id, after_create=enqueue)
+
+  assert Game.select().count() == 0
+
+
 def test_game_update(context):
   game_data = GameCreate(
     title='The Legend of Zelda',
@@ -105,3 +120,37 @@ def test_fail_delete(context):
   except HTTPException as e:
     assert e.status_code == 404
     assert e.detail == 'Game not found'
+
+
+def test_game_list_query_plans(context, seed_games, query_budget):
+  user_id = str(context['test_user'].id)
+  cursor = encode_cursor('Test Game 1', seed_games[0].id)
+
+  first = query_budget.plan(*games_service.list_rows(user_id, 21).sql())
+  assert first == ['SEARCH t1 USING INDEX game_user_id_title_id (user_id=?)']
+  deep = query_budget.plan(*games_service.list_rows(user_id, 21, cursor).sql())
+  assert deep == ['SEARCH t1 USING INDEX game_user_id_title_id (user_id=? AND title>?)']
+
+  recent = Game.select().where(Game.user == user_id).order_by(Game.updated_at.desc())
+  assert query_budget.plan(*recent.sql()) == [
+    'SEARCH t1 USING INDEX game_user_id_updated_at (user_id=?)'
+  ]
+
+
+def test_game_lookup_query_plans(context, seed_games, query_budget):
+  user = context['test_user']
+  with query_budget(4):
+    games_service.get(seed_games[0].id, user)
+    games_service.update(seed_games[0].id, user, GameUpdate(time_played=12.5))
+    games_service.delete(seed_games[1].id, user)
+
+  lookups = [
+    (sql, params)
+    for sql, params in query_budget.statements
+    if '"id" = ?' in sql and '"user_id" = ?' in sql
+  ]
+  assert len(lookups) == 3
+  for sql, params in lookups:
+    assert query_budget.plan(sql, params)[0].endswith(
+      'USING INTEGER PRIMARY KEY (rowid=?)'
+    )
@@ -0,0 +1,83 @@
+from src.models import Book, Game, Work
+from src.schemas import BookCreate, BookUpdate, GameCreate, GameUpdate
+from src.services.books_service import books_service
+from src.services.games_service import games_service
+from src.services.works_service import works_service
+
+
+def create_book(user, **fields):
+  return books_service.create(BookCreate(user=str(user.id), **fields), user.id)
+
+
+def test_users_share_a_work_for_the_same_isbn(context):
+  user, admin = context['test_user'], context['test_admin']
+  mine = create_book(
+    user, title='Dune', isbn='978-2-266-32081-0', author='Frank Herbert', pages=832
+  )
+  theirs = create_book(admin, title='Dune (poche)', isbn='9782266320810')
+
+  assert Work.select().count() == 1
+  assert mine.work_id == theirs.work_id
+  work = Work.get_by_id(mine.work_id)
+  assert (work.isbn, work.title) == ('9782266320810', 'Dune')
+  # la fiche complete les champs laisses vides, le titre saisi reste celui de l'utilisateur
+  shared = Book.get_by_id(theirs.id)
+  assert (shared.title, shared.author, shared.pages) == (
+    'Dune (poche)',
+    'Frank Herbert',
+    832,
+  )
+
+
+def test_later_copy_fills_the_work(context):
+  user, admin = context['test_user'], context['test_admin']
+  create_book(user, title='Dune', google_books_id='gb1')
+  create_book(admin, title='Dune', google_books_id='gb1', author='Frank Herbert')
+
+  assert Work.get(Work.google_books_id == 'gb1').author == 'Frank Herbert'
+
+
+def test_book_without_identifier_has_no_work(context):
+  book = create_book(context['test_user'], title='Carnet')
+
+  assert book.work_id is None
+  assert Work.select().count() == 0
+
+
+def test_isbn_change_relinks_the_book(context):
+  user = context['test_user']
+  book = create_book(user, title='Dune', isbn='111')
+  previous = book.work_id
+
+  books_service.update(book.id, user, BookUpdate(isbn='222'))
+  books_service.update(book.id, user, BookUpdate(current_page=5))
+
+  book = Book.get_by_id(book.id)
+  assert book.work_id != previous
+  assert Work.get_by_id(book.work_id).isbn == '222'
+
+
+def test_known_game_reuses_completion_time(auth_user, context, hltb_scraper):
+  work = works_service.attach_game({'title': 'Hades', 'platform': 'PC'})['work']
+  Work.update(completion_time=22.5).where(Work.id == work).execute()
+
+  response = auth_user.post(
+    '/api/games/', json={'title': ' hades ', 'platform': 'pc', 'user': 'ignored'}
+  )
+
+  assert response.status_code == 200
+  assert response.json()['completion_time'] == 22.5
+  assert Game.get_by_id(response.json()['id']).work_id == work
+  # duree deja connue pour l'oeuvre : pas de scraping
+  assert hltb_scraper.calls == []
+
+
+def test_game_rename_relinks_the_game(context):
+  user = context['test_user']
+  game = games_service.create(
+    GameCreate(title='Celeste', platform='PC', user=str(user.id)), user.id
+  )
+  games_service.update(game.id, user, GameUpdate(platform='Switch'))
+
+  work = Work.get_by_id(Game.get_by_id(game.id).work_id)
+  assert work.hltb_key == 'celeste|switch'
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from src.models import Book, Game, UserStats
+from src.models.stats import rebuild_user_stats
+
+
+def stats_of(user):
+  return UserStats.get_by_id(user.id)
+
+
+def test_stats_follow_book_writes(context, seed_books):
+  user = context['test_user']
+  assert stats_of(user).books_total == 3
+  assert stats_of(user).books_in_progress == 0
+
+  book = seed_books[0]
+  book.current_page = 40
+  book.save()
+  assert stats_of(user).pages_read == 40
+  assert stats_of(user).books_in_progress == 1
+
+  Book.update(ended_at=datetime.now(), current_page=100).where(
+    Book.id == book.id
+  ).execute()
+  assert stats_of(user).pages_read == 100
+  assert stats_of(user).books_in_progress == 0
+  assert stats_of(user).books_finished == 1
+
+  Book.delete().where(Book.id == book.id).execute()
+  assert stats_of(user).books_total == 2
+  assert stats_of(user).books_finished == 0
+  assert stats_of(user).pages_read == 0
+
+
+def test_stats_follow_game_writes(context, seed_games):
+  user = context['test_user']
+  assert stats_of(user).games_total == 3
+  assert stats_of(user).games_in_progress == 3
+  assert stats_of(user).hours_played == 45.0
+
+  Game.update(ended_at=datetime.now()).where(Game.id == seed_games[0].id).execute()
+  assert stats_of(user).games_finished == 1
+  assert stats_of(user).games_in_progress == 2
+  assert stats_of(context['test_admin']).games_total == 2
+
+
+def test_rebuild_matches_triggers(context, seed_books, seed_games):
+  Book.update(current_page=12).where(Book.id == seed_books[1].id).execute()
+  before = list(UserStats.select().order_by(UserStats.user).dicts())
+
+  rebuild_user_stats()
+
+  after = list(UserStats.select().order_by(UserStats.user).dicts())
+  versions = ('books_version', 'games_version')
+  for old, new in zip(before, after, strict=True):
+    assert {k: v for k, v in new.items() if k not in versions} == {
+      k: v for k, v in old.items() if k not in versions
+    }
+    assert all(new[version] > old[version] for version in versions)
+
+
+def test_dashboard(auth_user, seed_books, seed_games, queries):
+  response = auth_user.get('/dashboard')
+
+  assert response.status_code == 200
+  assert response.json() == {
+    'books_total': 3,
+    'books_finished': 0,
+    'books_in_progress': 0,
+    'pages_read': 0,
+    'games_total': 3,
+    'games_finished': 0,
+    'games_in_progress': 3,
+    'hours_played': 45.0,
+  }
+  # authentification + lecture de user_stats
+  assert len(queries) == 2
+
+
+def test_empty_dashboard(auth_user):
+  response = auth_user.get('/dashboard')
+
+  assert response.status_code == 200
+  assert response.json()['books_total'] == 0
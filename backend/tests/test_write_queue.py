@@ -0,0 +1,172 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from peewee import SqliteDatabase
+
+from src.models import Book
+from src.schemas import BookCreate, BookUpdate
+from src.services.books_service import books_service
+from src.write_queue import WriteQueue, _Job, write_queue
+from tests.conftest import test_db as database
+
+
+@pytest.fixture
+def writer(context):
+  queue = WriteQueue(max_batch=64, max_latency=0.01)
+  queue.start(database)
+  yield queue
+  queue.stop()
+
+
+@pytest.fixture
+def service_writer(context, monkeypatch):
+  # le write_queue global demarre, comme dans le lifespan de l'app
+  monkeypatch.setattr(write_queue, 'max_latency', 0.01)
+  write_queue.start(database)
+  yield write_queue
+  write_queue.stop()
+
+
+def test_run_inline_without_writer_thread(context):
+  queue = WriteQueue(max_batch=8, max_latency=0.01)
+  assert queue.run(lambda: threading.current_thread()) is threading.current_thread()
+  assert queue.stats()['batches'] == 0
+
+
+def test_concurrent_writes_are_group_committed(writer, context):
+  user = context['test_user'].id
+
+  def create(i):
+    return writer.run(Book.create, title=f'Book {i}', user=user)
+
+  with ThreadPoolExecutor(max_workers=16) as pool:
+    books = list(pool.map(create, range(32)))
+
+  assert sorted(book.title for book in books) == sorted(f'Book {i}' for i in range(32))
+  assert Book.select().count() == 32
+  assert writer.stats()['jobs'] == 32
+  assert writer.stats()['batches'] < 32
+
+
+def test_failing_write_does_not_abort_batch(writer, context):
+  user = context['test_user'].id
+  Book.create(title='Taken', isbn='111', user=user)
+
+  def create(isbn):
+    return writer.run(Book.create, title=isbn, isbn=isbn, user=user)
+
+  with ThreadPoolExecutor(max_workers=4) as pool:
+    futures = [pool.submit(create, isbn) for isbn in ('222', '111', '333')]
+
+  assert futures[0].result().isbn == '222'
+  with pytest.raises(Exception, match='UNIQUE'):
+    futures[1].result()
+  assert futures[2].result().isbn == '333'
+  assert Book.select().count() == 3
+
+
+def test_results_are_returned_after_commit(writer, context):
+  user = context['test_user'].id
+  book = writer.run(Book.create, title='Durable', user=user)
+
+  # lu depuis le thread appelant, donc une autre connexion
+  assert Book.get_by_id(book.id).title == 'Durable'
+
+
+def test_services_write_through_queue(service_writer, context):
+  user = context['test_user']
+  book = books_service.create(BookCreate(title='Queued', user=str(user.id)), user.id)
+  updated = books_service.update(book.id, user, BookUpdate(current_page=5))
+
+  assert updated.current_page == 5
+  with pytest.raises(HTTPException) as err:
+    books_service.delete(999, user)
+  assert err.value.status_code == 404
+  assert service_writer.stats()['jobs'] == 3
+
+
+def test_stop_drains_pending_writes(context):
+  queue = WriteQueue(max_batch=4, max_latency=0.05)
+  queue.start(database)
+  user = context['test_user'].id
+  with ThreadPoolExecutor(max_workers=8) as pool:
+    futures = [
+      pool.submit(queue.run, Book.create, title=f'Book {i}', user=user)
+      for i in range(8)
+    ]
+    time.sleep(0.01)
+    queue.stop()
+  assert all(f.result().id for f in futures)
+
+
+def test_stop_rejects_and_fails_late_writes(context):
+  queue = WriteQueue(max_batch=1, max_latency=0.01)
+  queue.start(database)
+  release = threading.Event()
+  with ThreadPoolExecutor(max_workers=2) as pool:
+    blocked = pool.submit(queue.run, release.wait)
+    while queue.stats()['pending']:
+      time.sleep(0.001)
+    stopping = pool.submit(queue.stop)
+    while not queue._stopping:
+      time.sleep(0.001)
+
+    with pytest.raises(RuntimeError, match='stopping'):
+      queue.run(Book.create, title='Late', user=context['test_user'].id)
+    # job reste derriere la sentinelle : son appelant recoit une erreur
+    leftover = _Job(Book.create, (), {'title': 'Lost'})
+    queue._queue.put(leftover)
+    release.set()
+    stopping.result(timeout=5)
+
+  assert blocked.result() is True
+  with pytest.raises(RuntimeError, match='stopped'):
+    leftover.future.result(timeout=1)
+  assert Book.select().count() == 0
+
+
+def test_batches_take_the_write_lock_up_front(tmp_path):
+  # autre connexion qui ecrit pendant que le thread d'ecriture lit puis ecrit
+  path = str(tmp_path / 'locks.db')
+  file_db = SqliteDatabase(path, pragmas={'journal_mode': 'wal'})
+  file_db.execute_sql('CREATE TABLE counter (n INTEGER)')
+  file_db.execute_sql('CREATE TABLE other (n INTEGER)')
+  file_db.close()
+  queue = WriteQueue(max_batch=8, max_latency=0.005)
+  queue.start(file_db)
+
+  def read_then_write():
+    (n,) = file_db.execute_sql('SELECT count(*) FROM counter').fetchone()
+    file_db.execute_sql('INSERT INTO counter VALUES (?)', (n,))
+
+  done = threading.Event()
+
+  def other_writer():
+    conn = sqlite3.connect(path, timeout=5)
+    while not done.is_set():
+      with conn:
+        conn.execute('INSERT INTO other VALUES (1)')
+      time.sleep(0.001)
+    conn.close()
+
+  errors = []
+  with ThreadPoolExecutor(max_workers=10) as pool:
+    others = [pool.submit(other_writer) for _ in range(2)]
+    writes = [pool.submit(queue.run, read_then_write) for _ in range(300)]
+    for write in writes:
+      try:
+        write.result(timeout=10)
+      except Exception as e:
+        errors.append(e)
+    done.set()
+    for other in others:
+      other.result()
+  queue.stop()
+
+  assert errors == []
+  assert file_db.execute_sql('SELECT count(*) FROM counter').fetchone() == (300,)
+  file_db.close()